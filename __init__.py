@@ -6,19 +6,30 @@
 
 import importlib
 
-from . import properties, operators, panels
-
-modules = [
-    properties,
-    operators,
-    panels,
-]
-
-
-if "bpy" in locals():
-    importlib.reload(properties)
-    importlib.reload(operators)
-    importlib.reload(panels)
+# Already bound when the add-on is reloaded
+reloading = "bpy" in locals()
+
+try:
+    import bpy
+except ImportError:
+    # Run from the command line (python -m render_multiple_instances), see cli.py
+    bpy = None
+
+if bpy is not None:
+    from . import properties, operators, panels
+
+    if reloading:
+        importlib.reload(properties)
+        importlib.reload(operators)
+        importlib.reload(panels)
+
+    modules = [
+        properties,
+        operators,
+        panels,
+    ]
+else:
+    modules = []
 
 
 def register():
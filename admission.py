@@ -0,0 +1,146 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Memory-aware admission control: instances are started one at a time while
+the memory they are expected to need fits in the available memory minus a
+headroom, and the newest ones are paused when memory runs short, instead
+of letting the machine swap.
+
+Memory is read from /proc (Linux), elsewhere every instance is started.
+"""
+
+import time
+from pathlib import Path
+
+
+MEMINFO_PATH = Path("/proc/meminfo")
+
+# Seconds to wait for the first instance's memory use if it saves no frame
+WARMUP_SECONDS = 60
+
+# Extra free memory, as a fraction of an instance, needed to resume one
+RESUME_MARGIN = 0.25
+
+
+def read_mem_available(path: Path = MEMINFO_PATH) -> int | None:
+    """MemAvailable in bytes, None where /proc/meminfo is missing."""
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def read_rss(pid: int) -> int | None:
+    """Resident memory of a process in bytes, None if unknown."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class AdmissionControl:
+    """
+    Start and pause the instances of a pool to keep headroom bytes free.
+
+    The first instance starts right away. Once it saved a frame (or after
+    WARMUP_SECONDS) the largest resident memory seen for one instance is
+    the estimate for the others. On every check, the memory the running
+    instances may still grow into is taken off the available memory:
+    another instance starts if the rest fits an estimate, and the newest
+    running instance is paused if the rest is below zero. Paused instances
+    resume first, and one instance always keeps running.
+    """
+
+    def __init__(self, headroom: int, get_available=read_mem_available,
+                 get_rss=read_rss, clock=time.monotonic,
+                 warmup: float = WARMUP_SECONDS):
+        self.headroom = headroom
+        self.get_available = get_available
+        self.get_rss = get_rss
+        self.clock = clock
+        self.warmup = warmup
+        self.pending = []
+        self.suspended = []
+        self.peak = 0
+        self.started = None
+        self.effective = 0
+
+    @property
+    def held(self) -> int:
+        return len(self.pending)
+
+    def start(self, pool) -> None:
+        self.pending = list(pool.instances)
+        self.started = self.clock()
+        if self.get_available() is None:
+            # No memory information, start everything
+            while self.pending:
+                pool.start_instance(self.pending.pop(0))
+        elif self.pending:
+            pool.start_instance(self.pending.pop(0))
+        self.effective = len(pool.instances) - len(self.pending)
+
+    def is_warm(self, pool) -> bool:
+        if self.clock() - self.started >= self.warmup:
+            return True
+        return any(i.progress is not None and i.progress.frames_done
+                   for i in pool.instances)
+
+    def check(self, pool) -> None:
+        self.suspended = [i for i in self.suspended if i.suspended]
+        running = [i for i in pool.instances if i.running and not i.suspended]
+        rss = {i.index: self.get_rss(i.process.pid) or 0
+               for i in running + self.suspended}
+        self.peak = max([self.peak, *rss.values()])
+        self.effective = len(running)
+
+        if not running:
+            # Never leave the pool idle while work is held back
+            if self.suspended:
+                self.resume(self.suspended[-1])
+            elif self.pending:
+                pool.start_instance(self.pending.pop(0))
+            else:
+                return
+            self.effective = 1
+            return
+
+        available = self.get_available()
+        if available is None or not self.is_warm(pool):
+            return
+
+        estimate = self.peak
+        growth = sum(max(0, estimate - rss[i.index]) for i in running)
+        free = available - growth - self.headroom
+
+        if free < 0 and len(running) > 1:
+            if running[-1].suspend():
+                print(f"RMI: instance {running[-1].index} paused, low memory")
+                self.suspended.append(running[-1])
+                self.effective -= 1
+        elif self.suspended:
+            instance = self.suspended[-1]
+            needed = max(0, estimate - rss[instance.index]) + RESUME_MARGIN * estimate
+            if free >= needed:
+                self.resume(instance)
+                self.effective += 1
+        elif self.pending and free >= estimate:
+            pool.start_instance(self.pending.pop(0))
+            self.effective += 1
+
+    def resume(self, instance) -> None:
+        print(f"RMI: instance {instance.index} resumed")
+        instance.resume()
+        self.suspended.remove(instance)
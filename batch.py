@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Batch render jobs: which blend file, scene, camera, frames and output.
+
+Scene information has the same shape whether it comes from the open
+blend file or from probing another blend file in a background Blender:
+
+    {"Scene": {"frame_start": 1, "frame_end": 250, "frame_step": 1,
+               "fps": 24.0, "output": "/renders/shot_", "camera": "Camera",
+               "markers": [["sh010", 1], ["sh020", 101]]}}
+"""
+
+import json
+
+from .scheduling import frame_range
+
+
+PROBE_PREFIX = "RMI_PROBE:"
+
+# Run with blender -b file.blend --python-expr, prints PROBE_PREFIX + json
+PROBE_EXPR = (
+    "import bpy, json\n"
+    "print(" + repr(PROBE_PREFIX) + " + json.dumps({s.name: {\n"
+    "    'frame_start': s.frame_start, 'frame_end': s.frame_end,\n"
+    "    'frame_step': s.frame_step,\n"
+    "    'fps': s.render.fps / s.render.fps_base,\n"
+    "    'output': bpy.path.abspath(s.render.filepath),\n"
+    "    'camera': s.camera.name if s.camera else '',\n"
+    "    'markers': [[m.name, m.frame] for m in s.timeline_markers],\n"
+    "} for s in bpy.data.scenes}), flush=True)\n"
+)
+
+
+def parse_probe_output(output: str) -> dict:
+    for line in output.splitlines():
+        if line.startswith(PROBE_PREFIX):
+            return json.loads(line[len(PROBE_PREFIX):])
+    raise ValueError("No scene information in Blender output")
+
+
+def get_marker_range(markers: list, name: str, scene_end: int) -> tuple:
+    """
+    Frame range of the shot starting at marker name, up to the frame
+    before the next marker (or the scene end for the last one).
+    """
+    markers = sorted(markers, key=lambda m: m[1])
+    for i, (marker, frame) in enumerate(markers):
+        if marker == name:
+            end = markers[i + 1][1] - 1 if i + 1 < len(markers) else scene_end
+            return frame, max(frame, end)
+    raise ValueError(f"Marker '{name}' not found")
+
+
+def resolve_job(job_id: int, entry: dict, scenes: dict) -> dict:
+    """
+    Turn a queue entry into the job sent to workers, with its frame list.
+
+    entry keys: blend_file, scene, camera, range_mode ('SCENE', 'CUSTOM'
+    or 'MARKER'), frame_start, frame_end, marker, output, encode.
+    """
+    scene_name = entry["scene"] or next(iter(scenes), "")
+    if scene_name not in scenes:
+        raise ValueError(f"Scene '{scene_name}' not found in {entry['blend_file']}")
+    scene = scenes[scene_name]
+
+    match entry["range_mode"]:
+        case 'CUSTOM':
+            start, end = entry["frame_start"], entry["frame_end"]
+        case 'MARKER':
+            start, end = get_marker_range(
+                scene["markers"], entry["marker"], scene["frame_end"])
+        case _:
+            start, end = scene["frame_start"], scene["frame_end"]
+
+    return {
+        "id": job_id,
+        "blend_file": entry["blend_file"],
+        "scene": scene_name,
+        "camera": entry["camera"],
+        "output": entry["output"],
+        "output_pattern": entry["output"] or scene["output"],
+        "fps": scene["fps"],
+        "encode": entry["encode"],
+        "frames": frame_range(start, end, scene["frame_step"]),
+    }
@@ -0,0 +1,166 @@
+"""
+Stand-in for the Blender binary, used by the benchmarks.
+
+Understands the command lines the addon builds: static frame arguments
+(-s/-e/-j -a, -f 1..3,7), scene and output overrides (-S, -o) and worker
+mode (--python worker.py -- ...), in which the real worker.py runs
+against a minimal fake bpy. Every frame sleeps for its simulated cost,
+writes a small PNG and prints Blender-like output lines.
+
+Environment:
+    RMI_BENCH_OUTPUT   directory frames are written to
+    RMI_BENCH_COSTS    JSON file {frame: seconds}
+    RMI_BENCH_STARTUP  seconds spent "loading" before the first frame
+    RMI_BENCH_LEDGER   file each rendered frame is appended to as
+                       "pid frame start end"
+"""
+
+import json
+import os
+import runpy
+import struct
+import sys
+import time
+import types
+import zlib
+from pathlib import Path
+
+
+OUTPUT_DIR = Path(os.environ.get("RMI_BENCH_OUTPUT", "."))
+LEDGER = os.environ.get("RMI_BENCH_LEDGER")
+STARTUP = float(os.environ.get("RMI_BENCH_STARTUP", "0"))
+DEFAULT_COST = 0.01
+
+
+def load_costs() -> dict:
+    path = os.environ.get("RMI_BENCH_COSTS")
+    if not path:
+        return {}
+    with open(path) as f:
+        return {int(frame): seconds for frame, seconds in json.load(f).items()}
+
+
+COSTS = load_costs()
+
+
+def make_png(width: int = 64, height: int = 36) -> bytes:
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data +
+                struct.pack(">I", zlib.crc32(kind + data)))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    rows = b"".join(b"\x00" + bytes((y * 7 % 256, 96, 160)) * width
+                    for y in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +
+            chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+PNG = make_png()
+
+
+def render_frame(frame: int) -> None:
+    path = OUTPUT_DIR / f"frame_{frame:04d}.png"
+    if path.exists():
+        print(f'skipping existing frame "{path}"', flush=True)
+        return
+    start = time.time()
+    print(f"Fra:{frame} Mem:12.00M (Peak 12.00M) | Time:00:00.00 | "
+          f"Rendering 1 / 1 samples", flush=True)
+    time.sleep(COSTS.get(frame, DEFAULT_COST))
+    path.write_bytes(PNG)
+    print(f"Saved: '{path}'", flush=True)
+    if LEDGER:
+        with open(LEDGER, "a") as ledger:
+            ledger.write(f"{os.getpid()} {frame} {start} {time.time()}\n")
+
+
+def parse_frame_spec(spec: str) -> list:
+    """Blender -f argument, e.g. "1..3,7" -> [1, 2, 3, 7]."""
+    frames = []
+    for part in spec.split(","):
+        first, _, last = part.partition("..")
+        frames.extend(range(int(first), int(last or first) + 1))
+    return frames
+
+
+class Scene:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.frame_start = 1
+        self.frame_end = 1
+        self.frame_step = 1
+        self.camera = None
+        self.render = types.SimpleNamespace(
+            filepath=str(OUTPUT_DIR) + "/", use_overwrite=False,
+            use_placeholder=False)
+
+
+def make_bpy(blend_file: str) -> types.ModuleType:
+    """Just enough of bpy for worker.py."""
+    scene = Scene("Scene")
+
+    def render(animation=False, scene=None):
+        scene = bpy.data.scenes[scene] if scene else bpy.context.scene
+        for frame in range(scene.frame_start, scene.frame_end + 1, scene.frame_step):
+            render_frame(frame)
+
+    def open_mainfile(filepath=""):
+        bpy.data.filepath = filepath
+
+    bpy = types.ModuleType("bpy")
+    bpy.data = types.SimpleNamespace(
+        filepath=blend_file, scenes={scene.name: scene}, objects={})
+    bpy.context = types.SimpleNamespace(scene=scene)
+    bpy.types = types.SimpleNamespace(Scene=Scene)
+    bpy.ops = types.SimpleNamespace(
+        render=types.SimpleNamespace(render=render),
+        wm=types.SimpleNamespace(open_mainfile=open_mainfile))
+    return bpy
+
+
+def main(argv: list) -> None:
+    global OUTPUT_DIR
+    blend_file = ""
+    start, end, step = 1, 1, 1
+    time.sleep(STARTUP)
+
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "-b" and i + 1 < len(argv) and not argv[i + 1].startswith("-"):
+            blend_file = argv[i + 1]
+            i += 1
+        elif arg in ("-t", "-S"):
+            i += 1
+        elif arg == "-o":
+            output = argv[i + 1]
+            OUTPUT_DIR = Path(output) if output.endswith("/") else Path(output).parent
+            i += 1
+        elif arg == "-s":
+            start = int(argv[i + 1])
+            i += 1
+        elif arg == "-e":
+            end = int(argv[i + 1])
+            i += 1
+        elif arg == "-j":
+            step = int(argv[i + 1])
+            i += 1
+        elif arg == "-a":
+            for frame in range(start, end + 1, step):
+                render_frame(frame)
+        elif arg == "-f":
+            for frame in parse_frame_spec(argv[i + 1]):
+                render_frame(frame)
+            i += 1
+        elif arg == "--python":
+            sys.modules["bpy"] = make_bpy(blend_file)
+            script = argv[i + 1]
+            sys.argv = [script] + argv[i + 2:]
+            runpy.run_path(script, run_name="__main__")
+            return
+        i += 1
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,299 @@
+"""
+Benchmarks for frame scheduling, directory polling and encoding.
+
+Runs the addon's instance pool against fake_blender.py instead of Blender,
+so it needs no GPU and no Blender install:
+
+    python benchmarks/run_benchmarks.py --output bench_results.json
+
+Every partition mode renders the same frames under several per-frame cost
+distributions. Results are written as JSON, compare them between releases
+to spot regressions. Encoding is measured when FFmpeg is on the PATH.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import stat
+import statistics
+import sys
+import tempfile
+import time
+import tomllib
+import types
+from pathlib import Path
+from unittest.mock import MagicMock
+
+BENCH_DIR = Path(__file__).resolve().parent
+ADDON_ROOT = BENCH_DIR.parent
+
+# Import the addon as a package without Blender, like tests/run_tests.py
+if 'bpy' not in sys.modules:
+    sys.modules['bpy'] = MagicMock()
+if 'render_multiple_instances' not in sys.modules:
+    addon = types.ModuleType('render_multiple_instances')
+    addon.__path__ = [str(ADDON_ROOT)]
+    sys.modules['render_multiple_instances'] = addon
+
+from fake_blender import PNG  # noqa: E402
+from render_multiple_instances import utils  # noqa: E402
+from render_multiple_instances.coordinator import FrameQueue, FrameQueueServer  # noqa: E402
+from render_multiple_instances.encoding import SegmentedEncoder, get_encoder_args  # noqa: E402
+from render_multiple_instances.instances import InstancePool, RenderInstance  # noqa: E402
+from render_multiple_instances.progress import JobProgress  # noqa: E402
+from render_multiple_instances.scheduling import (  # noqa: E402
+    PartitionMode,
+    frame_range,
+    partition_frames,
+)
+from render_multiple_instances.sequence import (  # noqa: E402
+    check_frames,
+    clear_cache,
+    scan_directory,
+)
+
+
+MODES = ('CONTIGUOUS', 'INTERLEAVED', 'CHUNKED', 'BALANCED', 'DYNAMIC')
+DISTRIBUTIONS = ('uniform', 'ramp', 'heavy_tail')
+POLL_INTERVAL = 0.01
+
+
+def make_costs(distribution: str, frames: list, mean: float, seed: int) -> dict:
+    """Seconds per frame, averaging roughly mean."""
+    rng = random.Random(seed)
+    match distribution:
+        case 'ramp':
+            # The shot gets heavier towards its end
+            last = max(1, len(frames) - 1)
+            return {f: mean * (0.2 + 1.6 * i / last) for i, f in enumerate(frames)}
+        case 'heavy_tail':
+            # Mostly cheap frames with a few expensive ones
+            return {f: mean * min(20.0, rng.paretovariate(2.0)) / 2 for f in frames}
+    return {f: mean for f in frames}
+
+
+def make_blender_stub(work_dir: Path) -> Path:
+    """Executable that runs fake_blender.py, for get_blender_bin_path()."""
+    stub = work_dir / "blender"
+    stub.write_text(f'#!/bin/sh\nexec "{sys.executable}" '
+                    f'"{BENCH_DIR / "fake_blender.py"}" "$@"\n')
+    stub.chmod(stub.stat().st_mode | stat.S_IXUSR)
+    return stub
+
+
+def read_ledger(path: Path) -> list:
+    if not path.exists():
+        return []
+    entries = []
+    for line in path.read_text().splitlines():
+        pid, frame, start, end = line.split()
+        entries.append((int(pid), int(frame), float(start), float(end)))
+    return entries
+
+
+def get_render_commands(mode: str, frames: list, costs: dict, args,
+                        blend_file: Path, pool: InstancePool) -> list:
+    if mode == 'DYNAMIC':
+        queue = FrameQueue(frames, args.chunk_size, args.instances)
+        server = FrameQueueServer(queue, blend_file=blend_file.as_posix())
+        server.start()
+        pool.server = server
+        pool.add_cleanup(server.stop)
+        return [utils.get_worker_command_list(None, server, 0, blend_file)
+                for _ in range(args.instances)]
+
+    frame_sets = partition_frames(
+        frames, args.instances, PartitionMode(mode), args.chunk_size,
+        costs if mode == 'BALANCED' else None)
+    return [utils.get_render_command_list(None, frame_set, 0, blend_file)
+            for frame_set in frame_sets]
+
+
+def bench_render(mode: str, distribution: str, args, work_dir: Path) -> dict:
+    frames = frame_range(1, args.frames)
+    costs = make_costs(distribution, frames, args.cost, args.seed)
+    run_dir = work_dir / f"{mode.lower()}_{distribution}"
+    run_dir.mkdir()
+    blend_file = run_dir / "shot.blend"
+    blend_file.touch()
+    costs_file = run_dir / "costs.json"
+    costs_file.write_text(json.dumps(costs))
+    ledger = run_dir / "ledger.txt"
+
+    os.environ.update({
+        "RMI_BENCH_OUTPUT": str(run_dir / "frames"),
+        "RMI_BENCH_COSTS": str(costs_file),
+        "RMI_BENCH_STARTUP": f"{args.startup}",
+        "RMI_BENCH_LEDGER": str(ledger),
+    })
+    (run_dir / "frames").mkdir()
+
+    pool = InstancePool(JobProgress(len(frames)))
+    commands = get_render_commands(mode, frames, costs, args, blend_file, pool)
+    for i, cmd in enumerate(commands):
+        pool.add(RenderInstance(i, cmd, run_dir / "rmi_logs" / f"instance_{i:02d}.log"))
+
+    poll_times = []
+    started = time.monotonic()
+    pool.start()
+    while True:
+        t = time.perf_counter()
+        running = pool.poll()
+        poll_times.append(time.perf_counter() - t)
+        if not running:
+            break
+        time.sleep(POLL_INTERVAL)
+    wall_time = time.monotonic() - started
+
+    entries = read_ledger(ledger)
+    rendered = [frame for _, frame, _, _ in entries]
+    busy = sum(end - start for _, _, start, end in entries)
+    instance_time = wall_time * len(commands)
+    ideal = sum(costs.values()) / args.instances + args.startup
+    return {
+        "mode": mode,
+        "distribution": distribution,
+        "instances": len(commands),
+        "frames": len(frames),
+        "wall_time": wall_time,
+        "ideal_wall_time": ideal,
+        "efficiency": ideal / wall_time if wall_time else None,
+        "idle_time": max(0.0, instance_time - busy),
+        "idle_fraction": max(0.0, 1 - busy / instance_time) if instance_time else None,
+        "duplicate_frames": len(rendered) - len(set(rendered)),
+        "missing_frames": len(set(frames) - set(rendered)),
+        "failed_instances": sum(1 for code in pool.returncodes if code),
+        "pool_poll_mean_ms": statistics.fmean(poll_times) * 1000,
+        "pool_poll_max_ms": max(poll_times) * 1000,
+    }
+
+
+def bench_directory_poll(args, work_dir: Path) -> dict:
+    """Cost of scanning and checking a large frame directory."""
+    frames_dir = work_dir / "large_sequence"
+    frames_dir.mkdir()
+    paths = {}
+    for frame in range(1, args.dir_files + 1):
+        path = frames_dir / f"frame_{frame:05d}.png"
+        path.write_bytes(PNG)
+        paths[frame] = str(path)
+    # Let the directory mtime settle past the racy window so it is cached
+    time.sleep(1.1)
+
+    def timed(func, repeat=5):
+        times = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t)
+        return min(times) * 1000
+
+    def cold_scan():
+        clear_cache()
+        scan_directory(frames_dir, utils.EXTENSIONS)
+
+    scan_directory(frames_dir, utils.EXTENSIONS)
+    return {
+        "files": args.dir_files,
+        "scan_cold_ms": timed(cold_scan),
+        "scan_cached_ms": timed(lambda: scan_directory(frames_dir, utils.EXTENSIONS)),
+        "check_frames_ms": timed(lambda: check_frames(paths), repeat=2),
+    }
+
+
+def bench_encode(args, work_dir: Path) -> dict:
+    if shutil.which("ffmpeg") is None:
+        return {"skipped": "ffmpeg not found"}
+
+    frames_dir = work_dir / "encode_frames"
+    frames_dir.mkdir()
+    files = []
+    for frame in range(1, args.encode_frames + 1):
+        path = frames_dir / f"frame_{frame:04d}.png"
+        path.write_bytes(PNG)
+        files.append(path)
+
+    results = []
+    for jobs in (1, args.encode_jobs):
+        encoder = SegmentedEncoder(
+            files, get_encoder_args("libx264", 23), 24,
+            work_dir / f"encode_{jobs}.mp4", work_dir / f"segments_{jobs}",
+            jobs, work_dir / f"encode_{jobs}.log")
+        t = time.monotonic()
+        returncode = encoder.run()
+        seconds = time.monotonic() - t
+        results.append({"jobs": jobs, "returncode": returncode, "seconds": seconds,
+                        "frames_per_second": len(files) / seconds})
+    return {"encoder": "libx264", "frames": len(files), "runs": results}
+
+
+def get_addon_version() -> str:
+    with open(ADDON_ROOT / "blender_manifest.toml", "rb") as f:
+        return tomllib.load(f).get("version", "")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--instances", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=10)
+    parser.add_argument("--cost", type=float, default=0.02,
+                        help="Mean seconds per frame")
+    parser.add_argument("--startup", type=float, default=0.2,
+                        help="Seconds each instance spends loading")
+    parser.add_argument("--dir-files", type=int, default=20000)
+    parser.add_argument("--encode-frames", type=int, default=240)
+    parser.add_argument("--encode-jobs", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--distributions", nargs="+", default=list(DISTRIBUTIONS),
+                        choices=DISTRIBUTIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rmi_bench_") as tmp:
+        work_dir = Path(tmp)
+        stub = make_blender_stub(work_dir)
+        utils.get_blender_bin_path = lambda: stub
+
+        scheduling = []
+        for distribution in args.distributions:
+            for mode in args.modes:
+                result = bench_render(mode, distribution, args, work_dir)
+                print(f"{mode:12} {distribution:10} {result['wall_time']:6.2f}s "
+                      f"idle {result['idle_fraction']:.0%} "
+                      f"duplicates {result['duplicate_frames']}")
+                scheduling.append(result)
+
+        directory_poll = bench_directory_poll(args, work_dir)
+        print(f"scan {directory_poll['files']} files: "
+              f"{directory_poll['scan_cold_ms']:.1f}ms cold, "
+              f"{directory_poll['scan_cached_ms']:.3f}ms cached")
+
+        encode = bench_encode(args, work_dir)
+
+    results = {
+        "version": get_addon_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": vars(args),
+        "scheduling": scheduling,
+        "directory_poll": directory_poll,
+        "encode": encode,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
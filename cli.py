@@ -0,0 +1,348 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Render from the command line, without the Blender UI:
+
+    python -m render_multiple_instances render shot.blend --instances 8 --range 1-500 --encode libx264
+
+The coordinator is plain Python and never imports bpy: it starts the
+background Blender instances, watches them, checks the saved frames and
+encodes them. The scene is probed with a background Blender only when the
+frame range, output, frame rate or (for BALANCED) scene are not given.
+BALANCED splits frames by the frame times the addon recorded for the scene.
+The exit status is 0 once every frame is rendered (and encoded).
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .scheduling import (
+    PartitionMode,
+    frame_range,
+    partition_frames,
+    load_frame_costs,
+    get_frame_costs_path,
+    get_frame_costs_key,
+)
+from .coordinator import FrameQueue, FrameQueueServer
+from .instances import InstancePool
+from .progress import JobProgress, format_duration
+from .encoding import SegmentedEncoder, get_encoder_args, probe_ffmpeg
+from .sequence import scan_directory, check_frames
+from .launch import (
+    EXTENSIONS,
+    get_output_dir,
+    get_video_path,
+    build_render_command,
+    build_worker_command,
+    get_instance_cpu_sets,
+    add_render_instances,
+    start_watchdog,
+    start_admission,
+    probe_scenes,
+)
+
+
+POLL_INTERVAL = 0.5
+
+# Seconds between progress lines
+REPORT_INTERVAL = 10
+
+
+def parse_range(spec: str) -> list:
+    """Frames of "1-500", "1-500:2" (every second frame), "7" or "1-10,20"."""
+    frames = set()
+    for part in spec.split(","):
+        span, _, step = part.partition(":")
+        first, _, last = span.strip().partition("-")
+        start = int(first)
+        end = int(last) if last else start
+        if end < start:
+            raise ValueError(f"Frame range '{part}' ends before it starts")
+        frames.update(frame_range(start, end, int(step or 1)))
+    return sorted(frames)
+
+
+class RenderJob:
+    """
+    A render started from the command line: frames of blend_file rendered
+    by the blender binary. Settings are attributes named like RMI_Props,
+    so a job is the props of the launch helpers.
+    """
+
+    DEFAULTS = {
+        "instances": 3,
+        "partition_mode": 'CONTIGUOUS',
+        "chunk_size": 10,
+        "thread_budget": False,
+        "low_priority": False,
+        "headless": True,
+        "watchdog": False,
+        "hang_timeout": 600,
+        "max_restarts": 2,
+        "memory_admission": False,
+        "memory_headroom": 2048,
+        "scene": "",
+        "output": "",
+        "encoder": "",
+        "quality": 20,
+        "encode_jobs": 4,
+        "fps": 24.0,
+    }
+
+    def __init__(self, blend_file: Path, blender: Path, frames: list, **settings):
+        unknown = set(settings) - set(self.DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        self.blend_file = Path(blend_file)
+        self.blender = Path(blender)
+        self.frames = list(frames)
+        for name, value in (self.DEFAULTS | settings).items():
+            setattr(self, name, value)
+
+    @property
+    def output_dir(self) -> Path | None:
+        return get_output_dir(self.output) if self.output else None
+
+    @property
+    def log_dir(self) -> Path:
+        return (self.output_dir or self.blend_file.parent) / "rmi_logs"
+
+    def get_blender_args(self) -> list:
+        """Scene and output overrides, before the frame arguments."""
+        args = []
+        if self.scene:
+            args += ["-S", self.scene]
+        if self.output:
+            args += ["-o", self.output]
+        return args
+
+    def start(self) -> InstancePool:
+        """Launch the instances, like start_render_instances() in Blender."""
+        pool = InstancePool(JobProgress(len(self.frames)))
+        frame_sets = None
+        if self.partition_mode == 'DYNAMIC':
+            queue = FrameQueue(self.frames, self.chunk_size, self.instances)
+            server = FrameQueueServer(queue, blend_file=self.blend_file.as_posix())
+            server.start()
+            pool.server = server
+            pool.add_cleanup(server.stop)
+            _, port = server.address
+            cpu_sets = get_instance_cpu_sets(self, min(self.instances, len(self.frames)))
+            commands = [build_worker_command(self.blender, self.blend_file, port,
+                                             server.token, len(cpus or []),
+                                             self.get_blender_args())
+                        for cpus in cpu_sets]
+        else:
+            costs = None
+            if self.partition_mode == 'BALANCED':
+                costs = load_frame_costs(get_frame_costs_path(self.blend_file),
+                                         get_frame_costs_key(self.scene, 'render'))
+            frame_sets = partition_frames(self.frames, self.instances,
+                                          PartitionMode(self.partition_mode),
+                                          self.chunk_size, costs)
+            cpu_sets = get_instance_cpu_sets(self, len(frame_sets))
+            commands = [build_render_command(self.blender, self.blend_file, frame_set,
+                                             len(cpus or []), self.get_blender_args())
+                        for frame_set, cpus in zip(frame_sets, cpu_sets)]
+
+        add_render_instances(self, pool, commands, cpu_sets, self.log_dir, frame_sets)
+        try:
+            start_watchdog(self, pool, self.log_dir, {})
+            start_admission(self, pool)
+            pool.start()
+        except Exception:
+            pool.close()
+            raise
+        return pool
+
+    def check_frames(self) -> list:
+        """Frames missing or broken in the output directory."""
+        if self.output_dir is None:
+            # Nowhere to look, none of the frames can be verified
+            return list(self.frames)
+        saved = scan_directory(self.output_dir, EXTENSIONS).frames
+        missing = [frame for frame in self.frames if frame not in saved]
+        _, invalid = check_frames({f: saved[f] for f in self.frames if f in saved})
+        return sorted(missing + invalid)
+
+    def start_encode(self) -> SegmentedEncoder:
+        saved = scan_directory(self.output_dir, EXTENSIONS).frames
+        encoder = SegmentedEncoder(
+            [saved[frame] for frame in self.frames],
+            get_encoder_args(self.encoder, self.quality),
+            self.fps,
+            get_video_path(self.output_dir, self.encoder, self.quality),
+            self.output_dir / "rmi_segments",
+            self.encode_jobs,
+            self.log_dir / "encode.log",
+        )
+        encoder.start()
+        return encoder
+
+
+def wait_for_pool(pool: InstancePool) -> None:
+    """Poll until every instance exited, reporting progress now and then."""
+    reported = time.monotonic()
+    while pool.poll():
+        time.sleep(POLL_INTERVAL)
+        if time.monotonic() - reported >= REPORT_INTERVAL:
+            reported = time.monotonic()
+            progress = pool.progress
+            print(f"RMI: {progress.frames_done}/{progress.total_frames} frames, "
+                  f"ETA {format_duration(progress.eta)}", flush=True)
+
+
+def run_job(job: RenderJob) -> int:
+    """Render (and encode) job, returns the exit status."""
+    started = time.monotonic()
+    try:
+        pool = job.start()
+    except OSError as error:
+        print(f"RMI: could not start Blender: {error}", file=sys.stderr)
+        return 1
+    print(f"RMI: rendering {len(job.frames)} frames of {job.blend_file} with "
+          f"{len(pool.instances)} instances, logs in {job.log_dir}", flush=True)
+    try:
+        wait_for_pool(pool)
+    except KeyboardInterrupt:
+        print("RMI: cancelled", flush=True)
+        pool.cancel()
+        while pool.poll():
+            time.sleep(POLL_INTERVAL)
+        return 130
+    render_seconds = time.monotonic() - started
+
+    failed = [i.index for i in pool.instances
+              if i.index not in pool.replaced and i.poll()]
+    bad_frames = job.check_frames()
+    status = 1 if failed or bad_frames else 0
+    if failed:
+        print(f"RMI: instances {failed} failed, see {job.log_dir}")
+    if bad_frames:
+        print(f"RMI: {len(bad_frames)} frames missing or broken: {bad_frames}")
+    if pool.watchdog is not None and pool.watchdog.killed:
+        print(f"RMI: {len(pool.watchdog.killed)} hung instances restarted")
+    print(f"RMI: rendered {pool.progress.frames_done} frames in "
+          f"{format_duration(render_seconds)}", flush=True)
+
+    if job.encoder and job.output_dir is not None and status == 0:
+        encoder = job.start_encode()
+        try:
+            encoder.thread.join()
+        except KeyboardInterrupt:
+            encoder.terminate()
+            return 130
+        if encoder.returncode != 0:
+            print(f"RMI: encode failed, see {job.log_dir / 'encode.log'}")
+            status = 1
+        else:
+            print(f"RMI: encoded {encoder.output_file} in "
+                  f"{format_duration(encoder.seconds)}")
+
+    print(f"RMI: finished in {format_duration(time.monotonic() - started)}, "
+          f"exit status {status}", flush=True)
+    return status
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m render_multiple_instances",
+        description="Render a blend file with multiple background Blender instances")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    render = commands.add_parser("render", help="Render frames of a blend file")
+    render.add_argument("blend_file", type=Path)
+    render.add_argument("--blender",
+                        help="Blender binary (default: $RMI_BLENDER, then blender on the PATH)")
+    render.add_argument("--instances", type=int, default=RenderJob.DEFAULTS["instances"])
+    render.add_argument("--range", type=parse_range, dest="frames",
+                        help="Frames, e.g. 1-500, 1-500:2 or 1-10,20 (default: scene range)")
+    render.add_argument("--scene", default="", help="Scene to render (default: active scene)")
+    render.add_argument("--output", default="",
+                        help="Output path, e.g. /renders/shot_#### (default: scene output)")
+    render.add_argument("--partition-mode", type=str.upper,
+                        choices=[mode.value for mode in PartitionMode] + ['DYNAMIC'],
+                        default=RenderJob.DEFAULTS["partition_mode"])
+    render.add_argument("--chunk-size", type=int, default=RenderJob.DEFAULTS["chunk_size"])
+    render.add_argument("--thread-budget", action="store_true",
+                        help="Split the CPU cores between instances")
+    render.add_argument("--low-priority", action="store_true")
+    render.add_argument("--watchdog", action="store_true",
+                        help="Restart instances that report no render progress for too long")
+    render.add_argument("--hang-timeout", type=int, default=RenderJob.DEFAULTS["hang_timeout"])
+    render.add_argument("--max-restarts", type=int, default=RenderJob.DEFAULTS["max_restarts"])
+    render.add_argument("--memory-admission", action="store_true",
+                        help="Start instances as memory allows")
+    render.add_argument("--memory-headroom", type=int,
+                        default=RenderJob.DEFAULTS["memory_headroom"], help="MB")
+    render.add_argument("--encode", default="", dest="encoder", metavar="ENCODER",
+                        help="Encode the frames with this FFmpeg encoder, e.g. libx264")
+    render.add_argument("--quality", type=int, default=RenderJob.DEFAULTS["quality"])
+    render.add_argument("--encode-jobs", type=int, default=RenderJob.DEFAULTS["encode_jobs"])
+    render.add_argument("--fps", type=float, help="Frame rate (default: scene frame rate)")
+    return parser
+
+
+def get_job(args: argparse.Namespace) -> RenderJob:
+    """RenderJob of the parsed arguments, probing the scene if needed."""
+    blender = shutil.which(args.blender or os.environ.get("RMI_BLENDER") or "blender")
+    if not blender:
+        raise ValueError("Blender not found, use --blender or set RMI_BLENDER")
+    blender = Path(blender).absolute()
+    blend_file = args.blend_file.resolve()
+    if not blend_file.is_file():
+        raise ValueError(f"{blend_file} not found")
+    if args.encoder:
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise ValueError("FFmpeg not found on the PATH, needed to encode")
+        encoders = probe_ffmpeg(ffmpeg, Path(tempfile.gettempdir()) /
+                                "render_multiple_instances" / "ffmpeg_probe.json")
+        if args.encoder not in encoders:
+            raise ValueError(f"Encoder '{args.encoder}' not available, "
+                             f"use one of: {', '.join(encoders) or 'none'}")
+
+    settings = {name: getattr(args, name) for name in RenderJob.DEFAULTS
+                if getattr(args, name, None) is not None}
+    frames = args.frames
+    if (frames is None or not args.output or (args.encoder and not args.fps) or
+            (args.partition_mode == 'BALANCED' and not args.scene)):
+        scenes = probe_scenes(blender, blend_file)
+        name = args.scene or next(iter(scenes), "")
+        if name not in scenes:
+            raise ValueError(f"Scene '{name}' not found in {blend_file}")
+        scene = scenes[name]
+        if frames is None:
+            frames = frame_range(scene["frame_start"], scene["frame_end"],
+                                 scene["frame_step"])
+        settings["scene"] = name
+        settings["output"] = args.output or scene["output"]
+        settings["fps"] = args.fps or scene["fps"]
+    if not settings.get("output"):
+        raise ValueError("No output path, use --output")
+    return RenderJob(blend_file, blender, frames, **settings)
+
+
+def main(argv: list | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        job = get_job(args)
+    except (ValueError, OSError, subprocess.SubprocessError) as error:
+        print(f"RMI: {error}", file=sys.stderr)
+        return 2
+    if not job.frames:
+        print("RMI: no frames to render", file=sys.stderr)
+        return 2
+    return run_job(job)
@@ -0,0 +1,286 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Frame queue handing out work to render instances on demand, locally or
+across machines.
+
+Workers run worker.py inside Blender and talk to the FrameQueueServer
+over TCP with one JSON object per line. Every message carries the job
+token and the worker name:
+
+    -> {"op": "register", "host": "node-2"}
+    <- {"blend_file": "/shared/shot.blend"}
+    -> {"op": "next"}
+    <- {"frames": [1, 2, 3]}              (empty list: nothing left)
+    -> {"op": "done", "frames": [1, 2, 3], "seconds": 42.0}
+    <- {"ok": true}
+
+A BatchQueue also sends the job the frames belong to with each chunk,
+{"frames": [...], "job": {"id": 0, "scene": "Scene", ...}}, and expects
+its "id" back as "job" in the done message.
+    -> {"op": "stats"}
+    <- {"nodes": {"node-2": {"frames": 3, "frames_per_minute": 4.3}}}
+"""
+
+import json
+import secrets
+import socketserver
+import threading
+import time
+from collections import deque
+
+
+# Chunk size scale limits for nodes faster / slower than average
+MIN_SPEED_FACTOR = 0.25
+MAX_SPEED_FACTOR = 4.0
+
+
+class WorkerStats:
+
+    def __init__(self, host: str):
+        self.host = host
+        self.frames = 0
+        self.seconds = 0.0
+        self.registered = time.monotonic()
+
+    @property
+    def frames_per_second(self) -> float | None:
+        if not self.frames or self.seconds <= 0:
+            return None
+        return self.frames / self.seconds
+
+
+class FrameQueue:
+    """
+    Thread safe queue of frames left to render.
+
+    Chunks shrink as the queue drains (guided scheduling) so the last
+    frames are spread over all instances instead of one large chunk, and
+    are scaled by each worker's measured speed relative to the average so
+    slow nodes hold fewer frames. Frames handed to a worker that
+    disconnects are put back in the queue.
+    """
+
+    def __init__(self, frames: list, chunk_size: int = 10, workers: int = 1):
+        self.chunk_size = max(1, chunk_size)
+        self.workers = max(1, workers)
+        self.pending = deque(sorted(frames))
+        self.in_flight = {}
+        self.completed = set()
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.pending:
+            self.finished.set()
+
+    def register(self, worker: str, host: str) -> None:
+        with self.lock:
+            self.stats.setdefault(worker, WorkerStats(host))
+            self.workers = max(self.workers, len(self.stats))
+
+    def speed_factor(self, worker: str) -> float:
+        rates = [s.frames_per_second for s in self.stats.values()
+                 if s.frames_per_second]
+        stats = self.stats.get(worker)
+        if not rates or stats is None or not stats.frames_per_second:
+            return 1.0
+        factor = stats.frames_per_second / (sum(rates) / len(rates))
+        return min(MAX_SPEED_FACTOR, max(MIN_SPEED_FACTOR, factor))
+
+    def next_chunk(self, worker: str) -> list:
+        with self.lock:
+            size = min(self.chunk_size,
+                       max(1, len(self.pending) // (2 * self.workers)))
+            size = max(1, round(size * self.speed_factor(worker)))
+            chunk = []
+            while self.pending and len(chunk) < size:
+                frame = self.pending.popleft()
+                # Keep chunks evenly spaced so workers render them in one go
+                step = chunk[1] - chunk[0] if len(chunk) > 1 else None
+                if chunk and (frame <= chunk[-1] or
+                              step is not None and frame - chunk[-1] != step):
+                    self.pending.appendleft(frame)
+                    break
+                chunk.append(frame)
+            self.in_flight.setdefault(worker, set()).update(chunk)
+            return chunk
+
+    def next_work(self, worker: str) -> dict:
+        return {"frames": self.next_chunk(worker)}
+
+    def complete(self, worker: str, frames: list, seconds: float | None = None,
+                 job: int | None = None) -> None:
+        with self.lock:
+            self.in_flight.get(worker, set()).difference_update(frames)
+            self.completed.update(frames)
+            stats = self.stats.get(worker)
+            if stats is not None and seconds:
+                stats.frames += len(frames)
+                stats.seconds += seconds
+            self._update_finished()
+
+    def release(self, worker: str) -> list:
+        """Requeue the frames a worker was given but did not complete."""
+        with self.lock:
+            lost = sorted(self.in_flight.pop(worker, set()))
+            self.pending.extendleft(reversed(lost))
+            self._update_finished()
+            return lost
+
+    def _update_finished(self) -> None:
+        if not self.pending and not any(self.in_flight.values()):
+            self.finished.set()
+
+    @property
+    def remaining(self) -> int:
+        with self.lock:
+            return len(self.pending) + sum(map(len, self.in_flight.values()))
+
+    def node_stats(self) -> dict:
+        """Frames done and throughput per host."""
+        with self.lock:
+            nodes = {}
+            for stats in self.stats.values():
+                node = nodes.setdefault(
+                    stats.host, {"workers": 0, "frames": 0, "frames_per_minute": 0.0})
+                node["workers"] += 1
+                node["frames"] += stats.frames
+                if stats.frames_per_second:
+                    node["frames_per_minute"] += stats.frames_per_second * 60
+            return nodes
+
+
+class BatchQueue:
+    """
+    Several jobs sharing the same workers, one FrameQueue each.
+
+    Workers drain the jobs in order and move on to the next job as soon as
+    the current one has no frames left to hand out, while its last chunks
+    are still rendering elsewhere. Worker speed is measured across jobs.
+    """
+
+    def __init__(self, jobs: list, chunk_size: int = 10, workers: int = 1):
+        self.jobs = jobs
+        self.queues = [FrameQueue(job["frames"], chunk_size, workers) for job in jobs]
+        self.stats = {}
+        for queue in self.queues:
+            queue.stats = self.stats
+        self.finished = threading.Event()
+        self._update_finished()
+
+    def register(self, worker: str, host: str) -> None:
+        for queue in self.queues:
+            queue.register(worker, host)
+
+    def next_work(self, worker: str) -> dict:
+        for job, queue in zip(self.jobs, self.queues):
+            chunk = queue.next_chunk(worker)
+            if chunk:
+                settings = {k: v for k, v in job.items() if k != "frames"}
+                return {"frames": chunk, "job": settings}
+        return {"frames": []}
+
+    def complete(self, worker: str, frames: list, seconds: float | None = None,
+                 job: int | None = None) -> None:
+        self.queues[job or 0].complete(worker, frames, seconds)
+        self._update_finished()
+
+    def release(self, worker: str) -> list:
+        lost = []
+        for queue in self.queues:
+            lost.extend(queue.release(worker))
+        self._update_finished()
+        return lost
+
+    def _update_finished(self) -> None:
+        if all(queue.finished.is_set() for queue in self.queues):
+            self.finished.set()
+
+    def finished_jobs(self) -> list:
+        return [job["id"] for job, queue in zip(self.jobs, self.queues)
+                if queue.finished.is_set()]
+
+    @property
+    def remaining(self) -> int:
+        return sum(queue.remaining for queue in self.queues)
+
+    def node_stats(self) -> dict:
+        if not self.queues:
+            return {}
+        return self.queues[0].node_stats()
+
+
+class FrameQueueHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        queue = self.server.queue
+        worker = None
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if not self.server.authorized(message):
+                    self.wfile.write(b'{"error": "Invalid token"}\n')
+                    break
+                worker = message.get("worker", worker)
+                reply = self.server.dispatch(message)
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if worker is not None:
+                queue.release(worker)
+
+
+class FrameQueueServer(socketserver.ThreadingTCPServer):
+    """
+    Serve a FrameQueue. Bind to "0.0.0.0" to accept workers on other
+    machines; they need the token, the blend file path is sent to them.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue: FrameQueue | BatchQueue, host: str = "127.0.0.1", port: int = 0,
+                 blend_file: str = "", token: str | None = None):
+        self.queue = queue
+        self.blend_file = blend_file
+        self.token = token or secrets.token_hex(8)
+        self.thread = None
+        super().__init__((host, port), FrameQueueHandler)
+
+    @property
+    def address(self) -> tuple:
+        return self.server_address[:2]
+
+    def authorized(self, message: dict) -> bool:
+        return secrets.compare_digest(str(message.get("token", "")), self.token)
+
+    def dispatch(self, message: dict) -> dict:
+        worker = message.get("worker", "")
+        match message.get("op"):
+            case "register":
+                self.queue.register(worker, message.get("host", worker))
+                return {"blend_file": self.blend_file}
+            case "next":
+                return self.queue.next_work(worker)
+            case "done":
+                self.queue.complete(worker, message.get("frames", []),
+                                    message.get("seconds"), message.get("job"))
+                return {"ok": True}
+            case "stats":
+                return {"nodes": self.queue.node_stats()}
+        return {"error": f"Unknown op: {message.get('op')}"}
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
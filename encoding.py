@@ -0,0 +1,496 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+import json
+import math
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .segment_cache import CACHE_SEGMENT_FRAMES, SegmentCache, split_fixed_segments
+
+
+# Encoders offered in the UI when the local FFmpeg build has them. Their
+# position is the stored enum value, only ever append to this list
+WANTED_ENCODERS = ("libx264", "libx265", "libaom-av1", "libsvtav1", "libvpx-vp9")
+
+# Containers offered for output profiles, by file extension
+CONTAINERS = {'MP4': ".mp4", 'MKV': ".mkv", 'MOV': ".mov", 'WEBM': ".webm"}
+
+# Encoders a container is limited to, the others take every wanted encoder
+CONTAINER_ENCODERS = {'WEBM': ("libvpx-vp9", "libaom-av1", "libsvtav1")}
+
+# " V....D libx264   libx264 H.264 / AVC / MPEG-4 AVC (codec h264)"
+ENCODER_LINE_RE = re.compile(r"^\s*([VAS][.F][.S][.X][.B][.D])\s+(\S+)\s+(.*)$")
+PIXEL_FORMATS_RE = re.compile(r"Supported pixel formats:\s*(.+)")
+
+
+def parse_encoders(output: str) -> dict:
+    """Parse `ffmpeg -encoders` into {name: capabilities}."""
+    encoders = {}
+    for line in output.splitlines():
+        if match := ENCODER_LINE_RE.match(line):
+            flags, name, description = match.groups()
+            encoders[name] = {
+                "description": description.strip(),
+                "frame_threads": flags[1] == "F",
+                "slice_threads": flags[2] == "S",
+                "experimental": flags[3] == "X",
+                "pixel_formats": [],
+            }
+    return encoders
+
+
+def parse_pixel_formats(output: str) -> list:
+    """Parse the pixel formats out of `ffmpeg -h encoder=<name>`."""
+    if match := PIXEL_FORMATS_RE.search(output):
+        return match.group(1).split()
+    return []
+
+
+def probe_ffmpeg(ffmpeg: str, cache_path: Path) -> dict:
+    """
+    Capabilities of the wanted encoders available in the ffmpeg binary.
+
+    The result is cached on disk, keyed by the binary path, size and mtime
+    and the wanted encoders, so FFmpeg only gets probed again after it is
+    replaced or updated, or the list changes.
+    """
+    stat = os.stat(ffmpeg)
+    key = f"{ffmpeg}:{stat.st_size}:{stat.st_mtime_ns}:{','.join(WANTED_ENCODERS)}"
+
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+        if cache.get("key") == key:
+            return cache["encoders"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    def run(*args):
+        try:
+            return subprocess.run(
+                [ffmpeg, "-hide_banner", *args], capture_output=True,
+                text=True, errors="replace", timeout=30).stdout
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    found = parse_encoders(run("-encoders"))
+    encoders = {}
+    for name in WANTED_ENCODERS:
+        if name in found:
+            encoders[name] = found[name]
+            encoders[name]["pixel_formats"] = parse_pixel_formats(
+                run("-h", f"encoder={name}"))
+
+    try:
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump({"key": key, "encoders": encoders}, f, indent=1)
+    except OSError:
+        pass
+
+    return encoders
+
+
+def get_encoder_args(encoder: str, quality: int) -> list:
+    match encoder:
+        case "libx264":
+            return [
+                "-pix_fmt", "yuv420p",
+                "-c:v", encoder,
+                "-crf", f"{quality}"
+            ]
+        case "libx265":
+            return [
+                "-pix_fmt", "yuv420p",
+                "-c:v", encoder,
+                "-crf", f"{quality}",
+                "-tune", "fastdecode",
+                "-g", "1"
+            ]
+        case "libaom-av1":
+            return [
+                "-c:v", encoder,
+                "-crf", f"{quality}"
+            ]
+        case "libsvtav1":
+            return [
+                "-pix_fmt", "yuv420p",
+                "-c:v", encoder,
+                "-crf", f"{quality}"
+            ]
+        case "libvpx-vp9":
+            return [
+                "-pix_fmt", "yuv420p",
+                "-c:v", encoder,
+                "-crf", f"{quality}",
+                "-b:v", "0"
+            ]
+    return []
+
+
+def get_scale_filter(scale: int) -> str:
+    """Scale to scale percent, rounded down to even sizes for yuv420p."""
+    factor = scale / 100
+    return f"scale=trunc(iw*{factor}/2)*2:trunc(ih*{factor}/2)*2"
+
+
+def check_profiles(profiles: list) -> list:
+    """
+    Profiles without the ones repeating an earlier profile, which would
+    write the same file. Raises ValueError for an encoder its container
+    cannot hold.
+    """
+    unique = []
+    for profile in profiles:
+        allowed = CONTAINER_ENCODERS.get(profile["container"])
+        if allowed is not None and profile["encoder"] not in allowed:
+            raise ValueError(f"{profile['encoder']} cannot be written to "
+                             f"{profile['container']}, use {' or '.join(allowed)}")
+        if profile not in unique:
+            unique.append(profile)
+    return unique
+
+
+def get_output_args(profiles: list, output_files: list) -> list:
+    """
+    FFmpeg output arguments encoding the input to one file per profile.
+
+    Profiles are dicts of encoder, quality, scale (percent) and container.
+    With several profiles the input is decoded once and fanned out with
+    split, each branch scaled on its own, and every output is encoded in
+    the same FFmpeg run.
+    """
+    if len(profiles) == 1 and profiles[0]["scale"] == 100:
+        profile = profiles[0]
+        return get_encoder_args(profile["encoder"], profile["quality"]) + [
+            "-y", str(output_files[0])]
+
+    branches = [f"[s{i}]" for i in range(len(profiles))]
+    graph = [f"[0:v]split={len(profiles)}{''.join(branches)}"]
+    args = []
+    for i, (profile, output_file) in enumerate(zip(profiles, output_files)):
+        label = branches[i]
+        if profile["scale"] != 100:
+            graph.append(f"{label}{get_scale_filter(profile['scale'])}[v{i}]")
+            label = f"[v{i}]"
+        args += (["-map", label] +
+                 get_encoder_args(profile["encoder"], profile["quality"]) +
+                 ["-y", str(output_file)])
+    return ["-filter_complex", ";".join(graph)] + args
+
+
+def get_gop_size(encoder_args: list) -> int:
+    """GOP length forced by the encoder arguments, 1 if not fixed."""
+    if "-g" in encoder_args:
+        return max(1, int(encoder_args[encoder_args.index("-g") + 1]))
+    return 1
+
+
+def write_concat_list(path: Path, files: list, duration: float | None = None) -> Path:
+    # Write the frame list with properly quoted full paths
+    with open(path, "w") as frame_list:
+        for file in files:
+            quoted_file = shlex.quote(str(file))  # Quote the full file path
+            # Full path safely quoted
+            frame_list.write(f"file {quoted_file}\n")
+            if duration is not None:
+                frame_list.write(f"duration {duration}\n")
+    return path
+
+
+def split_segments(files: list, jobs: int, gop: int = 1) -> list:
+    """
+    Split files into at most jobs segments whose lengths are multiples of
+    gop, so every segment boundary falls on a keyframe.
+    """
+    if not files:
+        return []
+    size = math.ceil(len(files) / max(1, jobs))
+    size = math.ceil(size / gop) * gop
+    return [files[i:i + size] for i in range(0, len(files), size)]
+
+
+def get_pipe_decoder(path: str) -> str:
+    return "mjpeg" if Path(path).suffix.lower() in {".jpg", ".jpeg"} else "png"
+
+
+def get_stream_command_list(encoder: str, quality: int, fps: float,
+                            decoder: str, output_file: Path) -> list:
+    """FFmpeg command reading image files back to back from stdin."""
+    return [
+        "ffmpeg",
+        "-f", "image2pipe",
+        "-framerate", f"{fps}",
+        "-c:v", decoder,
+        "-i", "-",
+    ] + get_encoder_args(encoder, quality) + ["-y", str(output_file)]
+
+
+class EncoderBase:
+    """Timing and finish notification shared by the encoders."""
+
+    def __init__(self):
+        self.started = None
+        self.finished = None
+        self.returncode = None
+        self.frames_written = 0
+        self.finish_lock = threading.Lock()
+        self.finish_listeners = []
+
+    @property
+    def seconds(self) -> float | None:
+        if self.started is None:
+            return None
+        return (self.finished or time.monotonic()) - self.started
+
+    def add_finish_listener(self, func) -> None:
+        """Call func(encoder) once encoding ended, right away if it has."""
+        with self.finish_lock:
+            if self.finished is None:
+                self.finish_listeners.append(func)
+                return
+        func(self)
+
+    def _notify_finished(self) -> None:
+        with self.finish_lock:
+            self.finished = time.monotonic()
+            listeners = list(self.finish_listeners)
+        for func in listeners:
+            func(self)
+
+
+class StreamingEncoder(EncoderBase):
+    """
+    Feed rendered frames to FFmpeg while the render is still running.
+
+    Frames are written in order as soon as the contiguous prefix of the
+    sequence is complete, so only the frames rendered last are left to
+    encode when the instances exit. Frames still missing when finish()
+    is called are left out of the video.
+    """
+
+    def __init__(self, cmd: list, paths: dict, log_path: Path):
+        super().__init__()
+        self.cmd = cmd
+        self.frames = sorted(paths)
+        self.paths = paths
+        self.log_path = Path(log_path)
+        self.ready = set()
+        self.finishing = False
+        self.condition = threading.Condition()
+        self.process = None
+        self.feeder = None
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "w") as log:
+            self.process = subprocess.Popen(
+                self.cmd, stdin=subprocess.PIPE,
+                stdout=log, stderr=subprocess.STDOUT)
+        self.feeder = threading.Thread(target=self._feed, daemon=True)
+        self.feeder.start()
+
+    def frame_done(self, frame: int, *_args) -> None:
+        """Mark a frame as completely written, safe to call from any thread."""
+        with self.condition:
+            self.ready.add(frame)
+            self.condition.notify()
+
+    def finish(self) -> None:
+        """No more frames will be rendered, encode what is left and stop."""
+        with self.condition:
+            self.finishing = True
+            self.condition.notify()
+
+    def _next_frame(self, index: int) -> int | None:
+        """Wait until frame at index can be written, None to skip it."""
+        frame = self.frames[index]
+        with self.condition:
+            while frame not in self.ready and not self.finishing:
+                self.condition.wait()
+            if frame in self.ready:
+                return frame
+        return frame if Path(self.paths[frame]).is_file() else None
+
+    def _feed(self) -> None:
+        try:
+            for index in range(len(self.frames)):
+                frame = self._next_frame(index)
+                if frame is None:
+                    continue
+                with open(self.paths[frame], "rb") as f:
+                    self.process.stdin.write(f.read())
+                self.frames_written += 1
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        self.returncode = self.process.wait()
+        self._notify_finished()
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def terminate(self) -> None:
+        self.finish()
+        if self.running:
+            self.process.terminate()
+
+
+class SegmentedEncoder(EncoderBase):
+    """
+    Encode a frame sequence as segments in parallel and join them with the
+    concat demuxer without re-encoding.
+
+    Each segment starts on a keyframe and uses the same encoder settings
+    and frame rate, so the joined file plays back like a single pass.
+    Runs on a background thread, check running / returncode.
+
+    With a cache, segments have a fixed length and segments whose frames
+    and settings are unchanged are reused instead of encoded again.
+    """
+
+    def __init__(self, files: list, encoder_args: list, fps: float,
+                 output_file: Path, work_dir: Path, jobs: int, log_path: Path,
+                 cache: SegmentCache | None = None):
+        super().__init__()
+        self.cache = cache
+        self.cached_segments = 0
+        self.cancelled = False
+        self.processes = []
+        self.lock = threading.Lock()
+        self.files = files
+        self.encoder_args = encoder_args
+        self.fps = fps
+        self.output_file = Path(output_file)
+        self.work_dir = Path(work_dir)
+        self.jobs = max(1, jobs)
+        self.log_path = Path(log_path)
+        self.thread = None
+
+    def get_segment_command_list(self, frame_list: Path, output: Path) -> list:
+        return [
+            "ffmpeg",
+            "-safe", "0",
+            "-r", f"{self.fps}",
+            "-f", "concat",
+            "-i", str(frame_list),
+        ] + self.encoder_args + ["-y", str(output)]
+
+    def get_join_command_list(self, segment_list: Path) -> list:
+        return [
+            "ffmpeg",
+            "-safe", "0",
+            "-f", "concat",
+            "-i", str(segment_list),
+            "-c", "copy",
+            "-y", str(self.output_file),
+        ]
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def terminate(self) -> None:
+        """Stop the FFmpeg processes, no new one is started."""
+        with self.lock:
+            self.cancelled = True
+            for process in self.processes:
+                if process.poll() is None:
+                    process.terminate()
+
+    def run_process(self, cmd: list, **kwargs) -> subprocess.CompletedProcess:
+        """subprocess.run() unless terminated, returncode -1 if not run."""
+        with self.lock:
+            if self.cancelled:
+                return subprocess.CompletedProcess(cmd, -1, "", "")
+            process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, **kwargs)
+            self.processes.append(process)
+        stdout, stderr = process.communicate()
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def run(self) -> int:
+        self.started = time.monotonic()
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        duration = 1 / self.fps
+        suffix = self.output_file.suffix
+        gop = get_gop_size(self.encoder_args)
+        if self.cache is not None:
+            segments = split_fixed_segments(self.files, CACHE_SEGMENT_FRAMES, gop)
+        else:
+            segments = split_segments(self.files, self.jobs, gop)
+
+        commands = []
+        outputs = []
+        keys = {}
+        for i, segment in enumerate(segments):
+            if self.cache is not None:
+                key = self.cache.get_key(segment, self.encoder_args, self.fps)
+                if (cached := self.cache.get(key, suffix)) is not None:
+                    outputs.append(cached)
+                    self.cached_segments += 1
+                    continue
+            frame_list = write_concat_list(
+                self.work_dir / f"segment_{i:03d}.txt", segment, duration)
+            output = self.work_dir / f"segment_{i:03d}{suffix}"
+            commands.append(self.get_segment_command_list(frame_list, output))
+            outputs.append(output)
+            if self.cache is not None:
+                keys[len(outputs) - 1] = key
+
+        with open(self.log_path, "w") as log:
+            def encode(cmd):
+                return self.run_process(
+                    cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                    text=True, errors="replace")
+
+            with ThreadPoolExecutor(self.jobs) as executor:
+                results = list(executor.map(encode, commands))
+
+            for result in results:
+                log.write(result.stderr or "")
+
+            self.returncode = next(
+                (r.returncode for r in results if r.returncode), 0)
+            if self.returncode == 0:
+                for index, key in keys.items():
+                    try:
+                        outputs[index] = self.cache.put(key, suffix, outputs[index])
+                    except OSError as e:
+                        log.write(f"Segment not cached: {e}\n")
+            if self.returncode == 0 and outputs:
+                segment_list = write_concat_list(
+                    self.work_dir / "segments.txt", outputs)
+                self.returncode = self.run_process(
+                    self.get_join_command_list(segment_list),
+                    stdout=log, stderr=subprocess.STDOUT).returncode
+
+        if self.returncode == 0:
+            self.frames_written = len(self.files)
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+        if self.cache is not None:
+            self.cache.save_index()
+            self.cache.evict(set(outputs))
+        self._notify_finished()
+        return self.returncode
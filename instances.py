@@ -0,0 +1,260 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+import logging
+import logging.handlers
+import os
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+
+from .progress import JobProgress
+from .resources import (
+    apply_process_limits,
+    get_low_priority_flags,
+    get_process_group_flags,
+    kill_process_group,
+    resume_process_group,
+    suspend_process_group,
+)
+
+
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_TAIL_LINES = 200
+
+
+class RenderInstance:
+    """
+    One background process whose output is streamed to a rotating log file.
+
+    Only the last LOG_TAIL_LINES lines are kept in memory. The process
+    gets its own process group so kill() also ends what it started.
+    frames are the frames it was given, None when it pulls them from a queue.
+    """
+
+    def __init__(self, index: int, cmd: list, log_path: Path, shell: bool = False,
+                 cpus: list | None = None, nice: int = 0, frames: list | None = None):
+        self.index = index
+        self.cmd = cmd
+        self.frames = frames
+        self.killed = False
+        self.suspended = False
+        self.log_path = Path(log_path)
+        self.shell = shell
+        self.cpus = cpus
+        self.nice = nice
+        self.tail = deque(maxlen=LOG_TAIL_LINES)
+        self.listeners = []
+        self.process = None
+        self.progress = None
+        self.reader = None
+        self.logger = None
+
+    def start(self) -> None:
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            self.log_path, maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self.logger = logging.getLogger(
+            f"rmi.instance.{id(self)}.{self.index}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(handler)
+
+        self.process = subprocess.Popen(
+            self.cmd,
+            shell=self.shell,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            bufsize=1,
+            creationflags=((get_low_priority_flags() if self.nice else 0) |
+                           get_process_group_flags()),
+            start_new_session=os.name != "nt",
+        )
+        apply_process_limits(self.process.pid, self.cpus, self.nice)
+        self.reader = threading.Thread(target=self._read_output, daemon=True)
+        self.reader.start()
+
+    def _read_output(self) -> None:
+        for line in self.process.stdout:
+            line = line.rstrip("\n")
+            self.tail.append(line)
+            for listener in self.listeners:
+                listener(line)
+            self.logger.info(line)
+        self.process.stdout.close()
+
+    def add_listener(self, func) -> None:
+        """Call func(line) from the reader thread for every output line."""
+        self.listeners.append(func)
+
+    def poll(self) -> int | None:
+        return self.process.poll() if self.process else None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def kill(self) -> None:
+        if self.process is not None:
+            self.killed = True
+            kill_process_group(self.process)
+
+    def suspend(self) -> bool:
+        """Pause the process group, False where unsupported."""
+        if self.process is not None and suspend_process_group(self.process):
+            self.suspended = True
+        return self.suspended
+
+    def resume(self) -> None:
+        if self.suspended:
+            resume_process_group(self.process)
+            self.suspended = False
+            if self.progress is not None:
+                # Time spent paused does not count as hung
+                self.progress.last_frame = self.progress.last_activity = self.progress.clock()
+
+    def close(self) -> None:
+        if self.reader is not None:
+            self.reader.join(timeout=5)
+        if self.logger is not None:
+            for handler in list(self.logger.handlers):
+                handler.close()
+                self.logger.removeHandler(handler)
+
+
+class InstancePool:
+    """
+    Non-blocking group of render instances.
+
+    Meant to be polled from a timer (modal operator) or a loop; cleanup
+    callbacks run once every instance has exited. A watchdog, when set,
+    is checked on every poll and may add replacement instances. With
+    admission control, instances are started (and paused) by it instead
+    of all at once.
+    """
+
+    def __init__(self, progress: JobProgress | None = None):
+        self.progress = progress
+        self.encoder = None
+        self.mover = None
+        self.server = None
+        # Input hashes to record once the render is done, see render_cache
+        self.input_hashes = None
+        self.watchdog = None
+        self.admission = None
+        self.instances = []
+        # Instances whose frames were handed to a replacement
+        self.replaced = set()
+        self.cancelled = False
+        self.instance_listeners = []
+        self.busy_checks = []
+        self.cleanups = []
+        self.spawn_listeners = []
+        self.exit_listeners = []
+        self.exited = set()
+        self.closed = False
+
+    def add(self, instance: RenderInstance) -> RenderInstance:
+        if self.progress is not None:
+            instance.progress = self.progress.add_instance()
+            instance.add_listener(instance.progress.feed)
+        self.instances.append(instance)
+        for func in self.instance_listeners:
+            func(instance)
+        return instance
+
+    def add_instance_listener(self, func) -> None:
+        """
+        Call func(instance) for every instance, before it starts: right
+        away for the ones already added, later for the ones added later.
+        """
+        self.instance_listeners.append(func)
+        for instance in self.instances:
+            func(instance)
+
+    def add_busy_check(self, func) -> None:
+        """Keep the pool running while func() is True, e.g. remote work."""
+        self.busy_checks.append(func)
+
+    def add_cleanup(self, func) -> None:
+        self.cleanups.append(func)
+
+    def add_spawn_listener(self, func) -> None:
+        """Call func(instance) once an instance process is started."""
+        self.spawn_listeners.append(func)
+
+    def add_exit_listener(self, func) -> None:
+        """Call func(instance) from poll() once an instance has exited."""
+        self.exit_listeners.append(func)
+
+    def start(self) -> None:
+        if self.admission is not None:
+            self.admission.start(self)
+            return
+        for instance in self.instances:
+            self.start_instance(instance)
+
+    def start_instance(self, instance: RenderInstance) -> None:
+        if instance.progress is not None:
+            # Instances held back start their clock now
+            progress = instance.progress
+            progress.started = progress.last_output = progress.last_frame = \
+                progress.last_activity = progress.clock()
+        instance.start()
+        for func in self.spawn_listeners:
+            func(instance)
+
+    def cancel(self) -> None:
+        """Kill every instance and stop encoding, poll() then winds down."""
+        self.cancelled = True
+        for instance in self.instances:
+            instance.kill()
+        if self.encoder is not None:
+            self.encoder.terminate()
+
+    def poll(self) -> bool:
+        """Return True while any instance is still running."""
+        if self.watchdog is not None and not self.cancelled:
+            self.watchdog.check(self)
+        if self.admission is not None and not self.cancelled:
+            self.admission.check(self)
+        for instance in list(self.instances):
+            if instance.index not in self.exited and instance.poll() is not None:
+                self.exited.add(instance.index)
+                # Let listeners see the last output lines first
+                if instance.reader is not None:
+                    instance.reader.join(timeout=5)
+                for func in self.exit_listeners:
+                    func(instance)
+        if any(instance.running for instance in self.instances):
+            return True
+        if not self.cancelled and any(check() for check in self.busy_checks):
+            return True
+        self.close()
+        return False
+
+    @property
+    def returncodes(self) -> list:
+        """Exit codes, except of instances that were replaced."""
+        return [instance.poll() for instance in self.instances
+                if instance.index not in self.replaced]
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        for instance in self.instances:
+            instance.close()
+        for func in self.cleanups:
+            func()
@@ -0,0 +1,205 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Launching render instances without bpy: Blender command lines, instance
+pools and their watchdog and admission control. Settings are read from a
+props-like object (RMI_Props in Blender, a RenderJob on the command line).
+"""
+
+import os
+import platform
+import shlex
+import subprocess
+from enum import Enum
+from pathlib import Path
+
+from .scheduling import get_frame_args
+from .instances import RenderInstance, InstancePool
+from .sequence import check_frames
+from .encoding import CONTAINERS
+from .resources import get_cpu_sets, BACKGROUND_NICE
+from .batch import PROBE_EXPR, parse_probe_output
+from .watchdog import Watchdog
+from .admission import AdmissionControl
+
+
+EXTENSIONS = ('png', 'jpg', 'jpeg')
+
+
+class OS(Enum):
+    WINDOWS = "Windows"
+    MACOS = "MacOS"
+    LINUX = "Linux"
+    UNKNOWN = "Unknown"
+
+    @staticmethod
+    def detect_os():
+        system = platform.system()
+        if system == "Windows":
+            return OS.WINDOWS
+        elif system == "Darwin":
+            return OS.MACOS
+        elif system == "Linux":
+            return OS.LINUX
+        else:
+            return OS.UNKNOWN
+
+
+def get_output_dir(filepath_str: str) -> Path:
+    """Directory of an absolute render output path, see get_export_dir()."""
+    filepath = Path(filepath_str)
+
+    # Check if the path is a directory path or ends with a separator
+    if filepath.is_dir() or filepath_str.endswith('/'):
+        # Return as-is if it's a directory path or ends with a separator
+        return filepath
+
+    # Return the parent directory with a trailing slash
+    return filepath.parent / ''
+
+
+def get_video_path(flipbook_dir: Path, encoder: str, quality: int,
+                   scale: int = 100, container: str = 'MP4') -> Path:
+    flipbook_dir = Path(flipbook_dir)
+    name = f"{flipbook_dir.name}_{encoder}_{quality}"
+    if scale != 100:
+        name += f"_{scale}pct"
+    return flipbook_dir.parent / f"{name}{CONTAINERS[container]}"
+
+
+def get_worker_script_path() -> Path:
+    return Path(__file__).parent / "worker.py"
+
+
+def remove_invalid_frames(paths: dict) -> tuple:
+    """Delete broken frame files, returns (missing, invalid) frames."""
+    missing, invalid = check_frames(paths)
+    for frame in invalid:
+        try:
+            os.remove(paths[frame])
+        except FileNotFoundError:
+            pass
+    if invalid:
+        print(f"RMI: removed {len(invalid)} invalid frames: {invalid}")
+    return missing, invalid
+
+
+def get_thread_args(threads: int) -> list:
+    return ["-t", f"{threads}"] if threads else []
+
+
+def build_render_command(blender: Path, blend_file: Path, frames: list,
+                         threads: int = 0, args: list = ()) -> list:
+    """
+    Blender command line rendering frames of blend_file. args (e.g. -S
+    scene, -o output) go before the frame arguments, which come last.
+    """
+    return ([Path(blender).as_posix(), "-b", Path(blend_file).as_posix()] +
+            get_thread_args(threads) + list(args) + get_frame_args(frames))
+
+
+def build_worker_command(blender: Path, blend_file: Path, port: int, token: str,
+                         threads: int = 0, args: list = ()) -> list:
+    """Blender command line pulling frames from the coordinator on port."""
+    return ([Path(blender).as_posix(), "-b", Path(blend_file).as_posix()] +
+            get_thread_args(threads) + list(args) + [
+                "--python", get_worker_script_path().as_posix(),
+                "--", "--host", "127.0.0.1", "--port", f"{port}",
+                "--token", token])
+
+
+def probe_scenes(blender: Path, blend_file: Path, timeout: float = 300) -> dict:
+    """Scenes of blend_file, read by a background Blender."""
+    cmd = [Path(blender).as_posix(), "-b", Path(blend_file).as_posix(),
+           "--factory-startup", "--python-expr", PROBE_EXPR]
+    result = subprocess.run(cmd, capture_output=True, text=True,
+                            timeout=timeout)
+    return parse_probe_output(result.stdout)
+
+
+def get_platform_terminal_command_list(command_list: list) -> list:
+    cmd = []
+    match OS.detect_os():
+        case OS.WINDOWS:
+            return ["start", "cmd", '/c'] + command_list
+        case OS.MACOS:
+            # Escape the command for use in AppleScript
+            escaped_cmd = ' '.join(shlex.quote(arg) for arg in command_list)
+            apple_script = f'''
+            tell application "Terminal"
+                do script "{escaped_cmd}"
+                activate
+            end tell
+            '''
+            return ['osascript', '-e', apple_script]
+        case OS.LINUX:
+            return ["x-terminal-emulator", "-e"] + command_list
+        case OS.UNKNOWN:
+            raise RuntimeError("Unsupported platform")
+
+    # print(f"Command list: {cmd}")
+    return cmd
+
+
+def get_instance_cpu_sets(props, count: int) -> list:
+    """CPUs each instance is pinned to (and threads it uses), None for all."""
+    if not props.thread_budget or not count:
+        return [None] * count
+    return get_cpu_sets(count)
+
+
+def add_render_instances(props, pool: InstancePool, commands: list,
+                         cpu_sets: list, log_dir: Path,
+                         frame_sets: list | None = None) -> None:
+    """
+    Add an instance per command, in a terminal unless headless. Terminal
+    instances are not pinned or reniced: the process started is the
+    terminal launcher, which may not be Blender's parent.
+    """
+    shell = not props.headless and OS.detect_os() == OS.WINDOWS
+    nice = BACKGROUND_NICE if props.low_priority and props.headless else 0
+    frame_sets = frame_sets or [None] * len(commands)
+    for i, (cmd, cpus, frames) in enumerate(zip(commands, cpu_sets, frame_sets)):
+        if not props.headless:
+            cmd = get_platform_terminal_command_list(cmd)
+            cpus = None
+        pool.add(RenderInstance(
+            i, cmd, log_dir / f"instance_{i:02d}.log", shell=shell,
+            cpus=cpus, nice=nice, frames=frames))
+
+
+def start_watchdog(props, pool: InstancePool, log_dir: Path,
+                   frame_paths: dict) -> Watchdog | None:
+    """
+    Watch the headless instances of pool for hangs, see Watchdog.
+    frame_paths are the files instances save, used to remove the frame a
+    killed instance was writing since instances do not overwrite.
+    """
+    if not props.watchdog or not props.headless:
+        return None
+
+    def respawn(instance, frames, index):
+        broken = frames if frames is not None else [instance.progress.current_frame]
+        remove_invalid_frames({f: frame_paths[f] for f in broken if f in frame_paths})
+        cmd = instance.cmd
+        if frames is not None:
+            # Same command line, with only the unfinished frames
+            kept = len(instance.cmd) - len(get_frame_args(instance.frames))
+            cmd = instance.cmd[:kept] + get_frame_args(frames)
+        return RenderInstance(index, cmd, log_dir / f"instance_{index:02d}.log",
+                              cpus=instance.cpus, nice=instance.nice, frames=frames)
+
+    pool.watchdog = Watchdog(props.hang_timeout, props.max_restarts, respawn)
+    return pool.watchdog
+
+
+def start_admission(props, pool: InstancePool) -> AdmissionControl | None:
+    """Start the headless instances of pool as memory allows."""
+    if not props.memory_admission or not props.headless:
+        return None
+    pool.admission = AdmissionControl(props.memory_headroom * 1024 * 1024)
+    return pool.admission
@@ -0,0 +1,226 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Structured events of render and encode runs, one JSON object per line:
+
+    {"ts": 1718000000.0, "event": "frame_finish", "job": "shot/render/20240610_101500",
+     "host": "ws-01", "instance": 2, "frame": 12, "seconds": 41.2,
+     "path": "/renders/shot_0012.png", "bytes": 1843200}
+
+Events: job_start, job_end, instance_spawn, instance_exit, frame_start,
+frame_finish, encode_start, encode_finish. Totals can also be exported
+in the Prometheus textfile format for node_exporter's textfile collector.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+
+# Seconds between textfile updates while frames are rendering
+TEXTFILE_INTERVAL = 15.0
+
+
+class HostStats:
+
+    def __init__(self):
+        self.frames = 0
+        self.seconds = 0.0
+
+
+class EventLog:
+    """
+    Thread safe JSON-lines event writer, also keeping the totals exported
+    to the Prometheus textfile.
+    """
+
+    def __init__(self, path: Path, job: str, textfile: Path | None = None,
+                 clock=time.time):
+        self.path = Path(path)
+        self.job = job
+        self.textfile = Path(textfile) if textfile else None
+        self.clock = clock
+        self.host = socket.gethostname()
+        self.lock = threading.Lock()
+        self.textfile_lock = threading.Lock()
+        self.pool = None
+        self.started = None
+        self.finished = None
+        self.hosts = {}
+        self.failed_instances = 0
+        self.encodes = []
+        self.textfile_written = 0.0
+
+    def emit(self, event: str, **fields) -> dict:
+        record = {"ts": self.clock(), "event": event, "job": self.job,
+                  "host": self.host}
+        record.update(fields)
+        with self.lock:
+            # Reopened for every event, encodes may finish long after the job
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+    def job_start(self, **fields) -> None:
+        self.started = self.clock()
+        self.emit("job_start", **fields)
+
+    def job_end(self, **fields) -> None:
+        self.finished = self.clock()
+        self.emit("job_end", seconds=self.finished - (self.started or self.finished),
+                  failed_instances=self.failed_instances, **fields)
+        self.write_textfile()
+
+    def watch_pool(self, pool) -> None:
+        """Log instance and frame events of pool, call before pool.start()."""
+        self.pool = pool
+        pool.add_spawn_listener(self.instance_spawned)
+        pool.add_exit_listener(self.instance_exited)
+        pool.add_instance_listener(self.watch_instance)
+
+    def watch_instance(self, instance) -> None:
+        """Log the frames of instance, from the progress the pool parses."""
+        if instance.progress is None:
+            return
+        instance.progress.add_frame_listener(
+            lambda frame, path, seconds, i=instance.index:
+                self.frame_finished(i, frame, path, seconds))
+        instance.progress.add_start_listener(
+            lambda frame, i=instance.index:
+                self.emit("frame_start", instance=i, frame=frame))
+
+    def instance_spawned(self, instance) -> None:
+        self.emit("instance_spawn", instance=instance.index,
+                  pid=instance.process.pid, cpus=instance.cpus)
+
+    def instance_exited(self, instance) -> None:
+        returncode = instance.poll()
+        if returncode:
+            self.failed_instances += 1
+        self.emit("instance_exit", instance=instance.index, returncode=returncode,
+                  killed=instance.killed)
+
+    def frame_finished(self, instance: int, frame: int, path: str,
+                       seconds: float) -> None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        self.emit("frame_finish", instance=instance, frame=frame,
+                  seconds=seconds, path=path, bytes=size)
+        with self.lock:
+            stats = self.hosts.setdefault(self.host, HostStats())
+            stats.frames += 1
+            stats.seconds += seconds
+        if self.clock() - self.textfile_written >= TEXTFILE_INTERVAL:
+            self.write_textfile()
+
+    def watch_encoder(self, encoder, **fields) -> None:
+        """Log the start of encoder and its finish with the fps achieved."""
+        self.emit("encode_start", **fields)
+        encoder.add_finish_listener(lambda e: self.encode_finished(e, fields))
+
+    def encode_finished(self, encoder, fields: dict) -> None:
+        seconds = encoder.seconds
+        frames = encoder.frames_written
+        fps = frames / seconds if seconds else None
+        self.encodes.append((seconds, fps))
+        self.emit("encode_finish", returncode=encoder.returncode,
+                  seconds=seconds, frames=frames, fps=fps, **fields)
+        self.write_textfile()
+
+    def get_host_frames(self) -> dict:
+        """Frames and frames per hour by host, remote workers included."""
+        with self.lock:
+            end = self.finished or self.clock()
+            hours = max(end - (self.started or end), 1e-9) / 3600
+            hosts = {host: {"frames": stats.frames,
+                            "frame_seconds": stats.seconds,
+                            "frames_per_hour": stats.frames / hours}
+                     for host, stats in self.hosts.items()}
+        server = getattr(self.pool, "server", None)
+        if server is not None:
+            for host, node in server.queue.node_stats().items():
+                if host == self.host and host in hosts:
+                    continue
+                hosts[host] = {"frames": node["frames"], "frame_seconds": None,
+                               "frames_per_hour": node["frames_per_minute"] * 60}
+        return hosts
+
+    def write_textfile(self) -> None:
+        if self.textfile is None:
+            return
+        with self.textfile_lock:
+            self.textfile_written = self.clock()
+            write_prometheus_textfile(self.textfile, self.get_metrics())
+
+    def get_metrics(self) -> list:
+        """(name, type, help, labels, value) tuples."""
+        job = {"job_id": self.job}
+        metrics = []
+        for host, stats in sorted(self.get_host_frames().items()):
+            labels = dict(job, host=host)
+            metrics.append(("rmi_frames_total", "counter",
+                            "Frames rendered", labels, stats["frames"]))
+            metrics.append(("rmi_frames_per_hour", "gauge",
+                            "Frames rendered per hour", labels,
+                            stats["frames_per_hour"]))
+            if stats["frame_seconds"] is not None:
+                metrics.append(("rmi_frame_seconds_total", "counter",
+                                "Time spent rendering frames", labels,
+                                stats["frame_seconds"]))
+        metrics.append(("rmi_instance_failures_total", "counter",
+                        "Instances that exited with an error", job,
+                        self.failed_instances))
+        if self.started is not None:
+            end = self.finished or self.clock()
+            metrics.append(("rmi_job_duration_seconds", "gauge",
+                            "Job wall time", job, end - self.started))
+        if self.encodes:
+            seconds, fps = self.encodes[-1]
+            metrics.append(("rmi_encode_seconds", "gauge",
+                            "Duration of the last encode", job, seconds))
+            if fps is not None:
+                metrics.append(("rmi_encode_frames_per_second", "gauge",
+                                "Frames per second of the last encode", job, fps))
+        return metrics
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"'
+                          for key, value in sorted(labels.items())) + "}"
+
+
+def write_prometheus_textfile(path: Path, metrics: list) -> None:
+    """Write metrics atomically, node_exporter must never read a partial file."""
+    path = Path(path)
+    # Samples of a metric have to follow its HELP and TYPE lines
+    grouped = {}
+    for name, kind, help_text, labels, value in metrics:
+        grouped.setdefault((name, kind, help_text), []).append((labels, value))
+
+    lines = []
+    for (name, kind, help_text), samples in grouped.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{format_labels(labels)} {float(value):g}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
@@ -7,33 +7,77 @@
 import bpy
 
 from bpy.types import Operator
+from pathlib import Path
 
+from .preview import restore_overrides
 from .utils import (
     open_directory,
     get_blend_file,
     get_absolute_path,
     get_export_dir,
+    get_log_dir,
+    get_remote_worker_command,
+    create_event_log,
+    record_frame_times,
     flipbook_render_output_path,
-    ffmpeg_installed,
-    get_ffmpeg_command_list,
-    save_blend_file,
-    start_process,
+    is_ffmpeg_installed,
+    save_job_file,
+    remove_job_file,
+    start_encode,
+    get_output_profiles,
     rendered_frames_exist,
+    apply_preview_profile,
+    use_scratch_staging,
+    get_scratch_dir,
+    get_scratch_output_path,
     start_render_instances,
+    start_raw_instances,
+    has_plain_srgb_view,
+    resolve_batch_jobs,
+    start_batch_instances,
+    start_job_encode,
 )
 
 
+def tag_properties_redraw(context):
+    for area in context.screen.areas:
+        if area.type == 'PROPERTIES':
+            area.tag_redraw()
+
+
+def release_job_file(job_file, headless: bool) -> None:
+    """
+    Remove job_file once its instances are done. Terminal instances are not
+    owned by the pool and may still read it, their job files are left to
+    remove_old_job_files().
+    """
+    if headless:
+        remove_job_file(job_file)
+
+
 class RenderFlipbookOperatorBase:
     """
     Handle rendering
     Steps:
         1. Store scene settings
-        2. Save file
-        3. Update settings from properties
-        4. Call render
-        5. Restore settings
+        2. Update settings from properties
+        3. Call render (instances render a snapshot job file and are
+           watched from a modal timer)
+        4. Restore settings
+        5. Encode and remove the job file once rendering is done
     """
 
+    # Pool of the render currently running, shown in the panel
+    active_pool = None
+    # Background encoders started by any operator, stopped by Cancel
+    active_encoders = []
+
+    @classmethod
+    def track_encoder(cls, encoder) -> None:
+        cls.active_encoders = [e for e in cls.active_encoders if e.running]
+        if encoder is not None:
+            cls.active_encoders.append(encoder)
+
     def store_render_settings(self, context):
         self.original_settings = {
             'use_stamp': context.scene.render.use_stamp,
@@ -45,8 +89,11 @@ class RenderFlipbookOperatorBase:
             'frame_start': context.scene.frame_start,
             'frame_end': context.scene.frame_end,
         }
+        self.preview_settings = {}
 
     def restore_render_settings(self, context):
+        restore_overrides(context.scene, self.preview_settings)
+        self.preview_settings = {}
         for key, value in self.original_settings.items():
             if key == 'file_format':
                 context.scene.render.image_settings.file_format = value
@@ -68,45 +115,153 @@ class RenderFlipbookOperatorBase:
             context.scene.render.image_settings.file_format = props.file_format
             context.scene.render.use_stamp = props.use_stamp
 
+        # Cheaper settings for the Flipbook Render instances, saved into
+        # the job file only
+        if render_type == 'flipbook_render' and props.preview_profile:
+            self.preview_settings = apply_preview_profile(context)
+
         # Render and Flipbook shared settings
+        # Instances get disjoint frame sets, placeholders are not needed
         context.scene.render.use_overwrite = False
-        context.scene.render.use_placeholder = True
+        context.scene.render.use_placeholder = False
         if props.override_range:
             context.scene.frame_start = props.start_frame
             context.scene.frame_end = props.end_frame
 
     def execute_render(self, context, render_func):
         self.store_render_settings(context)
+        self.pool = None
+        self.job_file = None
+        self.events = None
+        self.headless = context.scene.RMI_Props.headless
 
         try:
+            if 'flipbook' in self.render_type and context.scene.RMI_Props.auto_encode:
+                # Output profiles FFmpeg would reject fail before rendering
+                get_output_profiles(context.scene.RMI_Props)
+
             self.update_render_settings(context, self.render_type)
 
-            save_blend_file()
+            self.export_dir = get_export_dir()
 
-            render_func()
+            self.pool = render_func()
 
         except Exception as e:
             self.report({'ERROR'}, f"Failed to create flipbook: {str(e)}")
+            if self.events is not None:
+                self.events.job_end(status="error", error=str(e))
+            self.restore_render_settings(context)
+            self.finish_render(context)
             return {'CANCELLED'}
-        finally:
-
-            export_dir = get_export_dir()
-            if (export_dir.is_dir() and
-                rendered_frames_exist(export_dir) and
-                ffmpeg_installed and
-                context.scene.RMI_Props.auto_encode and
-                    'flipbook' in self.render_type):
-                bpy.ops.rmi.ffmpeg_encode()
-            else:
-                self.report({'INFO'}, "Encoding Skipped.")
 
-            self.restore_render_settings(context)
-            save_blend_file()
+        # Instances render the job file, the scene can be restored right away
+        self.restore_render_settings(context)
+
+        if self.pool is not None:
+            # Instances run in the background, check on them from a timer
+            RenderFlipbookOperatorBase.active_pool = self.pool
+            wm = context.window_manager
+            self.timer = wm.event_timer_add(0.5, window=context.window)
+            wm.modal_handler_add(self)
+            return {'RUNNING_MODAL'}
 
+        self.finish_render(context)
         self.report({'INFO'}, f"{self.render_type} Created")
 
         return {'FINISHED'}
 
+    def start_instances(self, context, stream_encode=False, raw=False):
+        """
+        Render a snapshot of the scene, never the user's main file.
+        With raw, frames are piped to FFmpeg instead of saved.
+        """
+        props = context.scene.RMI_Props
+        if raw:
+            self.job_file = save_job_file()
+            self.events = create_event_log(context, self.render_type, get_log_dir())
+            return start_raw_instances(context, self.job_file, self.events)
+
+        scratch_dir = None
+        output_path = None
+        if use_scratch_staging(props):
+            # Instances save to local scratch, frames are moved afterwards
+            scratch_dir = get_scratch_dir(props)
+            output_path = get_scratch_output_path(scratch_dir)
+        self.job_file = save_job_file(output_path)
+        self.events = create_event_log(context, self.render_type, get_log_dir())
+        return start_render_instances(
+            context, self.render_type, stream_encode, self.job_file, self.events,
+            scratch_dir)
+
+    def modal(self, context, event):
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        tag_properties_redraw(context)
+        if self.pool.poll():
+            return {'PASS_THROUGH'}
+
+        # Frames still moving out of scratch
+        if self.pool.mover is not None and self.pool.mover.running:
+            return {'PASS_THROUGH'}
+
+        # Streaming encoder finishing the last frames
+        if self.pool.encoder is not None and self.pool.encoder.running:
+            return {'PASS_THROUGH'}
+
+        context.window_manager.event_timer_remove(self.timer)
+        RenderFlipbookOperatorBase.active_pool = None
+        try:
+            record_frame_times(context, self.render_type, self.pool)
+        except OSError as e:
+            self.report({'WARNING'}, f"Frame times not saved: {str(e)}")
+        if self.pool.input_hashes is not None:
+            try:
+                self.pool.input_hashes.save()
+            except OSError as e:
+                self.report({'WARNING'}, f"Input hashes not saved: {str(e)}")
+
+        if self.pool.cancelled:
+            release_job_file(self.job_file, self.headless)
+            if self.events is not None:
+                self.events.job_end(status="cancelled",
+                                    frames_done=self.pool.progress.frames_done)
+            self.report({'WARNING'}, f"{self.render_type} cancelled")
+            return {'FINISHED'}
+        self.finish_render(context)
+
+        failed = [code for code in self.pool.returncodes if code]
+        if self.events is not None:
+            self.events.job_end(status="failed" if failed else "finished",
+                                frames_done=self.pool.progress.frames_done)
+        if failed:
+            self.report(
+                {'WARNING'}, f"{len(failed)} instance(s) failed, see {self.export_dir / 'rmi_logs'}")
+        if self.pool.mover is not None and self.pool.mover.failed:
+            self.report(
+                {'WARNING'}, f"{len(self.pool.mover.failed)} frame(s) left in {self.pool.mover.scratch_dir}")
+        self.report({'INFO'}, f"{self.render_type} Created")
+
+        return {'FINISHED'}
+
+    def finish_render(self, context):
+        export_dir = getattr(self, 'export_dir', None)
+        pool = getattr(self, 'pool', None)
+        if pool is not None and pool.encoder is not None:
+            self.report({'INFO'}, "Encoded while rendering.")
+        elif (export_dir is not None and
+            export_dir.is_dir() and
+            rendered_frames_exist(export_dir) and
+            is_ffmpeg_installed() and
+            context.scene.RMI_Props.auto_encode and
+                'flipbook' in self.render_type):
+            RenderFlipbookOperatorBase.track_encoder(
+                start_encode(context, export_dir, getattr(self, 'events', None)))
+        else:
+            self.report({'INFO'}, "Encoding Skipped.")
+
+        release_job_file(self.job_file, getattr(self, 'headless', True))
+
 
 class RENDER_OT_Render(RenderFlipbookOperatorBase, Operator):
     bl_idname = "rmi.render_animation"
@@ -117,6 +272,10 @@ class RENDER_OT_Render(RenderFlipbookOperatorBase, Operator):
 
     @classmethod
     def poll(cls, context):
+        if RenderFlipbookOperatorBase.active_pool is not None:
+            cls.poll_message_set("A render is already running.")
+            return False
+
         if context.scene.render.filepath == "":
             cls.poll_message_set("Render directory not set.")
             return False
@@ -130,7 +289,7 @@ class RENDER_OT_Render(RenderFlipbookOperatorBase, Operator):
     def execute(self, context):
 
         def render_func():
-            start_render_instances(context)
+            return self.start_instances(context)
 
         return self.execute_render(context, render_func)
 
@@ -144,6 +303,10 @@ class RENDER_OT_Flipbook_Viewport(RenderFlipbookOperatorBase, Operator):
 
     @classmethod
     def poll(cls, context):
+        if RenderFlipbookOperatorBase.active_pool is not None:
+            cls.poll_message_set("A render is already running.")
+            return False
+
         if context.scene.RMI_Props.flipbook_dir == "":
             cls.poll_message_set("Flipbooks directory not set.")
             return False
@@ -170,6 +333,10 @@ class RENDER_OT_Flipbook_Render(RenderFlipbookOperatorBase, Operator):
 
     @classmethod
     def poll(cls, context):
+        if RenderFlipbookOperatorBase.active_pool is not None:
+            cls.poll_message_set("A render is already running.")
+            return False
+
         if context.scene.RMI_Props.flipbook_dir == "":
             cls.poll_message_set("Flipbooks directory not set.")
             return False
@@ -181,9 +348,16 @@ class RENDER_OT_Flipbook_Render(RenderFlipbookOperatorBase, Operator):
         return True
 
     def execute(self, context):
+        props = context.scene.RMI_Props
 
         def render_func():
-            start_render_instances(context)
+            encode = is_ffmpeg_installed() and props.auto_encode
+            if encode and props.raw_handoff:
+                if has_plain_srgb_view(context.scene):
+                    return self.start_instances(context, raw=True)
+                self.report({'WARNING'}, "Raw frames need the Standard view "
+                            "transform, saving images instead.")
+            return self.start_instances(context, encode and props.stream_encode)
 
         return self.execute_render(context, render_func)
 
@@ -202,7 +376,7 @@ class RENDER_OT_ffmpeg_encode(Operator):
             cls.poll_message_set("No frames in Export Directory.\n")
             return False
 
-        if not ffmpeg_installed:
+        if not is_ffmpeg_installed():
             cls.poll_message_set(
                 "FFmpeg is not installed. Please install FFmpeg first.")
             return False
@@ -216,10 +390,20 @@ class RENDER_OT_ffmpeg_encode(Operator):
     def execute(self, context):
         try:
             out_dir = get_absolute_path(context.scene.render.filepath)
-
-            cmd = get_ffmpeg_command_list(context, out_dir)
-
-            _ = start_process(cmd)
+            events = create_event_log(context, 'encode', get_log_dir())
+            if events is not None:
+                events.job_start(render_type='encode', output_dir=str(out_dir))
+
+            encoder = start_encode(context, out_dir, events)
+            RenderFlipbookOperatorBase.track_encoder(encoder)
+            if encoder is not None:
+                self.report({'INFO'}, "Encoding segments in the background.")
+            if events is not None:
+                if encoder is None:
+                    events.job_end(status="detached")
+                else:
+                    encoder.add_finish_listener(lambda e: events.job_end(
+                        status="failed" if e.returncode else "finished"))
 
             return {'FINISHED'}
 
@@ -229,6 +413,220 @@ class RENDER_OT_ffmpeg_encode(Operator):
             return {'CANCELLED'}
 
 
+class RENDER_OT_cancel(Operator):
+    bl_idname = "rmi.cancel_render"
+    bl_label = "Cancel Render"
+    bl_description = ("Kill every render instance and stop every encoder, "
+                      "frames already saved are kept")
+
+    @classmethod
+    def poll(cls, context):
+        pool = RenderFlipbookOperatorBase.active_pool
+        if pool is not None and not pool.cancelled:
+            return True
+        if any(e.running for e in RenderFlipbookOperatorBase.active_encoders):
+            return True
+        cls.poll_message_set("Nothing is rendering or encoding.")
+        return False
+
+    def execute(self, context):
+        pool = RenderFlipbookOperatorBase.active_pool
+        if pool is not None:
+            # The render operator's timer winds the job down
+            pool.cancel()
+        for encoder in RenderFlipbookOperatorBase.active_encoders:
+            encoder.terminate()
+        RenderFlipbookOperatorBase.track_encoder(None)
+        self.report({'INFO'}, "Cancelling render and encoding.")
+
+        return {'FINISHED'}
+
+
+class RENDER_OT_Batch_Render(Operator):
+    bl_idname = "rmi.batch_render"
+    bl_label = "Render Batch Queue"
+    bl_description = ("Render the queued jobs back to back with one pool of "
+                      "instances, encoding each job while the next renders")
+
+    @classmethod
+    def poll(cls, context):
+        if RenderFlipbookOperatorBase.active_pool is not None:
+            cls.poll_message_set("A render is already running.")
+            return False
+
+        if not any(job.enabled for job in context.scene.RMI_Props.batch_jobs):
+            cls.poll_message_set("No jobs in the batch queue.")
+            return False
+
+        if not bpy.context.blend_data.is_saved:
+            cls.poll_message_set("Blend file is not saved.")
+            return False
+
+        return True
+
+    def execute(self, context):
+        self.job_file = save_job_file()
+        self.headless = context.scene.RMI_Props.headless
+        self.encoders = []
+        try:
+            self.jobs = resolve_batch_jobs(context, self.job_file)
+            if not self.jobs:
+                remove_job_file(self.job_file)
+                self.report({'WARNING'}, "No frames to render in the batch queue.")
+                return {'CANCELLED'}
+            self.pool = start_batch_instances(context, self.jobs)
+        except Exception as e:
+            release_job_file(self.job_file, self.headless)
+            self.report({'ERROR'}, f"Failed to start batch: {str(e)}")
+            return {'CANCELLED'}
+
+        self.encoded = set()
+        RenderFlipbookOperatorBase.active_pool = self.pool
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.5, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def start_encodes(self, context):
+        """Encode jobs whose frames are all rendered, while others render."""
+        queue = self.pool.server.queue
+        for job_id in queue.finished_jobs():
+            if job_id in self.encoded:
+                continue
+            self.encoded.add(job_id)
+            job = self.jobs[job_id]
+            if not job["encode"] or not is_ffmpeg_installed():
+                continue
+            try:
+                encoder = start_job_encode(context, job)
+            except Exception as e:
+                self.report({'WARNING'}, f"Job {job_id + 1} not encoded: {str(e)}")
+                continue
+            if encoder is not None:
+                self.encoders.append(encoder)
+                RenderFlipbookOperatorBase.track_encoder(encoder)
+
+    def modal(self, context, event):
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        tag_properties_redraw(context)
+        rendering = self.pool.poll()
+        if not self.pool.cancelled:
+            self.start_encodes(context)
+        if rendering or any(encoder.running for encoder in self.encoders):
+            return {'PASS_THROUGH'}
+
+        context.window_manager.event_timer_remove(self.timer)
+        RenderFlipbookOperatorBase.active_pool = None
+        release_job_file(self.job_file, self.headless)
+        if self.pool.cancelled:
+            self.report({'WARNING'}, "Batch cancelled")
+            return {'FINISHED'}
+
+        failed = [code for code in self.pool.returncodes if code]
+        if failed:
+            log_dir = Path(self.jobs[0]["output_dir"]) / "rmi_logs"
+            self.report({'WARNING'}, f"{len(failed)} instance(s) failed, see {log_dir}")
+        unfinished = len(self.jobs) - len(self.pool.server.queue.finished_jobs())
+        if unfinished:
+            self.report({'WARNING'}, f"{unfinished} job(s) not finished.")
+        self.report({'INFO'}, f"Batch of {len(self.jobs)} job(s) rendered")
+
+        return {'FINISHED'}
+
+
+class UI_OT_batch_add(Operator):
+    bl_idname = "rmi.batch_add"
+    bl_label = "Add Batch Job"
+    bl_description = "Add a job rendering the current scene and camera to the batch queue"
+
+    def execute(self, context):
+        props = context.scene.RMI_Props
+        job = props.batch_jobs.add()
+        job.scene = context.scene.name
+        job.camera = context.scene.camera.name if context.scene.camera else ""
+        job.frame_start = context.scene.frame_start
+        job.frame_end = context.scene.frame_end
+        props.batch_index = len(props.batch_jobs) - 1
+
+        return {'FINISHED'}
+
+
+class UI_OT_batch_remove(Operator):
+    bl_idname = "rmi.batch_remove"
+    bl_label = "Remove Batch Job"
+    bl_description = "Remove the selected job from the batch queue"
+
+    @classmethod
+    def poll(cls, context):
+        props = context.scene.RMI_Props
+        return 0 <= props.batch_index < len(props.batch_jobs)
+
+    def execute(self, context):
+        props = context.scene.RMI_Props
+        props.batch_jobs.remove(props.batch_index)
+        props.batch_index = min(props.batch_index, len(props.batch_jobs) - 1)
+
+        return {'FINISHED'}
+
+
+class UI_OT_output_profile_add(Operator):
+    bl_idname = "rmi.output_profile_add"
+    bl_label = "Add Output"
+    bl_description = "Add an output encoded from the same frames"
+
+    def execute(self, context):
+        props = context.scene.RMI_Props
+        profile = props.output_profiles.add()
+        if props.encoder:
+            profile.encoder = props.encoder
+        profile.quality = props.quality
+        props.output_profile_index = len(props.output_profiles) - 1
+
+        return {'FINISHED'}
+
+
+class UI_OT_output_profile_remove(Operator):
+    bl_idname = "rmi.output_profile_remove"
+    bl_label = "Remove Output"
+    bl_description = "Remove the selected output"
+
+    @classmethod
+    def poll(cls, context):
+        props = context.scene.RMI_Props
+        return 0 <= props.output_profile_index < len(props.output_profiles)
+
+    def execute(self, context):
+        props = context.scene.RMI_Props
+        props.output_profiles.remove(props.output_profile_index)
+        props.output_profile_index = min(props.output_profile_index,
+                                         len(props.output_profiles) - 1)
+
+        return {'FINISHED'}
+
+
+class UI_OT_copy_worker_command(Operator):
+    bl_idname = "rmi.copy_worker_command"
+    bl_label = "Copy Remote Worker Command"
+    bl_description = "Copy the command that joins this render from another machine"
+
+    @classmethod
+    def poll(cls, context):
+        pool = RenderFlipbookOperatorBase.active_pool
+        if pool is None or pool.server is None:
+            cls.poll_message_set("No Dynamic render running.")
+            return False
+        return True
+
+    def execute(self, context):
+        server = RenderFlipbookOperatorBase.active_pool.server
+        context.window_manager.clipboard = get_remote_worker_command(server)
+        self.report({'INFO'}, "Worker command copied to clipboard.")
+
+        return {'FINISHED'}
+
+
 class UI_OT_open_blend_file_dir(Operator):
     bl_idname = "rmi.open_blend_file_dir"
     bl_label = "Open Blend File Directory"
@@ -255,6 +653,13 @@ classes = (
     RENDER_OT_Flipbook_Viewport,
     RENDER_OT_Flipbook_Render,
     RENDER_OT_ffmpeg_encode,
+    RENDER_OT_cancel,
+    RENDER_OT_Batch_Render,
+    UI_OT_batch_add,
+    UI_OT_batch_remove,
+    UI_OT_output_profile_add,
+    UI_OT_output_profile_remove,
+    UI_OT_copy_worker_command,
     UI_OT_open_blend_file_dir,
 )
 
@@ -6,6 +6,31 @@
 
 import bpy
 
+from .operators import RenderFlipbookOperatorBase
+from .progress import format_duration
+from .utils import has_plain_srgb_view
+
+
+class RMI_UL_batch_jobs(bpy.types.UIList):
+
+    def draw_item(self, context, layout, data, item, icon, active_data,
+                  active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "enabled", text="")
+        name = bpy.path.basename(item.blend_file) or "Current File"
+        shot = f" [{item.marker}]" if item.range_mode == 'MARKER' else ""
+        row.label(text=f"{name} / {item.scene or '-'} / {item.camera or '-'}{shot}")
+
+
+class RMI_UL_output_profiles(bpy.types.UIList):
+
+    def draw_item(self, context, layout, data, item, icon, active_data,
+                  active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "enabled", text="")
+        row.label(text=f"{item.encoder} / CRF {item.quality} / {item.scale}% / "
+                       f"{item.container}")
+
 
 class RENDER_PT_RenderScriptInstances(bpy.types.Panel):
 
@@ -30,12 +55,23 @@ class RENDER_PT_RenderScriptInstances(bpy.types.Panel):
                          text="Render Animation", icon="RENDER_ANIMATION")
             col.operator("rmi.ffmpeg_encode",
                          text="FFmpeg Encode Render", icon="FILE_MOVIE")
+            col.operator("rmi.cancel_render",
+                         text="Cancel Render / Encode", icon="CANCEL")
 
             col.separator()
 
             col.operator("rmi.open_blend_file_dir",
                          text="Open Directory", icon="FILE_FOLDER")
 
+        # Progress of the running render
+        pool = RenderFlipbookOperatorBase.active_pool
+        if pool is not None and pool.progress is not None:
+            header, panel = layout.panel("panel_progress", default_closed=False)
+            header.label(text="Render Progress", icon="TIME")
+
+            if panel:
+                self.draw_progress(panel, pool)
+
         # Flipbook Operations
         header, panel = layout.panel("panel_flipbook", default_closed=False)
         header.label(text="Flipbook Animation", icon="SEQUENCE")
@@ -47,6 +83,13 @@ class RENDER_PT_RenderScriptInstances(bpy.types.Panel):
             col.operator("rmi.flipbook_render",
                          text="Flipbook Render", icon="RENDER_ANIMATION")
 
+        # Batch Queue
+        header, panel = layout.panel("panel_batch", default_closed=True)
+        header.label(text="Batch Queue", icon="SEQ_STRIP_DUPLICATE")
+
+        if panel:
+            self.draw_batch(context, panel)
+
         # Render Settings
         header, panel = layout.panel(
             "panel_render_settings", default_closed=False)
@@ -55,6 +98,41 @@ class RENDER_PT_RenderScriptInstances(bpy.types.Panel):
         if panel:
             col = panel.column(align=True)
             col.prop(props, "instances", text="Render Instances")
+            col.prop(props, "partition_mode", text="Frame Split")
+            sub = col.column(align=True)
+            sub.active = props.partition_mode in {'CHUNKED', 'DYNAMIC'}
+            sub.prop(props, "chunk_size", text="Chunk Size")
+            sub = col.column(align=True)
+            sub.active = props.partition_mode == 'DYNAMIC'
+            sub.prop(props, "remote_workers", text="Remote Workers")
+            row = sub.row(align=True)
+            row.active = props.partition_mode == 'DYNAMIC' and props.remote_workers
+            row.prop(props, "coordinator_port", text="Port")
+            col.prop(props, "thread_budget", text="Split CPU Cores")
+            col.prop(props, "low_priority", text="Low Priority")
+            col.prop(props, "headless", text="Headless Instances")
+            sub = col.column(align=True)
+            sub.active = props.headless
+            sub.prop(props, "watchdog", text="Restart Hung Instances")
+            row = sub.row(align=True)
+            row.active = props.headless and props.watchdog
+            row.prop(props, "hang_timeout", text="Timeout")
+            row.prop(props, "max_restarts", text="Retries")
+            sub.prop(props, "memory_admission", text="Memory Admission")
+            row = sub.row(align=True)
+            row.active = props.headless and props.memory_admission
+            row.prop(props, "memory_headroom", text="Headroom (MB)")
+            col.prop(props, "event_log", text="Event Log")
+            sub = col.column(align=True)
+            sub.active = props.event_log
+            sub.prop(props, "metrics_textfile", text="Metrics Textfile")
+            col.prop(props, "resume", text="Resume Missing Frames")
+            col.prop(props, "input_cache", text="Skip Unchanged Frames")
+            col.prop(props, "stage_frames", text="Stage Frames Locally")
+            sub = col.column(align=True)
+            sub.active = props.stage_frames
+            sub.prop(props, "scratch_dir", text="Scratch Dir")
+            sub.prop(props, "stage_cleanup", text="Scratch Cleanup")
             col.prop(props, "override_range", text="Override Scene Range")
             sub = col.column(align=True)
             sub.active = props.override_range
@@ -68,6 +146,22 @@ class RENDER_PT_RenderScriptInstances(bpy.types.Panel):
             # col.prop(props, "file_format", text="File Format")
             col.prop(props, "use_stamp", text="Flipbook Stamp Metadata")
             col.prop(props, "auto_encode", text="Flipbook Auto Encode")
+            sub = col.column(align=True)
+            sub.active = props.auto_encode and props.headless
+            sub.prop(props, "stream_encode", text="Encode While Rendering")
+            sub.prop(props, "raw_handoff", text="Pipe Raw Frames")
+            row = sub.row(align=True)
+            row.active = props.auto_encode and props.raw_handoff
+            row.prop(props, "raw_archive", text="Archive Frames")
+            if props.raw_handoff and not has_plain_srgb_view(context.scene):
+                sub.label(text="Raw frames need the Standard view transform",
+                          icon='ERROR')
+            col.prop(props, "preview_profile", text="Flipbook Preview Profile")
+            sub = col.column(align=True)
+            sub.active = props.preview_profile
+            sub.prop(props, "preview_engine", text="Preview Engine")
+            sub.prop(props, "preview_samples", text="Preview Samples")
+            sub.prop(props, "preview_subdivision", text="Preview Subdivision")
 
         # Encoding Settings
         header, panel = layout.panel("panel_encoding", default_closed=True)
@@ -77,9 +171,105 @@ class RENDER_PT_RenderScriptInstances(bpy.types.Panel):
             col = panel.column(align=True)
             col.prop(props, "encoder", text="Encoder")
             col.prop(props, "quality", text="Quality")
+            col.prop(props, "parallel_encode", text="Parallel Segments")
+            sub = col.column(align=True)
+            sub.active = props.parallel_encode
+            sub.prop(props, "encode_jobs", text="Encode Jobs")
+            col.prop(props, "encode_cache", text="Reuse Encoded Segments")
+            sub = col.column(align=True)
+            sub.active = props.encode_cache
+            sub.prop(props, "encode_cache_size", text="Cache Size (MB)")
+            self.draw_output_profiles(context, panel)
+
+    def draw_output_profiles(self, context, layout):
+        props = context.scene.RMI_Props
+        layout.label(text="Extra Outputs")
+        row = layout.row()
+        row.template_list("RMI_UL_output_profiles", "", props, "output_profiles",
+                          props, "output_profile_index", rows=2)
+        col = row.column(align=True)
+        col.operator("rmi.output_profile_add", text="", icon="ADD")
+        col.operator("rmi.output_profile_remove", text="", icon="REMOVE")
+
+        if 0 <= props.output_profile_index < len(props.output_profiles):
+            profile = props.output_profiles[props.output_profile_index]
+            col = layout.column(align=True)
+            col.prop(profile, "encoder", text="Encoder")
+            col.prop(profile, "quality", text="Quality")
+            col.prop(profile, "scale", text="Scale %")
+            col.prop(profile, "container", text="Container")
+
+    def draw_batch(self, context, layout):
+        props = context.scene.RMI_Props
+        row = layout.row()
+        row.template_list("RMI_UL_batch_jobs", "", props, "batch_jobs",
+                          props, "batch_index", rows=3)
+        col = row.column(align=True)
+        col.operator("rmi.batch_add", text="", icon="ADD")
+        col.operator("rmi.batch_remove", text="", icon="REMOVE")
+
+        if 0 <= props.batch_index < len(props.batch_jobs):
+            job = props.batch_jobs[props.batch_index]
+            col = layout.column(align=True)
+            col.prop(job, "blend_file", text="Blend File")
+            col.prop(job, "scene", text="Scene")
+            col.prop(job, "camera", text="Camera")
+            col.prop(job, "range_mode", text="Frames")
+            sub = col.column(align=True)
+            sub.active = job.range_mode == 'CUSTOM'
+            sub.prop(job, "frame_start", text="Start Frame")
+            sub.prop(job, "frame_end", text="End Frame")
+            sub = col.column(align=True)
+            sub.active = job.range_mode == 'MARKER'
+            sub.prop(job, "marker", text="Marker")
+            col.prop(job, "output", text="Output")
+            col.prop(job, "encode", text="Encode When Done")
+
+        layout.operator("rmi.batch_render", text="Render Batch",
+                        icon="RENDER_ANIMATION")
+
+    def draw_progress(self, layout, pool):
+        progress = pool.progress
+        col = layout.column(align=True)
+        col.label(text=f"Frames: {progress.frames_done} / {progress.total_frames}")
+        col.label(text=f"Throughput: {progress.frames_per_minute:.2f} frames/min")
+        col.label(
+            text=f"Average: {format_duration(progress.average_frame_time)} / frame")
+        col.label(text=f"ETA: {format_duration(progress.eta)}")
+        if pool.admission is not None:
+            admission = pool.admission
+            col.label(text=f"Instances: {admission.effective} running, "
+                           f"{admission.held} held, {len(admission.suspended)} paused")
+
+        if pool.server is not None:
+            col.separator()
+            nodes = pool.server.queue.node_stats()
+            for host, node in sorted(nodes.items()):
+                col.label(text=f"{host}: {node['workers']} workers, {node['frames']} frames, "
+                               f"{node['frames_per_minute']:.2f} frames/min")
+            if pool.server.address[0] != "127.0.0.1":
+                col.operator("rmi.copy_worker_command",
+                             text="Copy Remote Worker Command", icon="COPYDOWN")
+
+        col.separator()
+
+        for instance in pool.instances:
+            p = instance.progress
+            if instance.killed:
+                state = "Killed"
+            elif instance.suspended:
+                state = "Paused"
+            elif instance.process is None:
+                state = "Held"
+            else:
+                state = "Running" if instance.running else f"Exit {instance.poll()}"
+            col.label(text=f"Instance {instance.index + 1}: {p.frames_done} frames, "
+                           f"{p.frames_per_minute:.2f} frames/min ({state})")
 
 
 classes = (
+    RMI_UL_batch_jobs,
+    RMI_UL_output_profiles,
     RENDER_PT_RenderScriptInstances,
 )
 
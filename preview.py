@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Preview profile for Flipbook Render: cheaper scene settings applied while
+the job file is saved, so only the instances render with them.
+
+Overrides are attribute paths relative to the scene, e.g.
+{"cycles.samples": 16, "render.use_motion_blur": False}.
+"""
+
+
+# Engine ids, EEVEE is BLENDER_EEVEE_NEXT in Blender 4.2 - 4.x
+WORKBENCH = 'BLENDER_WORKBENCH'
+EEVEE_IDS = ('BLENDER_EEVEE_NEXT', 'BLENDER_EEVEE')
+
+
+def get_engine_id(engine: str, available: list) -> str | None:
+    """Engine id for the preview_engine setting, None to keep the scene's."""
+    match engine:
+        case 'WORKBENCH':
+            return WORKBENCH
+        case 'EEVEE':
+            return next((e for e in EEVEE_IDS if e in available), None)
+    return None
+
+
+def get_preview_overrides(samples: int, subdivision: int,
+                          engine: str | None = None) -> dict:
+    """Settings of the preview profile, in the order they are applied."""
+    overrides = {}
+    if engine:
+        overrides["render.engine"] = engine
+    overrides.update({
+        "cycles.samples": samples,
+        "cycles.use_denoising": True,
+        "eevee.taa_render_samples": samples,
+        "render.use_simplify": True,
+        "render.simplify_subdivision_render": subdivision,
+        "render.simplify_volumes": 0.0,
+        "render.use_motion_blur": False,
+    })
+    return overrides
+
+
+def resolve_path(owner, path: str) -> tuple:
+    """(object, attribute) of a dotted path, None when it does not exist."""
+    *parents, name = path.split(".")
+    for parent in parents:
+        owner = getattr(owner, parent, None)
+        if owner is None:
+            return None
+    if not hasattr(owner, name):
+        return None
+    return owner, name
+
+
+def apply_overrides(owner, overrides: dict) -> dict:
+    """
+    Set the overrides that exist on owner (engine add-ons may be disabled)
+    and return the original values for restore_overrides().
+
+    Samples are only lowered, never raised above the scene's own.
+    """
+    originals = {}
+    for path, value in overrides.items():
+        target = resolve_path(owner, path)
+        if target is None:
+            continue
+        obj, name = target
+        original = getattr(obj, name)
+        if path.endswith("samples"):
+            value = min(value, original)
+        originals[path] = original
+        setattr(obj, name, value)
+    return originals
+
+
+def restore_overrides(owner, originals: dict) -> None:
+    for path, value in reversed(list(originals.items())):
+        target = resolve_path(owner, path)
+        if target is not None:
+            setattr(*target, value)
@@ -0,0 +1,169 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+import re
+import time
+
+
+# Blender background render output, e.g.
+# Fra:12 Mem:210.43M (Peak 213.01M) | Time:00:01.52 | Rendering 1 / 64 samples
+# Saved: '/renders/shot_0012.png'
+# skipping existing frame "/renders/shot_0013.png"
+FRAME_RE = re.compile(r"^Fra:\s*(-?\d+)\b")
+SAVED_RE = re.compile(r"^\s*Saved:\s*['\"](.+)['\"]")
+SKIPPED_RE = re.compile(r"^skipping existing frame")
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "--"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+class InstanceProgress:
+    """
+    Frame progress of one instance, fed with its output lines.
+
+    A frame's duration runs from its first "Fra:" line to its "Saved:" line.
+    """
+
+    def __init__(self, clock=time.monotonic, on_frame=None, on_start=None):
+        self.clock = clock
+        self.on_frame = on_frame
+        self.on_start = on_start
+        self.started = clock()
+        self.last_output = self.started
+        self.last_frame = self.started
+        # Last "Fra:", saved or skipped line, the render is moving
+        self.last_activity = self.started
+        self.current_frame = None
+        self.frame_started = None
+        self.frames_done = 0
+        self.frames_skipped = 0
+        self.durations = {}
+        self.saved_paths = {}
+        self.start_listeners = []
+        self.frame_listeners = []
+
+    def feed(self, line: str) -> int | None:
+        """Parse one output line, return the frame number if it completed."""
+        now = self.clock()
+        self.last_output = now
+
+        if match := FRAME_RE.match(line):
+            self.last_activity = now
+            frame = int(match.group(1))
+            if frame != self.current_frame:
+                self.current_frame = frame
+                self.frame_started = now
+                if self.on_start is not None:
+                    self.on_start(frame)
+                for listener in self.start_listeners:
+                    listener(frame)
+        elif match := SAVED_RE.match(line):
+            if self.current_frame is None:
+                return None
+            frame = self.current_frame
+            self.durations[frame] = now - self.frame_started
+            self.saved_paths[frame] = match.group(1)
+            self.frames_done += 1
+            self.current_frame = None
+            self.last_frame = self.last_activity = now
+            if self.on_frame is not None:
+                self.on_frame(frame, match.group(1), self.durations[frame])
+            for listener in self.frame_listeners:
+                listener(frame, match.group(1), self.durations[frame])
+            return frame
+        elif SKIPPED_RE.match(line):
+            self.frames_skipped += 1
+            self.last_frame = self.last_activity = now
+
+        return None
+
+    def add_start_listener(self, func) -> None:
+        """Call func(frame) whenever this instance starts a frame."""
+        self.start_listeners.append(func)
+
+    def add_frame_listener(self, func) -> None:
+        """Call func(frame, path, seconds) whenever this instance saves a frame."""
+        self.frame_listeners.append(func)
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    @property
+    def frames_per_minute(self) -> float:
+        elapsed = self.elapsed
+        return self.frames_done * 60 / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def average_frame_time(self) -> float | None:
+        if not self.durations:
+            return None
+        return sum(self.durations.values()) / len(self.durations)
+
+
+class JobProgress:
+    """Aggregated progress of all instances of a render job."""
+
+    def __init__(self, total_frames: int, clock=time.monotonic):
+        self.total_frames = total_frames
+        self.clock = clock
+        self.started = clock()
+        self.instances = []
+        self.frame_listeners = []
+
+    def add_instance(self) -> InstanceProgress:
+        progress = InstanceProgress(self.clock, self._frame_done)
+        self.instances.append(progress)
+        return progress
+
+    def add_frame_listener(self, func) -> None:
+        """Call func(frame, path, seconds) whenever an instance saves a frame."""
+        self.frame_listeners.append(func)
+
+    def _frame_done(self, frame: int, path: str, seconds: float) -> None:
+        for listener in self.frame_listeners:
+            listener(frame, path, seconds)
+
+    @property
+    def frames_done(self) -> int:
+        return sum(p.frames_done + p.frames_skipped for p in self.instances)
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    @property
+    def frames_per_minute(self) -> float:
+        rendered = sum(p.frames_done for p in self.instances)
+        elapsed = self.elapsed
+        return rendered * 60 / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def average_frame_time(self) -> float | None:
+        durations = [d for p in self.instances for d in p.durations.values()]
+        if not durations:
+            return None
+        return sum(durations) / len(durations)
+
+    @property
+    def eta(self) -> float | None:
+        remaining = max(0, self.total_frames - self.frames_done)
+        if not remaining:
+            return 0.0
+        rate = self.frames_per_minute
+        if rate <= 0:
+            return None
+        return remaining * 60 / rate
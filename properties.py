@@ -6,7 +6,124 @@
 
 import bpy
 
-from .utils import (available_encoders, ffmpeg_installed)
+from .utils import get_encoders
+
+
+class RMI_BatchJob(bpy.types.PropertyGroup):
+    # One entry of the batch render queue
+
+    enabled: bpy.props.BoolProperty(
+        name="enabled",
+        description="Render this job with the batch",
+        default=True
+    )
+
+    blend_file: bpy.props.StringProperty(
+        name="Blend File",
+        description="Blend file to render, empty for the open file",
+        default="",
+        subtype='FILE_PATH'
+    )
+
+    scene: bpy.props.StringProperty(
+        name="Scene",
+        description="Scene to render, empty for the first scene",
+        default="",
+    )
+
+    camera: bpy.props.StringProperty(
+        name="Camera",
+        description="Camera object to render from, empty for the scene camera",
+        default="",
+    )
+
+    range_mode: bpy.props.EnumProperty(
+        name="range_mode",
+        description="Frames to render",
+        items=[
+            ('SCENE', "Scene Range", "The scene frame range"),
+            ('CUSTOM', "Custom Range", "The start and end frames below"),
+            ('MARKER', "Marker Shot",
+             "From the marker to the frame before the next marker"),
+        ],
+        default='SCENE'
+    )
+
+    frame_start: bpy.props.IntProperty(
+        name="frame_start",
+        description="Start Frame",
+        default=1,
+    )
+
+    frame_end: bpy.props.IntProperty(
+        name="frame_end",
+        description="End Frame",
+        default=250,
+    )
+
+    marker: bpy.props.StringProperty(
+        name="Marker",
+        description="Timeline marker the shot starts at",
+        default="",
+    )
+
+    output: bpy.props.StringProperty(
+        name="Output",
+        description="Output path, empty for the scene output path",
+        default="",
+        subtype='FILE_PATH'
+    )
+
+    encode: bpy.props.BoolProperty(
+        name="encode",
+        description="Encode the frames once the job is rendered, "
+                    "while the next job renders (requires FFmpeg)",
+        default=False
+    )
+
+
+class RMI_OutputProfile(bpy.types.PropertyGroup):
+    # An extra video encoded from the same frames, e.g. a review proxy
+
+    enabled: bpy.props.BoolProperty(
+        name="enabled",
+        description="Encode this output with the others",
+        default=True
+    )
+
+    encoder: bpy.props.EnumProperty(
+        name="encoder",
+        description="Select Encoder",
+        items=get_encoders,
+    )
+
+    quality: bpy.props.IntProperty(
+        name="quality",
+        description="Highest = 1, Lowest = 50",
+        default=20,
+        soft_min=1,
+        soft_max=50
+    )
+
+    scale: bpy.props.IntProperty(
+        name="scale",
+        description="Output size, percentage of the frame size",
+        default=100,
+        min=1,
+        max=100,
+    )
+
+    container: bpy.props.EnumProperty(
+        name="container",
+        description="Container format of the output file",
+        items=[
+            ('MP4', "MP4", "MPEG-4 (.mp4)"),
+            ('MKV', "Matroska", "Matroska (.mkv)"),
+            ('MOV', "QuickTime", "QuickTime (.mov)"),
+            ('WEBM', "WebM", "WebM (.webm), for VP9 and AV1 only"),
+        ],
+        default='MP4'
+    )
 
 
 class RMI_Props(bpy.types.PropertyGroup):
@@ -34,6 +151,168 @@ class RMI_Props(bpy.types.PropertyGroup):
         soft_max=64,
     )
 
+    partition_mode: bpy.props.EnumProperty(
+        name="partition_mode",
+        description="How frames are split between instances",
+        items=[
+            ('CONTIGUOUS', "Contiguous",
+             "Each instance renders one block of consecutive frames"),
+            ('INTERLEAVED', "Interleaved",
+             "Each instance renders every Nth frame"),
+            ('CHUNKED', "Chunked",
+             "Chunks of frames are dealt to instances in turn"),
+            ('BALANCED', "Balanced",
+             "Split by the frame render times recorded in previous runs"),
+            ('DYNAMIC', "Dynamic",
+             "Instances pull chunks from a shared queue as they finish"),
+        ],
+        default='CONTIGUOUS'
+    )
+
+    chunk_size: bpy.props.IntProperty(
+        name="chunk_size",
+        description="Frames per chunk in Chunked and Dynamic modes",
+        default=10,
+        min=1,
+        soft_max=100,
+    )
+
+    thread_budget: bpy.props.BoolProperty(
+        name="thread_budget",
+        description="Split the CPU cores between instances: each instance "
+                    "gets its own cores (per NUMA node where available) "
+                    "and a matching render thread count",
+        default=True
+    )
+
+    low_priority: bpy.props.BoolProperty(
+        name="low_priority",
+        description="Run instances at a lower priority so this Blender "
+                    "session stays responsive",
+        default=True
+    )
+
+    remote_workers: bpy.props.BoolProperty(
+        name="remote_workers",
+        description="Let workers on other machines join Dynamic renders "
+                    "(the blend file and output must be on shared storage)",
+        default=False
+    )
+
+    coordinator_port: bpy.props.IntProperty(
+        name="coordinator_port",
+        description="TCP port remote workers connect to",
+        default=5151,
+        min=1024,
+        max=65535,
+    )
+
+    headless: bpy.props.BoolProperty(
+        name="headless",
+        description="Run instances in the background and write their output "
+                    "to log files instead of opening terminal windows",
+        default=True
+    )
+
+    watchdog: bpy.props.BoolProperty(
+        name="watchdog",
+        description="Kill headless instances that report no render progress "
+                    "for too long and restart them on their unfinished frames",
+        default=True
+    )
+
+    hang_timeout: bpy.props.IntProperty(
+        name="hang_timeout",
+        description="Seconds without render progress before an instance is "
+                    "hung (at least three times its slowest frame)",
+        default=600,
+        min=10,
+    )
+
+    max_restarts: bpy.props.IntProperty(
+        name="max_restarts",
+        description="Times the frames of a hung instance are restarted",
+        default=2,
+        min=0,
+        soft_max=10,
+    )
+
+    memory_admission: bpy.props.BoolProperty(
+        name="memory_admission",
+        description="Start headless instances one at a time while memory "
+                    "allows, and pause the newest ones when it runs short "
+                    "(Linux)",
+        default=False
+    )
+
+    memory_headroom: bpy.props.IntProperty(
+        name="memory_headroom",
+        description="Memory in MB kept free for the system and the open "
+                    "Blender session",
+        default=2048,
+        min=0,
+    )
+
+    stage_frames: bpy.props.BoolProperty(
+        name="stage_frames",
+        description="Instances save frames to a local scratch directory and "
+                    "they are moved to the output directory in the background "
+                    "(for output on network storage; not with remote workers)",
+        default=False
+    )
+
+    scratch_dir: bpy.props.StringProperty(
+        name="Scratch Directory",
+        description="Local directory (SSD or tmpfs) frames are staged in, "
+                    "empty for the system temporary directory",
+        default="",
+        subtype='DIR_PATH'
+    )
+
+    stage_cleanup: bpy.props.EnumProperty(
+        name="stage_cleanup",
+        description="What happens to staged frames once copied",
+        items=[
+            ('VERIFY_SIZE', "Verify Size",
+             "Delete staged frames once the copy has the same size"),
+            ('VERIFY_HASH', "Verify Checksum",
+             "Delete staged frames once the copy has the same checksum"),
+            ('KEEP', "Keep", "Keep staged frames in the scratch directory"),
+        ],
+        default='VERIFY_SIZE'
+    )
+
+    resume: bpy.props.BoolProperty(
+        name="resume",
+        description="Check existing frames before rendering: empty or "
+                    "truncated frames are deleted, and only missing frames "
+                    "are split between instances",
+        default=True
+    )
+
+    input_cache: bpy.props.BoolProperty(
+        name="input_cache",
+        description="Record a hash of the inputs of every rendered frame "
+                    "and only render again frames whose inputs changed",
+        default=False
+    )
+
+    event_log: bpy.props.BoolProperty(
+        name="event_log",
+        description="Write job, instance, frame and encode events as JSON "
+                    "lines to rmi_logs/events.jsonl",
+        default=False
+    )
+
+    metrics_textfile: bpy.props.StringProperty(
+        name="Metrics Textfile",
+        description="Prometheus textfile with frames per host and encode "
+                    "times, empty to disable (e.g. a file in the "
+                    "node_exporter textfile collector directory)",
+        default="",
+        subtype='FILE_PATH'
+    )
+
     override_range: bpy.props.BoolProperty(
         name="override_range",
         description="Override Frame Range",
@@ -59,7 +338,37 @@ class RMI_Props(bpy.types.PropertyGroup):
     encoder: bpy.props.EnumProperty(
         name="encoder",
         description="Select Encoder",
-        items=available_encoders,
+        items=get_encoders,
+    )
+
+    parallel_encode: bpy.props.BoolProperty(
+        name="parallel_encode",
+        description="Encode segments of the sequence in parallel and join "
+                    "them without re-encoding",
+        default=False
+    )
+
+    encode_jobs: bpy.props.IntProperty(
+        name="encode_jobs",
+        description="Number of segments encoded at the same time",
+        default=4,
+        min=1,
+        soft_max=32,
+    )
+
+    encode_cache: bpy.props.BoolProperty(
+        name="encode_cache",
+        description="Keep encoded segments and only encode again the ones "
+                    "whose frames or settings changed",
+        default=False
+    )
+
+    encode_cache_size: bpy.props.IntProperty(
+        name="encode_cache_size",
+        description="Size of the encoded segment cache, least recently used "
+                    "segments are removed first",
+        default=4096,
+        min=64,
     )
 
     use_stamp: bpy.props.BoolProperty(
@@ -80,8 +389,65 @@ class RMI_Props(bpy.types.PropertyGroup):
 
     auto_encode: bpy.props.BoolProperty(
         name="Auto Encode",
-        description="Automatically encode Flipbook",
-        default=ffmpeg_installed
+        description="Automatically encode Flipbook (requires FFmpeg)",
+        default=True
+    )
+
+    stream_encode: bpy.props.BoolProperty(
+        name="Stream Encode",
+        description="Encode the Flipbook while it renders, "
+                    "feeding FFmpeg frames as they are saved",
+        default=True
+    )
+
+    raw_handoff: bpy.props.BoolProperty(
+        name="raw_handoff",
+        description="Flipbook instances send raw pixels straight to a single "
+                    "FFmpeg instead of writing image files (no stamp). Needs the "
+                    "Standard view transform with no look, exposure, gamma or "
+                    "curves, images are saved otherwise",
+        default=False
+    )
+
+    raw_archive: bpy.props.BoolProperty(
+        name="raw_archive",
+        description="Also save the Flipbook frames as images",
+        default=False
+    )
+
+    preview_profile: bpy.props.BoolProperty(
+        name="preview_profile",
+        description="Render Flipbook instances with a fast preview profile: "
+                    "capped samples, denoising, simplified subdivision, "
+                    "no motion blur and the lowest volume resolution",
+        default=False
+    )
+
+    preview_samples: bpy.props.IntProperty(
+        name="preview_samples",
+        description="Maximum render samples of Flipbook instances",
+        default=16,
+        min=1,
+        soft_max=256,
+    )
+
+    preview_subdivision: bpy.props.IntProperty(
+        name="preview_subdivision",
+        description="Maximum subdivision level of Flipbook instances",
+        default=1,
+        min=0,
+        max=6,
+    )
+
+    preview_engine: bpy.props.EnumProperty(
+        name="preview_engine",
+        description="Render engine of Flipbook instances",
+        items=[
+            ('KEEP', "Scene Engine", "Render with the scene's engine"),
+            ('EEVEE', "EEVEE", "Render with EEVEE"),
+            ('WORKBENCH', "Workbench", "Render with Workbench"),
+        ],
+        default='KEEP'
     )
 
     flipbook_dir: bpy.props.StringProperty(
@@ -91,8 +457,28 @@ class RMI_Props(bpy.types.PropertyGroup):
         subtype='DIR_PATH'
     )
 
+    output_profiles: bpy.props.CollectionProperty(
+        type=RMI_OutputProfile,
+        description="Extra outputs encoded in the same FFmpeg run as the "
+                    "main one, decoding the frames once. With extra "
+                    "outputs, encoding does not use parallel segments "
+                    "or the encode cache",
+    )
+
+    output_profile_index: bpy.props.IntProperty(
+        name="output_profile_index",
+        default=0,
+    )
+
+    batch_jobs: bpy.props.CollectionProperty(type=RMI_BatchJob)
+
+    batch_index: bpy.props.IntProperty(
+        name="batch_index",
+        default=0,
+    )
+
 
-classes = (RMI_Props,)
+classes = (RMI_BatchJob, RMI_OutputProfile, RMI_Props,)
 
 
 def register():
@@ -0,0 +1,138 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Raw frame instance, run inside a background Blender instance:
+
+    blender -b job.blend --python rawframes.py -- --port 5000 --token T [--archive]
+
+Renders the frames handed out by the RawFrameServer and sends their RGBA
+pixels, read from a compositor Viewer node and converted to sRGB, instead
+of saving image files. Burnt-in stamps are not part of the Viewer pixels.
+Only the plain sRGB transform is applied, the addon uses raw frames only
+with the Standard view transform and no look, exposure, gamma or curves.
+With --archive each frame is also saved to the scene output path.
+
+"Saved: 'pipe:N'" is printed once a frame is handed off so the addon's
+progress tracking counts it like a saved frame. While the encoder holds a
+frame back, "Fra:N" lines keep coming so the watchdog does not take the
+wait for a hang.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+
+import bpy
+import numpy as np
+
+
+# Seconds between the lines printed while a frame waits for the encoder,
+# below the shortest hang timeout
+WAIT_REPORT_INTERVAL = 5
+
+
+def parse_args() -> argparse.Namespace:
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="rawframes.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--token", default="")
+    parser.add_argument("--archive", action="store_true",
+                        help="Also save frames to the scene output path")
+    return parser.parse_args(argv)
+
+
+def add_viewer_node(scene: bpy.types.Scene) -> None:
+    """Show the composited image (or the render layer) in a Viewer node."""
+    scene.use_nodes = True
+    tree = scene.node_tree
+    composite = next((n for n in tree.nodes if n.type == 'COMPOSITE'), None)
+    if composite is not None and composite.inputs['Image'].is_linked:
+        source = composite.inputs['Image'].links[0].from_socket
+    else:
+        layers = next((n for n in tree.nodes if n.type == 'R_LAYERS'), None)
+        if layers is None:
+            layers = tree.nodes.new('CompositorNodeRLayers')
+        source = layers.outputs['Image']
+    viewer = tree.nodes.new('CompositorNodeViewer')
+    tree.links.new(source, viewer.inputs['Image'])
+
+
+def linear_to_srgb(values: np.ndarray) -> np.ndarray:
+    return np.where(values <= 0.0031308, values * 12.92,
+                    1.055 * np.power(np.maximum(values, 0), 1 / 2.4) - 0.055)
+
+
+def get_rgba_bytes(image: bpy.types.Image) -> tuple:
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    # Blender stores rows bottom-up
+    pixels = pixels.reshape(height, width, 4)[::-1]
+    pixels[..., :3] = linear_to_srgb(pixels[..., :3])
+    data = (np.clip(pixels, 0, 1) * 255 + 0.5).astype(np.uint8).tobytes()
+    return width, height, data
+
+
+def send_frame(send, frame: int, width: int, height: int, data: bytes) -> dict:
+    """send() the frame, reporting progress while the encoder holds it back."""
+    result = {}
+
+    def run():
+        try:
+            result["reply"] = send({"op": "frame", "frame": frame,
+                                    "width": width, "height": height}, data)
+        except Exception as error:
+            result["error"] = error
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(WAIT_REPORT_INTERVAL)
+    while thread.is_alive():
+        print(f"Fra:{frame} | Waiting for the encoder", flush=True)
+        thread.join(WAIT_REPORT_INTERVAL)
+    if "error" in result:
+        raise result["error"]
+    return result["reply"]
+
+
+def main() -> None:
+    args = parse_args()
+    scene = bpy.context.scene
+    add_viewer_node(scene)
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+
+    with socket.create_connection((args.host, args.port)) as sock:
+        stream = sock.makefile("rwb")
+
+        def send(message: dict, data: bytes = b"") -> dict:
+            message = dict(message, worker=worker, token=args.token)
+            stream.write((json.dumps(message) + "\n").encode() + data)
+            stream.flush()
+            reply = json.loads(stream.readline())
+            if "error" in reply:
+                raise RuntimeError(f"Coordinator: {reply['error']}")
+            return reply
+
+        while frames := send({"op": "next"}).get("frames", []):
+            for frame in frames:
+                scene.frame_set(frame)
+                bpy.ops.render.render(write_still=False)
+                image = bpy.data.images['Viewer Node']
+                width, height, data = get_rgba_bytes(image)
+                send_frame(send, frame, width, height, data)
+                if args.archive:
+                    path = bpy.path.abspath(scene.render.frame_path(frame=frame))
+                    image.save_render(path, scene=scene)
+                print(f"Saved: 'pipe:{frame}'", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Raw frame handoff: instances running rawframes.py send uncompressed RGBA
+pixels over a local socket and a single FFmpeg encodes them as rawvideo
+in frame order, without image files in between.
+
+    -> {"op": "next"}                      <- {"frames": [12, 13]}  (empty: done)
+    -> {"op": "frame", "frame": 12, "width": 960, "height": 540}
+       followed by width * height * 4 bytes of RGBA, top row first
+    <- {"ok": true}                        once the frame fits the window
+
+Frames arriving ahead of the next one to encode wait in a bounded reorder
+window; instances sending further ahead are held until it moves on. When
+an instance disconnects its frames are handed out again and held instances
+are let through, since one of them may be needed to render those frames.
+"""
+
+import json
+import secrets
+import socketserver
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from .coordinator import FrameQueue
+from .encoding import EncoderBase, get_encoder_args
+
+
+# Frames buffered ahead of the next one to encode
+REORDER_WINDOW = 8
+
+
+def get_rawvideo_command_list(encoder: str, quality: int, fps: float,
+                              width: int, height: int, output_file: Path) -> list:
+    """FFmpeg command reading RGBA frames back to back from stdin."""
+    return [
+        "ffmpeg",
+        "-f", "rawvideo",
+        "-pix_fmt", "rgba",
+        "-s", f"{width}x{height}",
+        "-framerate", f"{fps}",
+        "-i", "-",
+    ] + get_encoder_args(encoder, quality) + ["-y", str(output_file)]
+
+
+class RawVideoEncoder(EncoderBase):
+    """
+    Write raw frames to FFmpeg in frame order.
+
+    FFmpeg is started with get_command(width, height) once the first frame
+    tells the size. Frames still missing when finish() is called are left
+    out of the video.
+    """
+
+    def __init__(self, frames: list, get_command, log_path: Path,
+                 window: int = REORDER_WINDOW):
+        super().__init__()
+        self.frames = sorted(frames)
+        self.positions = {frame: i for i, frame in enumerate(self.frames)}
+        self.get_command = get_command
+        self.log_path = Path(log_path)
+        self.window = max(1, window)
+        self.index = 0
+        self.buffer = {}
+        self.size = None
+        self.finishing = False
+        # Bumped to let held frames past the window, see release_held()
+        self.releases = 0
+        self.condition = threading.Condition()
+        self.process = None
+        self.writer = None
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+
+    def put(self, frame: int, width: int, height: int, data: bytes) -> bool:
+        """Queue a frame, blocking while it is too far ahead of the encoder."""
+        with self.condition:
+            if self.size is None:
+                self.size = (width, height)
+            if (width, height) != self.size or frame not in self.positions:
+                return False
+            position = self.positions[frame]
+            releases = self.releases
+            while (position >= self.index + self.window and not self.finishing
+                   and releases == self.releases):
+                self.condition.wait()
+            if position >= self.index:
+                self.buffer[frame] = data
+                self.condition.notify_all()
+            return True
+
+    def release_held(self) -> None:
+        """
+        Buffer the frames held by the window right away. Called when frames
+        in flight were lost, the instances held here may have to render them.
+        """
+        with self.condition:
+            self.releases += 1
+            self.condition.notify_all()
+
+    def finish(self) -> None:
+        """No more frames will be sent, encode what is buffered and stop."""
+        with self.condition:
+            self.finishing = True
+            self.condition.notify_all()
+
+    def _next_frame(self) -> bytes | None:
+        with self.condition:
+            while self.index < len(self.frames):
+                frame = self.frames[self.index]
+                if frame in self.buffer:
+                    return self.buffer.pop(frame)
+                if self.finishing:
+                    self.index += 1
+                    continue
+                self.condition.wait()
+        return None
+
+    def _advance(self) -> None:
+        with self.condition:
+            self.index += 1
+            self.condition.notify_all()
+
+    def _write(self) -> None:
+        log = None
+        try:
+            while (data := self._next_frame()) is not None:
+                if self.process is None:
+                    self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                    log = open(self.log_path, "w")
+                    self.process = subprocess.Popen(
+                        self.get_command(*self.size), stdin=subprocess.PIPE,
+                        stdout=log, stderr=subprocess.STDOUT)
+                self.process.stdin.write(data)
+                self.frames_written += 1
+                self._advance()
+        except (BrokenPipeError, OSError):
+            self.finish()
+        finally:
+            if self.process is not None:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+                self.returncode = self.process.wait()
+            if log is not None:
+                log.close()
+            self._notify_finished()
+
+    @property
+    def running(self) -> bool:
+        return self.writer is not None and self.writer.is_alive()
+
+    def terminate(self) -> None:
+        self.finish()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+
+class RawFrameHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server
+        worker = None
+        try:
+            while line := self.rfile.readline():
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if not server.authorized(message):
+                    self.wfile.write(b'{"error": "Invalid token"}\n')
+                    break
+                worker = message.get("worker", worker)
+                match message.get("op"):
+                    case "next":
+                        reply = server.queue.next_work(worker)
+                    case "frame":
+                        width, height = message["width"], message["height"]
+                        data = self.rfile.read(width * height * 4)
+                        if len(data) != width * height * 4:
+                            break
+                        frame = message["frame"]
+                        if server.encoder.put(frame, width, height, data):
+                            server.queue.complete(worker, [frame])
+                            reply = {"ok": True}
+                        else:
+                            reply = {"error": f"Frame {frame} rejected"}
+                    case op:
+                        reply = {"error": f"Unknown op: {op}"}
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            if worker is not None and server.queue.release(worker):
+                server.encoder.release_held()
+
+
+class RawFrameServer(socketserver.ThreadingTCPServer):
+    """Hand out frames in order and feed the frames received to encoder."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue: FrameQueue, encoder: RawVideoEncoder,
+                 host: str = "127.0.0.1", port: int = 0, token: str | None = None):
+        self.queue = queue
+        self.encoder = encoder
+        self.token = token or secrets.token_hex(8)
+        self.thread = None
+        super().__init__((host, port), RawFrameHandler)
+
+    @property
+    def address(self) -> tuple:
+        return self.server_address[:2]
+
+    def authorized(self, message: dict) -> bool:
+        return secrets.compare_digest(str(message.get("token", "")), self.token)
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
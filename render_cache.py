@@ -0,0 +1,164 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Input-hash render cache: each frame gets a hash of what it is rendered
+from (scene and render settings, data-blocks, referenced file timestamps
+and animated values at that frame). Frames whose hash matches the one
+recorded with their output on disk are not rendered again.
+
+Values are read through RNA (bl_rna.properties), the bpy specific parts
+live in utils.py.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .sequence import check_frames
+
+
+# Recorded next to the rendered frames
+HASHES_NAME = "rmi_input_hashes.json"
+
+# Properties that do not change what a frame looks like, or are too big
+IGNORED_PROPERTIES = {
+    "rna_type", "name_full", "session_uid", "is_evaluated", "original",
+    "users", "use_fake_user", "use_extra_user", "is_dirty", "tag",
+    "is_runtime_data", "is_missing", "is_embedded_data", "preview",
+    "frame_current", "frame_current_final", "frame_float", "frame_start",
+    "frame_end", "frame_step", "frame_preview_start", "frame_preview_end",
+    "use_preview_range", "tool_settings", "timeline_markers", "keying_sets",
+    "keying_sets_all", "cursor", "RMI_Props", "pixels", "bound_box",
+    "animation_data", "select", "hide_select", "hide_viewport",
+    "is_editmode", "mode", "statistics", "depsgraph",
+    # Evaluated at the current frame
+    "matrix_world", "matrix_local", "matrix_basis", "matrix",
+    "matrix_channel", "dimensions", "head", "tail",
+}
+
+# Longer arrays and collections are left to dedicated fingerprints
+MAX_ITEMS = 256
+
+
+def normalize(value):
+    """JSON friendly value, arrays and mathutils types as nested lists."""
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return round(value, 6)
+    try:
+        return [normalize(item) for item in value]
+    except TypeError:
+        return repr(value)
+
+
+def get_item_key(item, index: int) -> str:
+    """Data path subscript of a collection item, by name when it has one."""
+    name = getattr(item, "name", None)
+    return f'["{name}"]' if isinstance(name, str) else f"[{index}]"
+
+
+def get_rna_values(owner, skip=frozenset(), depth: int = 2, path: str = "") -> dict:
+    """
+    Values of owner's RNA properties by data path. Nested structs and
+    collections are followed depth levels down, data-blocks (anything with
+    name_full) are recorded by name. Data paths in skip (animated or
+    driven properties) are left out.
+    """
+    values = {}
+    for prop in owner.bl_rna.properties:
+        name = prop.identifier
+        prop_path = f"{path}{name}"
+        if name in IGNORED_PROPERTIES or prop_path in skip:
+            continue
+        try:
+            value = getattr(owner, name)
+        except (AttributeError, RuntimeError):
+            continue
+
+        match prop.type:
+            case 'POINTER':
+                if value is None or hasattr(value, "name_full"):
+                    values[prop_path] = getattr(value, "name_full", None)
+                elif depth > 0:
+                    values.update(get_rna_values(value, skip, depth - 1,
+                                                 f"{prop_path}."))
+            case 'COLLECTION':
+                if len(value) > MAX_ITEMS:
+                    values[prop_path] = len(value)
+                    continue
+                for index, item in enumerate(value):
+                    item_path = f"{prop_path}{get_item_key(item, index)}"
+                    if hasattr(item, "name_full"):
+                        values[item_path] = item.name_full
+                    elif depth > 0:
+                        values.update(get_rna_values(item, skip, depth - 1,
+                                                     f"{item_path}."))
+            case _:
+                if getattr(prop, "is_array", False) and len(value) > MAX_ITEMS:
+                    continue
+                values[prop_path] = normalize(value)
+    return values
+
+
+def hash_values(values) -> str:
+    data = json.dumps(values, sort_keys=True, default=repr)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def get_frame_hashes(static: dict, frame_values: dict) -> dict:
+    """{frame: hash} of the static inputs plus each frame's own values."""
+    static_hash = hash_values(static)
+    return {frame: hash_values([static_hash, values])
+            for frame, values in frame_values.items()}
+
+
+def load_hashes(path: Path) -> dict:
+    try:
+        with open(path) as f:
+            return {int(frame): value for frame, value in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def get_changed_frames(frames: list, hashes: dict, previous: dict) -> list:
+    """Frames without a hash, or whose hash differs from the recorded one."""
+    return [frame for frame in frames
+            if frame not in hashes or previous.get(frame) != hashes[frame]]
+
+
+class InputHashes:
+    """
+    Input hashes of a render, saved with its frames once it is done.
+
+    Only frames whose file is valid are recorded, so frames that failed
+    to render are rendered again next time. Recorded frames outside this
+    render are kept.
+    """
+
+    def __init__(self, path: Path, hashes: dict, frame_paths: dict):
+        self.path = Path(path)
+        self.hashes = hashes
+        self.frame_paths = frame_paths
+
+    def save(self) -> dict:
+        paths = {f: p for f, p in self.frame_paths.items() if f in self.hashes}
+        missing, invalid = check_frames(paths)
+        failed = set(missing) | set(invalid)
+
+        recorded = load_hashes(self.path)
+        for frame in self.frame_paths:
+            recorded.pop(frame, None)
+        recorded.update({f: self.hashes[f] for f in paths if f not in failed})
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({str(k): v for k, v in sorted(recorded.items())}, f, indent=1)
+        os.replace(tmp, self.path)
+        return recorded
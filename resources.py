@@ -0,0 +1,171 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+import os
+import signal
+import subprocess
+from pathlib import Path
+
+
+NUMA_NODES_DIR = Path("/sys/devices/system/node")
+
+# Niceness of background instances, keeps the interactive session usable
+BACKGROUND_NICE = 10
+
+
+def parse_cpu_list(text: str) -> list:
+    """
+    Parse a kernel cpulist.
+
+    Example:
+    "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]
+    """
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def get_available_cpus() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def get_numa_nodes() -> list:
+    """CPU lists of the NUMA nodes, [] where the topology is unknown."""
+    nodes = []
+    for cpulist in sorted(NUMA_NODES_DIR.glob("node[0-9]*/cpulist")):
+        try:
+            nodes.append(parse_cpu_list(cpulist.read_text()))
+        except (OSError, ValueError):
+            return []
+    return nodes
+
+
+def split_evenly(items: list, parts: int) -> list:
+    """Split items into parts near-equal contiguous lists, reusing items
+    round-robin when there are more parts than items."""
+    if parts > len(items):
+        return [[items[i % len(items)]] for i in range(parts)]
+    size, extra = divmod(len(items), parts)
+    result = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        result.append(items[start:end])
+        start = end
+    return result
+
+
+def get_cpu_sets(instances: int, cpus: list | None = None,
+                 nodes: list | None = None) -> list:
+    """
+    Split the CPUs between instances, one CPU list per instance.
+
+    Instances are spread over NUMA nodes in proportion to their CPU count
+    and never straddle two nodes, so each keeps its memory local.
+    """
+    cpus = sorted(get_available_cpus() if cpus is None else cpus)
+    if nodes is None:
+        nodes = get_numa_nodes()
+    available = set(cpus)
+    nodes = [sorted(available & set(node)) for node in nodes]
+    nodes = [node for node in nodes if node] or [cpus]
+
+    # Largest remainder apportionment of instances to nodes
+    quotas = [instances * len(node) / len(cpus) for node in nodes]
+    counts = [int(q) for q in quotas]
+    by_remainder = sorted(range(len(nodes)), key=lambda i: quotas[i] - counts[i],
+                          reverse=True)
+    for i in by_remainder[:instances - sum(counts)]:
+        counts[i] += 1
+
+    cpu_sets = []
+    for node, count in zip(nodes, counts):
+        if count:
+            cpu_sets.extend(split_evenly(node, count))
+    return cpu_sets
+
+
+def get_low_priority_flags() -> int:
+    """Popen creationflags lowering the priority on Windows."""
+    return getattr(subprocess, "BELOW_NORMAL_PRIORITY_CLASS", 0)
+
+
+def get_thread_ids(pid: int) -> list:
+    """Threads of process pid, just pid where they cannot be listed."""
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")] or [pid]
+    except (OSError, ValueError):
+        return [pid]
+
+
+def apply_process_limits(pid: int, cpus: list | None = None, nice: int = 0) -> None:
+    """
+    Pin process pid to cpus and lower its priority, right after it was
+    started. Every thread it already runs is limited (Linux sets both per
+    thread), the threads it starts later inherit the limits. Windows sets
+    the priority with creationflags, affinity is skipped where the platform
+    has no sched_setaffinity.
+    """
+    if os.name == "nt":
+        return
+    for tid in get_thread_ids(pid):
+        if cpus and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(tid, cpus)
+            except OSError:
+                pass
+        if nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+            except OSError:
+                pass
+
+
+def get_process_group_flags() -> int:
+    """Popen creationflags starting a new process group on Windows."""
+    return getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+
+
+def kill_process_group(process: subprocess.Popen) -> None:
+    """
+    Kill process and everything it started. The process must have been
+    started in its own session (POSIX) or process group (Windows).
+    """
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", f"{process.pid}"],
+                           stdin=subprocess.DEVNULL, capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        process.kill()
+
+
+def suspend_process_group(process: subprocess.Popen) -> bool:
+    """Stop process and its children, False where unsupported."""
+    if not hasattr(signal, "SIGSTOP") or process.poll() is not None:
+        return False
+    try:
+        os.killpg(process.pid, signal.SIGSTOP)
+    except OSError:
+        return False
+    return True
+
+
+def resume_process_group(process: subprocess.Popen) -> None:
+    if hasattr(signal, "SIGCONT"):
+        try:
+            os.killpg(process.pid, signal.SIGCONT)
+        except OSError:
+            pass
@@ -0,0 +1,164 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+import heapq
+import json
+from enum import Enum
+from pathlib import Path
+
+
+class PartitionMode(Enum):
+    CONTIGUOUS = "CONTIGUOUS"
+    INTERLEAVED = "INTERLEAVED"
+    CHUNKED = "CHUNKED"
+    BALANCED = "BALANCED"
+
+
+def frame_range(start: int, end: int, step: int = 1) -> list:
+    step = max(1, step)
+    if end < start:
+        start, end = end, start
+    return list(range(start, end + 1, step))
+
+
+def partition_frames(frames: list, instances: int,
+                     mode: PartitionMode = PartitionMode.CONTIGUOUS,
+                     chunk_size: int = 10, costs: dict | None = None) -> list:
+    """
+    Split frames into one disjoint frame list per instance.
+
+    Example (frames 1..10, 3 instances):
+    CONTIGUOUS             -> [1, 2, 3, 4], [5, 6, 7], [8, 9, 10]
+    INTERLEAVED            -> [1, 4, 7, 10], [2, 5, 8], [3, 6, 9]
+    CHUNKED (chunk_size=2) -> [1, 2, 7, 8], [3, 4, 9, 10], [5, 6]
+
+    BALANCED uses the recorded per-frame costs, see balance_frames().
+    Instances that would get no frames are dropped.
+    """
+    frames = list(frames)
+    instances = max(1, min(instances, len(frames)))
+    mode = PartitionMode(mode)
+
+    # Nothing recorded yet, an even split is the best guess
+    if mode == PartitionMode.BALANCED and not costs:
+        mode = PartitionMode.CONTIGUOUS
+
+    match mode:
+        case PartitionMode.CONTIGUOUS:
+            size, extra = divmod(len(frames), instances)
+            parts = []
+            start = 0
+            for i in range(instances):
+                end = start + size + (1 if i < extra else 0)
+                parts.append(frames[start:end])
+                start = end
+        case PartitionMode.INTERLEAVED:
+            parts = [frames[i::instances] for i in range(instances)]
+        case PartitionMode.CHUNKED:
+            chunk_size = max(1, chunk_size)
+            parts = [[] for _ in range(instances)]
+            for n, i in enumerate(range(0, len(frames), chunk_size)):
+                parts[n % instances].extend(frames[i:i + chunk_size])
+        case PartitionMode.BALANCED:
+            parts = balance_frames(frames, instances, costs)
+
+    return [part for part in parts if part]
+
+
+def balance_frames(frames: list, instances: int, costs: dict) -> list:
+    """
+    Longest-processing-time-first: the most expensive frames are placed
+    first, each on the instance with the least total cost so far.
+
+    Frames without a recorded cost are assumed to cost the average.
+    """
+    known = [costs[f] for f in frames if f in costs]
+    default = sum(known) / len(known) if known else 1.0
+
+    loads = [(0.0, i) for i in range(instances)]
+    parts = [[] for _ in range(instances)]
+    for frame in sorted(frames, key=lambda f: costs.get(f, default), reverse=True):
+        load, i = heapq.heappop(loads)
+        parts[i].append(frame)
+        heapq.heappush(loads, (load + costs.get(frame, default), i))
+
+    return [sorted(part) for part in parts]
+
+
+def get_frame_costs_path(blend_file: Path) -> Path:
+    """Sidecar file of the frame times recorded for blend_file."""
+    blend_file = Path(blend_file)
+    return blend_file.with_name(f"{blend_file.stem}.rmi_times.json")
+
+
+def get_frame_costs_key(scene: str, render_type: str) -> str:
+    return f"{scene}/{render_type}"
+
+
+def load_frame_costs(path: Path, key: str) -> dict:
+    """Per-frame render times in seconds recorded for key, {} if none."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {int(frame): float(cost)
+            for frame, cost in data.get(key, {}).items()}
+
+
+def save_frame_costs(path: Path, key: str, costs: dict) -> None:
+    """Merge new per-frame render times into the sidecar file."""
+    if not costs:
+        return
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+
+    recorded = data.setdefault(key, {})
+    for frame, cost in costs.items():
+        recorded[str(frame)] = round(cost, 3)
+
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def format_frame_spec(frames: list) -> str:
+    """
+    Format frames as a Blender "-f" frame list, collapsing consecutive runs.
+
+    Example:
+    [1, 2, 3, 7, 9, 10] -> "1..3,7,9..10"
+    """
+    runs = []
+    for frame in sorted(frames):
+        if runs and frame == runs[-1][1] + 1:
+            runs[-1][1] = frame
+        else:
+            runs.append([frame, frame])
+
+    return ",".join(
+        f"{first}" if first == last else f"{first}..{last}"
+        for first, last in runs)
+
+
+def get_frame_args(frames: list) -> list:
+    """
+    Blender command line arguments that render exactly the given frames.
+
+    Evenly spaced frames use "-s -e -j -a", anything else uses "-f".
+    """
+    frames = sorted(frames)
+    if len(frames) > 1:
+        step = frames[1] - frames[0]
+        if step > 0 and all(b - a == step for a, b in zip(frames, frames[1:])):
+            return ["-s", f"{frames[0]}", "-e", f"{frames[-1]}",
+                    "-j", f"{step}", "-a"]
+
+    return ["-f", format_frame_spec(frames)]
@@ -0,0 +1,143 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Encoded segment cache: segments are keyed by a hash of their frames'
+contents plus the encoder settings, so re-encoding after a partial
+re-render only encodes the segments whose frames changed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+
+# Frames per cached segment, fixed so boundaries stay put between runs
+CACHE_SEGMENT_FRAMES = 48
+
+INDEX_NAME = "frame_hashes.json"
+
+
+def split_fixed_segments(files: list, size: int, gop: int = 1) -> list:
+    """Segments of size frames (rounded up to a gop multiple), last shorter."""
+    size = max(gop, -(-max(1, size) // gop) * gop)
+    return [files[i:i + size] for i in range(0, len(files), size)]
+
+
+class SegmentCache:
+    """
+    Encoded segments in cache_dir, at most max_bytes in total.
+
+    Frame content hashes are remembered by path, size and mtime so frames
+    left untouched are not read again. Least recently used segments are
+    evicted first. Safe to share between encoders running at once.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hashes = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.cache_dir / INDEX_NAME
+
+    def _load_index(self) -> dict:
+        if self.hashes is None:
+            try:
+                with open(self.index_path) as f:
+                    self.hashes = json.load(f)
+            except (OSError, ValueError):
+                self.hashes = {}
+        return self.hashes
+
+    def save_index(self) -> None:
+        with self.lock:
+            hashes = dict(self._load_index())
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(hashes, f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass
+
+    def frame_hash(self, path: Path) -> str:
+        path = Path(path)
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            known = self._load_index().get(str(path))
+        if known and known[:2] == stamp:
+            return known[2]
+
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        with self.lock:
+            self._load_index()[str(path)] = stamp + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def get_key(self, files: list, encoder_args: list, fps: float) -> str:
+        """Key of a segment, changes with any frame or encoder setting."""
+        data = {
+            "encoder_args": encoder_args,
+            "fps": fps,
+            "frames": [self.frame_hash(file) for file in files],
+        }
+        return hashlib.sha1(json.dumps(data).encode()).hexdigest()
+
+    def get_path(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / "segments" / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str) -> Path | None:
+        path = self.get_path(key, suffix)
+        try:
+            # Mark as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, suffix: str, segment: Path) -> Path:
+        """Move an encoded segment into the cache and return its new path."""
+        path = self.get_path(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        shutil.move(segment, tmp)
+        os.replace(tmp, path)
+        return path
+
+    def evict(self, keep: set = frozenset()) -> list:
+        """
+        Remove least recently used segments until the cache fits max_bytes.
+        Segments in keep (paths in use) are never removed.
+        """
+        try:
+            files = [(p.stat(), p) for p in (self.cache_dir / "segments").iterdir()
+                     if p.is_file() and not p.name.startswith(".")]
+        except OSError:
+            return []
+        total = sum(stat.st_size for stat, _ in files)
+        removed = []
+        for stat, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= stat.st_size
+            removed.append(path)
+        return removed
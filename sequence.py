@@ -0,0 +1,138 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_END = b"IEND\xaeB`\x82"
+JPEG_START = b"\xff\xd8"
+JPEG_END = b"\xff\xd9"
+
+
+# Trailing frame number before the extension: shot_0012.png -> 12
+FRAME_NUMBER_RE = re.compile(r"(\d+)\.[^.]+$")
+
+# A directory modified this recently may change again within the same
+# mtime tick, so its cached listing is not trusted (like git's racy check)
+RACY_SECONDS = 1.0
+
+_cache = {}
+
+
+class FrameSequence:
+    """Image files of one directory, by frame number."""
+
+    def __init__(self, path: Path, extensions: tuple):
+        self.path = Path(path)
+        self.files = []
+        self.frames = {}
+
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(extensions) and not entry.is_dir():
+                        file = self.path / entry.name
+                        self.files.append(file)
+                        if match := FRAME_NUMBER_RE.search(entry.name):
+                            self.frames[int(match.group(1))] = file
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+
+        self.files.sort()
+
+    def __bool__(self) -> bool:
+        return bool(self.files)
+
+    def missing_frames(self, start: int | None = None, end: int | None = None,
+                       step: int = 1) -> list:
+        """Frames absent from start..end (default: first..last found)."""
+        if not self.frames and (start is None or end is None):
+            return []
+        start = min(self.frames) if start is None else start
+        end = max(self.frames) if end is None else end
+        return [f for f in range(start, end + 1, max(1, step))
+                if f not in self.frames]
+
+
+def is_valid_frame(path: Path) -> bool:
+    """
+    Check a rendered frame is complete: not empty and, for PNG and JPEG,
+    starting with the format signature and ending with its end marker.
+    Files of other formats only need to be non-empty.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return False
+        suffix = Path(path).suffix.lower()
+        if suffix not in {".png", ".jpg", ".jpeg"}:
+            return True
+        with open(path, "rb") as f:
+            head = f.read(8)
+            f.seek(max(0, size - 16))
+            tail = f.read()
+    except OSError:
+        return False
+
+    if suffix == ".png":
+        return head.startswith(PNG_SIGNATURE) and tail.endswith(PNG_END)
+    # Some writers pad JPEGs after the end marker
+    return head.startswith(JPEG_START) and JPEG_END in tail
+
+
+def check_frames(paths: dict, workers: int = 16) -> tuple:
+    """
+    Split frames into (missing, invalid): files that do not exist, and
+    files that exist but are empty, truncated or not decodable.
+
+    Runs from a thread pool since NAS round trips dominate.
+    """
+    def check(path):
+        if not os.path.exists(path):
+            return "missing"
+        return "ok" if is_valid_frame(path) else "invalid"
+
+    with ThreadPoolExecutor(workers) as executor:
+        states = dict(zip(paths, executor.map(check, paths.values())))
+
+    missing = sorted(f for f, state in states.items() if state == "missing")
+    invalid = sorted(f for f, state in states.items() if state == "invalid")
+    return missing, invalid
+
+
+def scan_directory(path: Path, extensions: tuple) -> FrameSequence:
+    """
+    Cached FrameSequence of path.
+
+    The listing is reused until the directory's mtime changes, so repeated
+    calls (UI redraws) cost a single stat.
+    """
+    key = (os.fspath(path), extensions)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        _cache.pop(key, None)
+        return FrameSequence(path, extensions)
+
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    sequence = FrameSequence(path, extensions)
+    if time.time() - mtime / 1e9 > RACY_SECONDS:
+        _cache[key] = (mtime, sequence)
+    else:
+        _cache.pop(key, None)
+    return sequence
+
+
+def clear_cache() -> None:
+    _cache.clear()
@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Local scratch staging: instances save frames to a fast local directory
+and a FrameMover copies them to the output directory (e.g. a network
+share) in batches, under the same names.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# Verify modes before a scratch file is deleted
+KEEP = 'KEEP'
+VERIFY_SIZE = 'VERIFY_SIZE'
+VERIFY_HASH = 'VERIFY_HASH'
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_copy(src: Path, dest: Path, mode: str) -> bool:
+    if os.path.getsize(src) != os.path.getsize(dest):
+        return False
+    if mode == VERIFY_HASH:
+        return file_hash(src) == file_hash(dest)
+    return True
+
+
+class FrameMover:
+    """
+    Background thread moving staged frames from scratch_dir to output_dir.
+
+    Saved frames are queued with add() and copied in batches by a few
+    parallel copies, hiding the latency of network storage. Each copy goes
+    to a temporary name first so readers never see partial frames. Unless
+    cleanup is KEEP, the scratch file is deleted once the copy is verified.
+    After finish(), files left in scratch_dir (never reported, e.g. by
+    instances in terminals) are moved too before the mover stops, and the
+    scratch directory is removed if nothing had to be kept.
+    """
+
+    def __init__(self, scratch_dir: Path, output_dir: Path,
+                 cleanup: str = VERIFY_SIZE, batch_size: int = 32,
+                 interval: float = 2.0, copies: int = 4):
+        self.scratch_dir = Path(scratch_dir)
+        self.output_dir = Path(output_dir)
+        self.cleanup = cleanup
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.copies = max(1, copies)
+        self.pending = []
+        self.queued = set()
+        self.condition = threading.Condition()
+        self.finishing = False
+        self.thread = None
+        self.moved = set()
+        self.failed = []
+        self.listeners = []
+        self.finish_listeners = []
+
+    def get_destination(self, path: Path) -> Path:
+        return self.output_dir / Path(path).relative_to(self.scratch_dir)
+
+    def add_listener(self, func) -> None:
+        """Call func(frame, path) with the output path of each moved frame."""
+        self.listeners.append(func)
+
+    def add_finish_listener(self, func) -> None:
+        """Call func(mover) once every frame is moved after finish()."""
+        self.finish_listeners.append(func)
+
+    def add(self, frame: int | None, path: str, *_args) -> None:
+        """Queue a completely written scratch frame, safe from any thread."""
+        with self.condition:
+            if path not in self.queued:
+                self.queued.add(path)
+                self.pending.append((frame, Path(path)))
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+
+    def start(self) -> None:
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def finish(self) -> None:
+        """No more frames will be saved, move what is left and stop."""
+        with self.condition:
+            self.finishing = True
+            self.condition.notify()
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def _next_batch(self) -> list | None:
+        with self.condition:
+            if not self.finishing and len(self.pending) < self.batch_size:
+                self.condition.wait(self.interval)
+            if not self.pending:
+                return None if self.finishing else []
+            batch = self.pending[:self.batch_size]
+            del self.pending[:self.batch_size]
+            return batch
+
+    def _sweep(self) -> list:
+        """Scratch files never reported, oldest first."""
+        files = [p for p in self.scratch_dir.rglob("*") if p.is_file()]
+        return [(None, p) for p in sorted(files, key=lambda p: p.stat().st_mtime)]
+
+    def move(self, frame: int | None, src: Path) -> Path | None:
+        dest = self.get_destination(src)
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_name(f".{dest.name}.rmi_tmp")
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, dest)
+            if self.cleanup != KEEP:
+                if not verify_copy(src, dest, self.cleanup):
+                    raise OSError(f"Copy of {src} does not match")
+                src.unlink()
+        except (OSError, ValueError) as e:
+            print(f"RMI: frame not moved from scratch: {e}")
+            self.failed.append(src)
+            return None
+        self.moved.add(src)
+        for func in self.listeners:
+            func(frame, str(dest))
+        return dest
+
+    def _move_batch(self, executor: ThreadPoolExecutor, batch: list) -> None:
+        list(executor.map(lambda item: self.move(*item), batch))
+
+    def _run(self) -> None:
+        with ThreadPoolExecutor(self.copies) as executor:
+            while (batch := self._next_batch()) is not None:
+                self._move_batch(executor, batch)
+            swept = [item for item in self._sweep()
+                     if item[1] not in self.moved and item[1] not in self.failed]
+            self._move_batch(executor, swept)
+        if self.cleanup != KEEP and not self.failed:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        for func in self.finish_listeners:
+            func(self)
@@ -8,6 +8,7 @@ If run outside Blender, it mocks the 'bpy' module to allow tests to execute.
 
 import sys
 import os
+import types
 import unittest
 from unittest.mock import MagicMock
 
@@ -18,6 +19,14 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 if 'bpy' not in sys.modules:
     sys.modules['bpy'] = MagicMock()
 
+# Register the addon directory as a package so its relative imports resolve,
+# without running __init__.py (which registers Blender classes)
+ADDON_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if 'render_multiple_instances' not in sys.modules:
+    addon = types.ModuleType('render_multiple_instances')
+    addon.__path__ = [ADDON_ROOT]
+    sys.modules['render_multiple_instances'] = addon
+
 # Discover and run tests
 test_suite = unittest.TestLoader().discover('tests', pattern='test_*.py')
 result = unittest.TextTestRunner(verbosity=2).run(test_suite)
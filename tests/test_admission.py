@@ -0,0 +1,103 @@
+from render_multiple_instances.admission import AdmissionControl, read_mem_available
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+GB = 1024 ** 3
+
+
+class FakeInstance:
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.finished = False
+        self.suspended = False
+        self.progress = SimpleNamespace(frames_done=0)
+
+    @property
+    def running(self):
+        return self.process is not None and not self.finished
+
+    def suspend(self):
+        self.suspended = True
+        return True
+
+    def resume(self):
+        self.suspended = False
+
+
+class FakePool:
+
+    def __init__(self, count):
+        self.instances = [FakeInstance(i) for i in range(count)]
+
+    def start_instance(self, instance):
+        instance.process = SimpleNamespace(pid=instance.index)
+
+
+class TestAdmission(unittest.TestCase):
+
+    def test_read_mem_available(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "meminfo"
+            path.write_text("MemTotal: 16000000 kB\nMemAvailable: 8000000 kB\n")
+            self.assertEqual(read_mem_available(path), 8000000 * 1024)
+            self.assertIsNone(read_mem_available(Path(tmp) / "missing"))
+
+    def test_admission(self):
+        """
+        Instances start one at a time while an estimate fits above the
+        headroom, the newest is paused under pressure and resumed after.
+        """
+        pool = FakePool(4)
+        external = [0]
+
+        def get_available():
+            # Paused instances keep their memory
+            used = sum(3 * GB for i in pool.instances if i.running)
+            return 10 * GB - used - external[0]
+
+        admission = AdmissionControl(2 * GB, get_available,
+                                     get_rss=lambda pid: 3 * GB,
+                                     clock=lambda: 0)
+        admission.start(pool)
+        started = lambda: [i.index for i in pool.instances if i.process]
+
+        self.assertEqual(started(), [0])
+        # Waiting for the first frame to know how much an instance needs
+        admission.check(pool)
+        self.assertEqual(started(), [0])
+
+        pool.instances[0].progress.frames_done = 1
+        admission.check(pool)
+        admission.check(pool)
+        self.assertEqual(started(), [0, 1])
+        self.assertEqual((admission.effective, admission.held), (2, 2))
+
+        external[0] = 3 * GB
+        admission.check(pool)
+        self.assertTrue(pool.instances[1].suspended)
+        self.assertEqual(admission.effective, 1)
+        # The last running instance is never paused
+        admission.check(pool)
+        self.assertFalse(pool.instances[0].suspended)
+
+        external[0] = 0
+        admission.check(pool)
+        self.assertFalse(pool.instances[1].suspended)
+        self.assertEqual(admission.effective, 2)
+
+        pool.instances[0].finished = True
+        admission.check(pool)
+        self.assertEqual(started(), [0, 1, 2])
+
+    def test_without_meminfo(self):
+        pool = FakePool(3)
+        AdmissionControl(GB, lambda: None).start(pool)
+        self.assertTrue(all(i.process for i in pool.instances))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from render_multiple_instances.batch import (
+    PROBE_PREFIX,
+    get_marker_range,
+    parse_probe_output,
+    resolve_job,
+)
+import json
+import unittest
+
+
+SCENES = {
+    "Main": {"frame_start": 1, "frame_end": 300, "frame_step": 1, "fps": 24.0,
+             "output": "/renders/main_", "camera": "Cam",
+             "markers": [["sh020", 101], ["sh010", 1], ["sh030", 201]]},
+}
+
+
+def make_entry(**kwargs):
+    entry = {"blend_file": "/shots/a.blend", "scene": "Main", "camera": "",
+             "range_mode": 'SCENE', "frame_start": 1, "frame_end": 10,
+             "marker": "", "output": "", "encode": True}
+    entry.update(kwargs)
+    return entry
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_get_marker_range(self):
+        markers = SCENES["Main"]["markers"]
+        self.assertEqual(get_marker_range(markers, "sh010", 300), (1, 100))
+        self.assertEqual(get_marker_range(markers, "sh030", 300), (201, 300))
+        with self.assertRaises(ValueError):
+            get_marker_range(markers, "sh999", 300)
+
+    def test_resolve_job(self):
+        job = resolve_job(2, make_entry(range_mode='MARKER', marker="sh020"), SCENES)
+        self.assertEqual(job["frames"], list(range(101, 201)))
+        self.assertEqual(job["output_pattern"], "/renders/main_")
+        self.assertEqual(job["id"], 2)
+
+        job = resolve_job(0, make_entry(range_mode='CUSTOM', scene="",
+                                        output="/out/b_"), SCENES)
+        self.assertEqual(job["frames"], list(range(1, 11)))
+        self.assertEqual(job["scene"], "Main")
+        self.assertEqual(job["output_pattern"], "/out/b_")
+
+        with self.assertRaises(ValueError):
+            resolve_job(0, make_entry(scene="Missing"), SCENES)
+
+    def test_parse_probe_output(self):
+        output = "Blender 4.2\nRead blend\n" + PROBE_PREFIX + json.dumps(SCENES) + "\n"
+        self.assertEqual(parse_probe_output(output), SCENES)
+        with self.assertRaises(ValueError):
+            parse_probe_output("Error: cannot read file\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+from render_multiple_instances.cli import RenderJob, build_parser, get_job, parse_range, run_job, wait_for_pool
+import contextlib
+import io
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+FAKE_BLENDER = Path(__file__).resolve().parents[1] / "benchmarks" / "fake_blender.py"
+
+
+class TestCli(unittest.TestCase):
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("1-5"), [1, 2, 3, 4, 5])
+        self.assertEqual(parse_range("1-9:4,20"), [1, 5, 9, 20])
+        self.assertEqual(parse_range("7"), [7])
+        with self.assertRaises(ValueError):
+            parse_range("5-1")
+
+    def test_job_commands(self):
+        """Arguments become settings, overrides go before the frame arguments."""
+        with tempfile.TemporaryDirectory() as tmp:
+            blend_file = Path(tmp) / "shot.blend"
+            blend_file.touch()
+            args = build_parser().parse_args([
+                "render", str(blend_file), "--blender", sys.executable,
+                "--instances", "2", "--range", "1-4", "--scene", "Shot",
+                "--output", "/renders/shot_####", "--partition-mode", "interleaved"])
+            job = get_job(args)
+
+            self.assertEqual(job.frames, [1, 2, 3, 4])
+            self.assertEqual(job.partition_mode, 'INTERLEAVED')
+            self.assertEqual(job.output_dir, Path("/renders"))
+            self.assertEqual(job.get_blender_args(),
+                             ["-S", "Shot", "-o", "/renders/shot_####"])
+            with self.assertRaises(TypeError):
+                RenderJob(blend_file, sys.executable, [1], samples=4)
+
+    @unittest.skipIf(os.name == "nt", "Needs a shell script as FFmpeg")
+    def test_unknown_encoder(self):
+        """--encode must name an encoder the FFmpeg on the PATH has."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            ffmpeg = tmp / "ffmpeg"
+            ffmpeg.write_text('#!/bin/sh\necho " V....D libx264  libx264 H.264"\n')
+            ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IXUSR)
+            blend_file = tmp / "shot.blend"
+            blend_file.touch()
+            argv = ["render", str(blend_file), "--blender", sys.executable,
+                    "--range", "1-4", "--output", str(tmp / "frame_"), "--fps", "24"]
+
+            with patch.dict(os.environ, {"PATH": str(tmp)}):
+                job = get_job(build_parser().parse_args(argv + ["--encode", "libx264"]))
+                self.assertEqual(job.encoder, "libx264")
+                with self.assertRaises(ValueError):
+                    get_job(build_parser().parse_args(argv + ["--encode", "libx265"]))
+
+    @unittest.skipIf(os.name == "nt", "Needs a shell script as Blender")
+    def test_balanced_frame_times(self):
+        """BALANCED splits frames by the times recorded next to the blend file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            blender = tmp / "blender"
+            blender.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_BLENDER}" "$@"\n')
+            blender.chmod(blender.stat().st_mode | stat.S_IXUSR)
+            blend_file = tmp / "shot.blend"
+            blend_file.touch()
+            (tmp / "shot.rmi_times.json").write_text(json.dumps(
+                {"Shot/render": {"1": 10.0, "2": 1.0, "3": 1.0, "4": 1.0}}))
+
+            job = RenderJob(blend_file, blender, [1, 2, 3, 4], instances=2,
+                            partition_mode='BALANCED', scene="Shot",
+                            output=str(tmp / "frame_"))
+            pool = job.start()
+            with contextlib.redirect_stdout(io.StringIO()):
+                wait_for_pool(pool)
+            self.assertEqual([i.frames for i in pool.instances], [[1], [2, 3, 4]])
+
+    @unittest.skipIf(os.name == "nt", "Needs a shell script as Blender")
+    def test_run_job(self):
+        """Every frame is rendered by background instances, exit status 0."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            blender = tmp / "blender"
+            blender.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_BLENDER}" "$@"\n')
+            blender.chmod(blender.stat().st_mode | stat.S_IXUSR)
+            blend_file = tmp / "shot.blend"
+            blend_file.touch()
+
+            for mode in ('CHUNKED', 'DYNAMIC'):
+                output = tmp / mode / "frame_"
+                job = RenderJob(blend_file, blender, range(1, 9), instances=3,
+                                partition_mode=mode, chunk_size=2, output=str(output))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(run_job(job), 0)
+                saved = sorted(path.name for path in output.parent.glob("*.png"))
+                self.assertEqual(saved, [f"frame_{f:04d}.png" for f in range(1, 9)])
+
+                # A frame that is not saved fails the job
+                job.frames.append(9)
+                (output.parent / "frame_0009.png").write_bytes(b"broken")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(run_job(job), 1)
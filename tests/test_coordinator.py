@@ -0,0 +1,134 @@
+from render_multiple_instances.coordinator import (
+    BatchQueue,
+    FrameQueue,
+    FrameQueueServer,
+)
+import json
+import socket
+import threading
+import time
+import unittest
+
+
+class Worker:
+    """Minimal stand-in for worker.py speaking the coordinator protocol."""
+
+    def __init__(self, server, name, host="localhost", token=None):
+        self.name = name
+        self.host = host
+        self.token = server.token if token is None else token
+        self.sock = socket.create_connection(server.address)
+        self.stream = self.sock.makefile("rw")
+
+    def request(self, message):
+        message = dict(message, worker=self.name, token=self.token)
+        self.stream.write(json.dumps(message) + "\n")
+        self.stream.flush()
+        return json.loads(self.stream.readline())
+
+    def run(self, rendered, seconds_per_frame=0.0):
+        self.request({"op": "register", "host": self.host})
+        while chunk := self.request({"op": "next"})["frames"]:
+            time.sleep(seconds_per_frame * len(chunk))
+            rendered.extend(chunk)
+            self.request({"op": "done", "frames": chunk,
+                          "seconds": seconds_per_frame * len(chunk) or 0.01})
+        self.sock.close()
+
+
+class TestCoordinator(unittest.TestCase):
+
+    def test_frame_queue_release(self):
+        """
+        Frames of a worker that goes away are handed out again.
+        """
+        queue = FrameQueue(range(1, 11), chunk_size=4, workers=1)
+
+        chunk = queue.next_chunk("a")
+        self.assertEqual(chunk, [1, 2, 3, 4])
+        self.assertEqual(queue.release("a"), chunk)
+        self.assertEqual(queue.next_chunk("b"), chunk)
+        queue.complete("b", chunk)
+        self.assertEqual(queue.remaining, 6)
+        self.assertFalse(queue.finished.is_set())
+
+    def test_slow_worker_gets_smaller_chunks(self):
+        """
+        Chunk sizes follow each worker's measured throughput.
+        """
+        queue = FrameQueue(range(1, 1001), chunk_size=8, workers=2)
+        queue.register("fast", "node-1")
+        queue.register("slow", "node-2")
+        queue.complete("fast", queue.next_chunk("fast"), seconds=8)
+        queue.complete("slow", queue.next_chunk("slow"), seconds=32)
+
+        self.assertEqual(len(queue.next_chunk("slow")), 3)
+        self.assertEqual(len(queue.next_chunk("fast")), 13)
+
+        nodes = queue.node_stats()
+        self.assertAlmostEqual(nodes["node-1"]["frames_per_minute"], 60.0)
+        self.assertAlmostEqual(nodes["node-2"]["frames_per_minute"], 15.0)
+
+    def test_batch_queue(self):
+        """
+        Workers move on to the next job once the current one is handed out,
+        and each job finishes on its own.
+        """
+        jobs = [{"id": 0, "scene": "A", "frames": [1, 2]},
+                {"id": 1, "scene": "B", "frames": [1]}]
+        queue = BatchQueue(jobs, chunk_size=1, workers=1)
+
+        self.assertEqual(queue.next_work("a"),
+                         {"frames": [1], "job": {"id": 0, "scene": "A"}})
+        self.assertEqual(queue.next_work("b")["job"]["id"], 0)
+        work = queue.next_work("c")
+        self.assertEqual(work["job"]["id"], 1)
+        queue.complete("c", work["frames"], job=1)
+        self.assertEqual(queue.finished_jobs(), [1])
+        self.assertEqual(queue.next_work("c"), {"frames": []})
+
+        # Frames of a lost worker go back to their own job
+        queue.release("a")
+        self.assertEqual(queue.remaining, 2)
+        queue.complete("b", [2], job=0)
+        queue.complete("c", queue.next_work("c")["frames"], job=0)
+        self.assertTrue(queue.finished.is_set())
+
+    def test_frame_queue_server(self):
+        """
+        Several workers pulling from the server render every frame once.
+        """
+        frames = list(range(1, 101))
+        queue = FrameQueue(frames, chunk_size=5, workers=4)
+        server = FrameQueueServer(queue, blend_file="/shared/shot.blend")
+        server.start()
+        rendered = []
+
+        workers = [Worker(server, f"w{i}", host=f"node-{i % 2}")
+                   for i in range(4)]
+        self.assertEqual(workers[0].request({"op": "register", "host": "node-0"}),
+                         {"blend_file": "/shared/shot.blend"})
+
+        threads = [threading.Thread(target=w.run, args=(rendered,))
+                   for w in workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Wrong token is refused
+        intruder = Worker(server, "x", token="wrong")
+        self.assertIn("error", intruder.request({"op": "next"}))
+        intruder.sock.close()
+
+        nodes = Worker(server, "s").request({"op": "stats"})["nodes"]
+        server.stop()
+
+        self.assertTrue(queue.finished.is_set())
+        self.assertEqual(sorted(rendered), frames)
+        self.assertEqual(sum(n["frames"] for n in nodes.values()), 100)
+        self.assertEqual(sorted(nodes), ["node-0", "node-1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
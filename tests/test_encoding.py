@@ -0,0 +1,159 @@
+from render_multiple_instances.encoding import (
+    SegmentedEncoder,
+    StreamingEncoder,
+    check_profiles,
+    get_encoder_args,
+    get_gop_size,
+    get_output_args,
+    get_stream_command_list,
+    probe_ffmpeg,
+    split_segments,
+)
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_get_stream_command_list(self):
+        cmd = get_stream_command_list(
+            "libx264", 20, 24, "png", Path("/out/flipbook.mp4"))
+        self.assertEqual(cmd[:9], ["ffmpeg", "-f", "image2pipe",
+                                   "-framerate", "24", "-c:v", "png", "-i", "-"])
+        self.assertEqual(cmd[-2:], ["-y", "/out/flipbook.mp4"])
+        self.assertIn("libx264", cmd)
+
+    def test_get_output_args(self):
+        """One profile encodes as before, several share a split filter graph."""
+        master = {"encoder": "libx264", "quality": 18, "scale": 100, "container": 'MP4'}
+        proxy = {"encoder": "libx264", "quality": 28, "scale": 50, "container": 'MKV'}
+        self.assertEqual(get_output_args([master], [Path("/out/a.mp4")]),
+                         get_encoder_args("libx264", 18) + ["-y", "/out/a.mp4"])
+
+        args = get_output_args([master, proxy], [Path("/out/a.mp4"), Path("/out/b.mkv")])
+        self.assertEqual(args[:2], [
+            "-filter_complex",
+            "[0:v]split=2[s0][s1];[s1]scale=trunc(iw*0.5/2)*2:trunc(ih*0.5/2)*2[v1]"])
+        first = args.index("/out/a.mp4")
+        self.assertEqual(args[2:first + 1], ["-map", "[s0]"] +
+                         get_encoder_args("libx264", 18) + ["-y", "/out/a.mp4"])
+        self.assertEqual(args[first + 1:], ["-map", "[v1]"] +
+                         get_encoder_args("libx264", 28) + ["-y", "/out/b.mkv"])
+
+    def test_check_profiles(self):
+        """Repeated profiles are dropped, encoders must fit their container."""
+        master = {"encoder": "libx264", "quality": 18, "scale": 100, "container": 'MP4'}
+        proxy = {"encoder": "libvpx-vp9", "quality": 30, "scale": 50, "container": 'WEBM'}
+        self.assertEqual(check_profiles([master, proxy, dict(master), dict(proxy)]),
+                         [master, proxy])
+        with self.assertRaises(ValueError):
+            check_profiles([master, dict(master, container='WEBM')])
+
+    def test_streaming_encoder_order(self):
+        """
+        Frames reach the encoder in sequence order whatever order they are
+        saved in; frames that never show up are left out.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            output = tmp / "stream.bin"
+            paths = {}
+            for frame in range(1, 6):
+                paths[frame] = str(tmp / f"frame_{frame:04d}.png")
+                if frame != 4:
+                    Path(paths[frame]).write_bytes(f"<{frame}>".encode())
+
+            # Stand-in for ffmpeg writing stdin to a file
+            cmd = [sys.executable, "-c",
+                   "import shutil, sys; "
+                   f"shutil.copyfileobj(sys.stdin.buffer, open({str(output)!r}, 'wb'))"]
+            encoder = StreamingEncoder(cmd, paths, tmp / "encode.log")
+            encoder.start()
+
+            for frame in (3, 1, 2):
+                encoder.frame_done(frame)
+            deadline = time.monotonic() + 10
+            while encoder.frames_written < 3:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+            encoder.finish()
+            encoder.feeder.join(timeout=10)
+            encoder.process.wait(timeout=10)
+
+            self.assertEqual(output.read_bytes(), b"<1><2><3><5>")
+
+    def test_split_segments(self):
+        """
+        Segments cover every frame once and their length is a GOP multiple.
+        """
+        files = list(range(100))
+
+        segments = split_segments(files, 4)
+        self.assertEqual([len(s) for s in segments], [25, 25, 25, 25])
+
+        segments = split_segments(files, 3, gop=12)
+        self.assertEqual([len(s) for s in segments], [36, 36, 28])
+        self.assertEqual(sum(segments, []), files)
+
+        self.assertEqual(get_gop_size(get_encoder_args("libx265", 20)), 1)
+        self.assertEqual(get_gop_size(["-g", "12"]), 12)
+
+    def test_segmented_encoder_join(self):
+        """
+        Segments are joined with stream copy into the final output.
+        """
+        encoder = SegmentedEncoder(
+            [], ["-c:v", "libx264"], 24, Path("/out/shot.mp4"),
+            Path("/out/segments"), 4, Path("/out/encode.log"))
+        cmd = encoder.get_join_command_list(Path("/out/segments/segments.txt"))
+        self.assertEqual(cmd, [
+            "ffmpeg", "-safe", "0", "-f", "concat",
+            "-i", "/out/segments/segments.txt",
+            "-c", "copy", "-y", "/out/shot.mp4"])
+
+    def test_probe_ffmpeg_cache(self):
+        """
+        Wanted encoders are detected with their capabilities, and the probe
+        is not repeated while the ffmpeg binary is unchanged.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            calls = Path(tmp, "calls.txt")
+            ffmpeg = Path(tmp, "ffmpeg")
+            ffmpeg.write_text(
+                f"#!{sys.executable}\n"
+                "import sys\n"
+                f"open({str(calls)!r}, 'a').write('x')\n"
+                "if '-encoders' in sys.argv:\n"
+                "    print(' V....D libx264   libx264 H.264 / AVC (codec h264)')\n"
+                "    print(' VFS..D libx265   libx265 H.265 / HEVC (codec hevc)')\n"
+                "    print(' V....D png       PNG (Portable Network Graphics) image')\n"
+                "else:\n"
+                "    print('    Supported pixel formats: yuv420p yuv444p')\n")
+            os.chmod(ffmpeg, 0o755)
+            cache_path = Path(tmp, "cache", "ffmpeg_probe.json")
+
+            encoders = probe_ffmpeg(str(ffmpeg), cache_path)
+            self.assertEqual(sorted(encoders), ["libx264", "libx265"])
+            self.assertTrue(encoders["libx265"]["frame_threads"])
+            self.assertFalse(encoders["libx264"]["slice_threads"])
+            self.assertEqual(encoders["libx264"]["pixel_formats"],
+                             ["yuv420p", "yuv444p"])
+            self.assertEqual(calls.read_text(), "xxx")
+
+            self.assertEqual(probe_ffmpeg(str(ffmpeg), cache_path), encoders)
+            self.assertEqual(calls.read_text(), "xxx")
+
+            # A changed list of wanted encoders probes again
+            with patch("render_multiple_instances.encoding.WANTED_ENCODERS", ("libx264",)):
+                self.assertEqual(sorted(probe_ffmpeg(str(ffmpeg), cache_path)), ["libx264"])
+            self.assertEqual(calls.read_text(), "xxxxx")
+
+
+if __name__ == '__main__':
+    unittest.main()
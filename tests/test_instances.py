@@ -0,0 +1,46 @@
+from render_multiple_instances import instances
+from render_multiple_instances.instances import RenderInstance, InstancePool
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+class TestInstances(unittest.TestCase):
+
+    def run_pool(self, pool, timeout=30):
+        deadline = time.monotonic() + timeout
+        while pool.poll():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    @patch.object(instances, 'LOG_TAIL_LINES', 10)
+    @patch.object(instances, 'LOG_MAX_BYTES', 2000)
+    def test_output_streamed_to_rotating_log(self):
+        """
+        Output goes to rotating log files, only a bounded tail stays in memory.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = Path(tmp) / "instance_00.log"
+            cmd = [sys.executable, "-c",
+                   "for i in range(500): print(f'Fra:{i} line')"]
+            cleaned = []
+
+            pool = InstancePool()
+            instance = pool.add(RenderInstance(0, cmd, log_path))
+            pool.add_cleanup(lambda: cleaned.append(True))
+            pool.start()
+            self.run_pool(pool)
+
+            self.assertEqual(pool.returncodes, [0])
+            self.assertEqual(cleaned, [True])
+            self.assertEqual(len(instance.tail), 10)
+            self.assertEqual(instance.tail[-1], "Fra:499 line")
+            self.assertTrue(log_path.with_name("instance_00.log.1").exists())
+            self.assertLessEqual(log_path.stat().st_size, 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from render_multiple_instances.instances import RenderInstance, InstancePool
+from render_multiple_instances.metrics import EventLog, write_prometheus_textfile
+from render_multiple_instances.progress import JobProgress
+import json
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_event_log(self):
+        """
+        A pool run logs spawn, frame and exit events, and the textfile
+        has the totals per host.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            frame_path = tmp / "frame_0001.png"
+            frame_path.write_bytes(b"x" * 100)
+            script = (f"print('Fra:1 Mem:1M'); print(\"Saved: '{frame_path.as_posix()}'\")\n"
+                      "import sys; sys.exit(3)")
+
+            events = EventLog(tmp / "events.jsonl", "shot/render/1",
+                              textfile=tmp / "rmi.prom")
+            pool = InstancePool(JobProgress(1))
+            pool.add(RenderInstance(0, [sys.executable, "-c", script],
+                                    tmp / "instance_00.log"))
+            events.job_start(frames=1)
+            events.watch_pool(pool)
+            pool.start()
+            deadline = time.monotonic() + 30
+            while pool.poll():
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.05)
+            events.job_end(status="failed")
+
+            records = [json.loads(line) for line in
+                       (tmp / "events.jsonl").read_text().splitlines()]
+            self.assertEqual([r["event"] for r in records],
+                             ["job_start", "instance_spawn", "frame_start",
+                              "frame_finish", "instance_exit", "job_end"])
+            self.assertEqual(records[3]["bytes"], 100)
+            self.assertEqual(records[4]["returncode"], 3)
+            self.assertEqual(records[5]["failed_instances"], 1)
+
+            textfile = (tmp / "rmi.prom").read_text()
+            self.assertIn(f'rmi_frames_total{{host="{events.host}",'
+                          f'job_id="shot/render/1"}} 1', textfile)
+            self.assertIn('rmi_instance_failures_total{job_id="shot/render/1"} 1',
+                          textfile)
+
+    def test_prometheus_textfile_groups_samples(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "rmi.prom"
+            write_prometheus_textfile(path, [
+                ("rmi_frames_total", "counter", "Frames", {"host": "a"}, 1),
+                ("rmi_fps", "gauge", "Rate", {"host": "a"}, 0.5),
+                ("rmi_frames_total", "counter", "Frames", {"host": 'b"1'}, 2),
+            ])
+            self.assertEqual(path.read_text().splitlines(), [
+                "# HELP rmi_frames_total Frames",
+                "# TYPE rmi_frames_total counter",
+                'rmi_frames_total{host="a"} 1',
+                'rmi_frames_total{host="b\\"1"} 2',
+                "# HELP rmi_fps Rate",
+                "# TYPE rmi_fps gauge",
+                'rmi_fps{host="a"} 0.5',
+            ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+from render_multiple_instances.preview import (
+    apply_overrides,
+    get_engine_id,
+    get_preview_overrides,
+    restore_overrides,
+)
+import unittest
+from types import SimpleNamespace
+
+
+class TestPreview(unittest.TestCase):
+
+    def test_get_engine_id(self):
+        self.assertEqual(get_engine_id('KEEP', ['CYCLES']), None)
+        self.assertEqual(get_engine_id('WORKBENCH', []), 'BLENDER_WORKBENCH')
+        self.assertEqual(get_engine_id('EEVEE', ['BLENDER_EEVEE_NEXT', 'CYCLES']),
+                         'BLENDER_EEVEE_NEXT')
+        self.assertEqual(get_engine_id('EEVEE', ['BLENDER_EEVEE']), 'BLENDER_EEVEE')
+
+    def test_apply_and_restore_overrides(self):
+        """
+        Existing settings are overridden and restored, samples never raised,
+        missing ones (disabled engine add-ons) skipped.
+        """
+        scene = SimpleNamespace(
+            render=SimpleNamespace(engine='CYCLES', use_simplify=False,
+                                   simplify_subdivision_render=6,
+                                   simplify_volumes=1.0, use_motion_blur=True),
+            cycles=SimpleNamespace(samples=4096, use_denoising=False),
+            eevee=SimpleNamespace(taa_render_samples=8),
+        )
+        originals = apply_overrides(
+            scene, get_preview_overrides(16, 1, 'BLENDER_WORKBENCH'))
+
+        self.assertEqual(scene.render.engine, 'BLENDER_WORKBENCH')
+        self.assertEqual(scene.cycles.samples, 16)
+        self.assertEqual(scene.eevee.taa_render_samples, 8)
+        self.assertTrue(scene.cycles.use_denoising)
+        self.assertEqual(scene.render.simplify_subdivision_render, 1)
+        self.assertFalse(scene.render.use_motion_blur)
+
+        restore_overrides(scene, originals)
+        self.assertEqual(scene.render.engine, 'CYCLES')
+        self.assertEqual(scene.cycles.samples, 4096)
+        self.assertEqual(scene.render.simplify_volumes, 1.0)
+        self.assertTrue(scene.render.use_motion_blur)
+
+        del scene.cycles
+        self.assertNotIn("cycles.samples",
+                         apply_overrides(scene, get_preview_overrides(16, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
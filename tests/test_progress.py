@@ -0,0 +1,57 @@
+from render_multiple_instances.progress import JobProgress, format_duration
+import unittest
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgress(unittest.TestCase):
+
+    def test_job_progress(self):
+        """
+        Frames complete on "Saved:" lines and feed throughput and ETA.
+        """
+        clock = FakeClock()
+        job = JobProgress(total_frames=10, clock=clock)
+        instance = job.add_instance()
+
+        output = [
+            (0, "Fra:1 Mem:210.43M (Peak 213.01M) | Time:00:00.10 | Syncing"),
+            (5, "Fra:1 Mem:210.43M (Peak 213.01M) | Time:00:05.00 | Rendering"),
+            (6, "Saved: '/renders/shot_0001.png'"),
+            (6, " Time: 00:06.00 (Saving: 00:00.01)"),
+            (6, "Fra:2 Mem:210.43M (Peak 213.01M) | Time:00:00.10 | Syncing"),
+            (12, "Saved: '/renders/shot_0002.png'"),
+            (12, 'skipping existing frame "/renders/shot_0003.png"'),
+        ]
+        completed = []
+        for clock.now, line in output:
+            completed.append(instance.feed(line))
+
+        self.assertEqual([f for f in completed if f], [1, 2])
+        self.assertEqual(instance.durations, {1: 6, 2: 6})
+        self.assertEqual(job.frames_done, 3)
+        self.assertAlmostEqual(job.frames_per_minute, 10.0)
+        self.assertAlmostEqual(job.average_frame_time, 6.0)
+        self.assertAlmostEqual(job.eta, 42.0)
+
+    def test_format_duration(self):
+        test_cases = [
+            (None, "--"),
+            (5.4, "5s"),
+            (125, "2m 05s"),
+            (3723, "1h 02m 03s"),
+        ]
+
+        for seconds, expected_output in test_cases:
+            self.assertEqual(format_duration(seconds), expected_output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from render_multiple_instances.coordinator import FrameQueue
+from render_multiple_instances.rawvideo import RawFrameServer, RawVideoEncoder
+import json
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+COPY_STDIN = "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], 'wb'))"
+
+
+class TestRawVideo(unittest.TestCase):
+
+    def test_reorder_window(self):
+        """Frames are written in order, frames too far ahead are held back."""
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "out.raw"
+            encoder = RawVideoEncoder(
+                [1, 2, 3, 4], lambda w, h: [sys.executable, "-c", COPY_STDIN, str(output)],
+                Path(tmp) / "encode.log", window=2)
+            encoder.start()
+            self.assertTrue(encoder.put(2, 1, 1, b"2222"))
+
+            held = threading.Thread(target=encoder.put, args=(3, 1, 1, b"3333"))
+            held.start()
+            time.sleep(0.1)
+            self.assertTrue(held.is_alive())
+            self.assertFalse(encoder.put(5, 1, 1, b"5555"))
+            self.assertFalse(encoder.put(4, 2, 1, b"44444444"))
+
+            encoder.put(1, 1, 1, b"1111")
+            held.join(timeout=10)
+            encoder.put(4, 1, 1, b"4444")
+            encoder.finish()
+            encoder.writer.join(timeout=30)
+
+            self.assertEqual(encoder.returncode, 0)
+            self.assertEqual(encoder.frames_written, 4)
+            self.assertEqual(output.read_bytes(), b"1111222233334444")
+
+    def test_release_held(self):
+        """Held frames are buffered once the frames before them were lost."""
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "out.raw"
+            encoder = RawVideoEncoder(
+                [1, 2, 3], lambda w, h: [sys.executable, "-c", COPY_STDIN, str(output)],
+                Path(tmp) / "encode.log", window=1)
+            encoder.start()
+
+            held = threading.Thread(target=encoder.put, args=(3, 1, 1, b"3333"))
+            held.start()
+            time.sleep(0.1)
+            self.assertTrue(held.is_alive())
+            encoder.release_held()
+            held.join(timeout=10)
+            self.assertFalse(held.is_alive())
+
+            encoder.put(1, 1, 1, b"1111")
+            encoder.put(2, 1, 1, b"2222")
+            encoder.finish()
+            encoder.writer.join(timeout=30)
+
+            self.assertEqual(output.read_bytes(), b"111122223333")
+
+    def test_raw_frame_server(self):
+        """
+        Frames sent by a client are encoded in order and frames of a
+        disconnected client are handed out again.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "out.raw"
+            encoder = RawVideoEncoder(
+                [1, 2, 3], lambda w, h: [sys.executable, "-c", COPY_STDIN, str(output)],
+                Path(tmp) / "encode.log")
+            server = RawFrameServer(FrameQueue([1, 2, 3], 1, 2), encoder)
+            server.start()
+            encoder.start()
+
+            def connect(worker):
+                sock = socket.create_connection(server.address)
+                stream = sock.makefile("rwb")
+
+                def send(message, data=b""):
+                    message = dict(message, worker=worker, token=server.token)
+                    stream.write((json.dumps(message) + "\n").encode() + data)
+                    stream.flush()
+                    return json.loads(stream.readline())
+                return sock, send
+
+            try:
+                sock, send = connect("a")
+                self.assertEqual(send({"op": "next"})["frames"], [1])
+                # Disconnects before sending frame 1
+                sock.close()
+
+                sock, send = connect("b")
+                frames = []
+                while work := send({"op": "next"})["frames"]:
+                    frames += work
+                    for frame in work:
+                        reply = send({"op": "frame", "frame": frame,
+                                      "width": 1, "height": 1}, bytes([frame]) * 4)
+                        self.assertEqual(reply, {"ok": True})
+                sock.close()
+                self.assertEqual(sorted(frames), [1, 2, 3])
+            finally:
+                server.stop()
+            encoder.finish()
+            encoder.writer.join(timeout=30)
+
+            self.assertEqual(output.read_bytes(), b"\x01" * 4 + b"\x02" * 4 + b"\x03" * 4)
@@ -0,0 +1,82 @@
+from render_multiple_instances.render_cache import (
+    InputHashes,
+    get_changed_frames,
+    get_frame_hashes,
+    get_rna_values,
+    load_hashes,
+)
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"data" * 10 + b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+
+def rna(**props):
+    """Stand-in for an RNA struct, property types guessed from the values."""
+    def get_type(value):
+        if isinstance(value, list):
+            return 'COLLECTION'
+        if isinstance(value, SimpleNamespace) or value is None:
+            return 'POINTER'
+        return 'FLOAT'
+    properties = [SimpleNamespace(identifier=name, type=get_type(value))
+                  for name, value in props.items()]
+    return SimpleNamespace(bl_rna=SimpleNamespace(properties=properties), **props)
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def test_get_rna_values(self):
+        """
+        Nested values are keyed by data path, data-blocks by name, and
+        animated or frame dependent properties are left out.
+        """
+        material = rna(name_full="Red")
+        obj = rna(
+            location=(1.0, 2.0, 3.0),
+            scale=(1.0, 1.0, 1.0),
+            frame_current=12,
+            active_material=material,
+            modifiers=[rna(name="Subdivision", levels=2)],
+        )
+        values = get_rna_values(obj, skip={"scale"})
+        self.assertEqual(values, {
+            "location": [1.0, 2.0, 3.0],
+            "active_material": "Red",
+            'modifiers["Subdivision"].name': "Subdivision",
+            'modifiers["Subdivision"].levels': 2,
+        })
+
+    def test_changed_frames(self):
+        """Only frames whose own values or the static inputs changed."""
+        static = {"render": {"engine": "CYCLES"}}
+        frame_values = {1: [0.0], 2: [0.5], 3: [1.0]}
+        previous = get_frame_hashes(static, frame_values)
+
+        self.assertEqual(get_changed_frames([1, 2, 3], previous, previous), [])
+        hashes = get_frame_hashes(static, {1: [0.0], 2: [0.7], 3: [1.0]})
+        self.assertEqual(get_changed_frames([1, 2, 3], hashes, previous), [2])
+        hashes = get_frame_hashes({"render": {"engine": "EEVEE"}}, frame_values)
+        self.assertEqual(get_changed_frames([1, 2, 3], hashes, previous), [1, 2, 3])
+        # Frames that cannot be hashed are always rendered
+        self.assertEqual(get_changed_frames([1, 2], {}, previous), [1, 2])
+
+    def test_input_hashes_save(self):
+        """Valid frames are recorded, failed ones dropped, others kept."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            path = tmp / "rmi_input_hashes.json"
+            path.write_text('{"1": "old", "2": "old", "9": "other"}')
+            paths = {f: str(tmp / f"frame_{f:04d}.png") for f in (1, 2, 3)}
+            Path(paths[1]).write_bytes(PNG)
+            Path(paths[2]).write_bytes(PNG[:20])
+
+            InputHashes(path, {1: "a", 2: "b", 3: "c"}, paths).save()
+
+            self.assertEqual(load_hashes(path), {1: "a", 9: "other"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from render_multiple_instances.resources import (
+    apply_process_limits,
+    get_cpu_sets,
+    parse_cpu_list,
+)
+import os
+import subprocess
+import sys
+import unittest
+
+
+class TestResources(unittest.TestCase):
+
+    def test_parse_cpu_list(self):
+        test_cases = [
+            ("0", [0]),
+            ("0-3", [0, 1, 2, 3]),
+            ("0-1,8,10-11\n", [0, 1, 8, 10, 11]),
+        ]
+
+        for text, expected_output in test_cases:
+            self.assertEqual(parse_cpu_list(text), expected_output)
+
+    def test_get_cpu_sets(self):
+        """
+        Cores are split without overlap and instances stay on one NUMA node.
+        """
+        cpus = list(range(32))
+        nodes = [list(range(16)), list(range(16, 32))]
+
+        cpu_sets = get_cpu_sets(8, cpus, nodes=[])
+        self.assertEqual([len(c) for c in cpu_sets], [4] * 8)
+        self.assertEqual(sorted(sum(cpu_sets, [])), cpus)
+
+        cpu_sets = get_cpu_sets(3, cpus, nodes)
+        self.assertEqual(cpu_sets, [list(range(0, 8)), list(range(8, 16)),
+                                    list(range(16, 32))])
+
+        # More instances than cores: one shared core each
+        cpu_sets = get_cpu_sets(6, [0, 1, 2, 3], nodes=[])
+        self.assertEqual(cpu_sets, [[0], [1], [2], [3], [0], [1]])
+
+    @unittest.skipUnless(hasattr(os, "sched_getaffinity"), "Linux only")
+    def test_apply_process_limits(self):
+        """Threads already running are limited, like the main thread."""
+        cpu = min(os.sched_getaffinity(0))
+        child = (
+            "import os, sys, threading\n"
+            "go = threading.Event()\n"
+            "def report():\n"
+            "    go.wait()\n"
+            "    print(sorted(os.sched_getaffinity(0)), os.getpriority(os.PRIO_PROCESS, 0))\n"
+            "thread = threading.Thread(target=report)\n"
+            "thread.start()\n"
+            "print('ready', flush=True)\n"
+            "sys.stdin.readline()\n"
+            "go.set()\n"
+            "thread.join()\n"
+        )
+        process = subprocess.Popen([sys.executable, "-c", child], stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, text=True)
+        self.assertEqual(process.stdout.readline().strip(), "ready")
+        apply_process_limits(process.pid, [cpu], nice=5)
+        output, _ = process.communicate("\n", timeout=30)
+
+        output = output.split()
+        self.assertEqual(output[0], f"[{cpu}]")
+        self.assertGreaterEqual(int(output[1]), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
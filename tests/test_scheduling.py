@@ -0,0 +1,89 @@
+from render_multiple_instances.scheduling import (
+    PartitionMode,
+    frame_range,
+    partition_frames,
+    format_frame_spec,
+    get_frame_args,
+    load_frame_costs,
+    save_frame_costs,
+)
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class TestScheduling(unittest.TestCase):
+
+    def test_partition_frames(self):
+        """
+        Every mode must give each frame to exactly one instance.
+        """
+        frames = frame_range(1, 10)
+
+        test_cases = [
+            (PartitionMode.CONTIGUOUS,
+             [[1, 2, 3, 4], [5, 6, 7], [8, 9, 10]]),
+            (PartitionMode.INTERLEAVED,
+             [[1, 4, 7, 10], [2, 5, 8], [3, 6, 9]]),
+            (PartitionMode.CHUNKED,
+             [[1, 2, 7, 8], [3, 4, 9, 10], [5, 6]]),
+        ]
+
+        for mode, expected_output in test_cases:
+            result = partition_frames(frames, 3, mode, chunk_size=2)
+            self.assertEqual(result, expected_output)
+            self.assertEqual(sorted(sum(result, [])), frames)
+
+        # More instances than frames
+        self.assertEqual(partition_frames([1, 2], 8), [[1], [2]])
+
+    def test_get_frame_args(self):
+        """
+        Evenly spaced frames use the native range arguments, others "-f".
+        """
+        test_cases = [
+            ([1, 2, 3, 4], ["-s", "1", "-e", "4", "-j", "1", "-a"]),
+            ([2, 5, 8], ["-s", "2", "-e", "8", "-j", "3", "-a"]),
+            ([7], ["-f", "7"]),
+            ([1, 2, 7, 8, 9, 20], ["-f", "1..2,7..9,20"]),
+        ]
+
+        for frames, expected_output in test_cases:
+            self.assertEqual(get_frame_args(frames), expected_output)
+
+        self.assertEqual(format_frame_spec([3, 1, 2]), "1..3")
+
+    def test_balanced_partition(self):
+        """
+        Recorded costs spread heavy frames so instance loads stay even.
+        """
+        frames = frame_range(1, 8)
+        costs = {1: 1, 2: 1, 3: 1, 4: 1, 5: 10, 6: 10, 7: 1, 8: 1}
+
+        parts = partition_frames(frames, 2, PartitionMode.BALANCED, costs=costs)
+        loads = [sum(costs[f] for f in part) for part in parts]
+        self.assertEqual(sorted(sum(parts, [])), frames)
+        self.assertEqual(loads, [13, 13])
+
+        # Without recorded costs the split is contiguous
+        self.assertEqual(
+            partition_frames(frames, 2, PartitionMode.BALANCED, costs={}),
+            partition_frames(frames, 2, PartitionMode.CONTIGUOUS))
+
+    def test_frame_costs_sidecar(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "shot.rmi_times.json"
+            self.assertEqual(load_frame_costs(path, "Scene/render"), {})
+
+            save_frame_costs(path, "Scene/render", {1: 2.5, 2: 3.0})
+            save_frame_costs(path, "Scene/render", {2: 4.0})
+            save_frame_costs(path, "Scene/flipbook_render", {1: 0.5})
+
+            self.assertEqual(load_frame_costs(path, "Scene/render"),
+                             {1: 2.5, 2: 4.0})
+            self.assertEqual(load_frame_costs(path, "Scene/flipbook_render"),
+                             {1: 0.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from render_multiple_instances.segment_cache import SegmentCache, split_fixed_segments
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class TestSegmentCache(unittest.TestCase):
+
+    def test_split_fixed_segments(self):
+        """Boundaries depend on the segment length only, not the frame count."""
+        self.assertEqual([len(s) for s in split_fixed_segments(list(range(100)), 48)],
+                         [48, 48, 4])
+        self.assertEqual([len(s) for s in split_fixed_segments(list(range(100)), 40, 12)],
+                         [48, 48, 4])
+
+    def test_segment_keys(self):
+        """
+        A segment key changes with its frames' contents or the encoder
+        settings, and cached segments are found by key.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            frames = []
+            for frame in range(4):
+                frames.append(tmp / f"frame_{frame:04d}.png")
+                frames[-1].write_bytes(bytes([frame]) * 8)
+            cache = SegmentCache(tmp / "cache", 1024)
+            args = ["-c:v", "libx264", "-crf", "20"]
+
+            first, second = frames[:2], frames[2:]
+            key = cache.get_key(first, args, 24)
+            other = cache.get_key(second, args, 24)
+            self.assertNotEqual(key, other)
+            self.assertNotEqual(key, cache.get_key(first, args, 25))
+            self.assertNotEqual(key, cache.get_key(first, args[:-1] + ["18"], 24))
+
+            segment = tmp / "segment_000.mp4"
+            segment.write_bytes(b"encoded")
+            self.assertIsNone(cache.get(key, ".mp4"))
+            path = cache.put(key, ".mp4", segment)
+            self.assertEqual(cache.get(key, ".mp4"), path)
+            self.assertFalse(segment.exists())
+
+            # Re-rendered frame with new content
+            frames[1].write_bytes(b"changed!")
+            os.utime(frames[1], ns=(1, 1))
+            self.assertNotEqual(cache.get_key(first, args, 24), key)
+            self.assertEqual(cache.get_key(second, args, 24), other)
+
+            # Hashes survive in the index
+            cache.save_index()
+            self.assertEqual(SegmentCache(tmp / "cache", 1024).get_key(second, args, 24),
+                             other)
+
+    def test_evict(self):
+        """Least recently used segments go first, segments in use stay."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SegmentCache(Path(tmp), 250)
+            paths = []
+            for i in range(4):
+                segment = Path(tmp, f"segment_{i}.mp4")
+                segment.write_bytes(b"x" * 100)
+                paths.append(cache.put(f"key{i}", ".mp4", segment))
+                os.utime(paths[-1], (i, i))
+
+            removed = cache.evict({paths[0]})
+            self.assertEqual(removed, paths[1:3])
+            self.assertEqual(sorted(p for p in paths if p.exists()),
+                             sorted([paths[0], paths[3]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+from render_multiple_instances import sequence
+from render_multiple_instances.sequence import scan_directory, check_frames
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+EXTENSIONS = ('png', 'jpg', 'jpeg')
+
+
+class TestSequence(unittest.TestCase):
+
+    def setUp(self):
+        sequence.clear_cache()
+
+    def test_frame_sequence(self):
+        """
+        Image files are indexed by frame number and gaps are reported.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("shot_0001.png", "shot_0002.png", "shot_0005.png",
+                         "notes.txt", "ffmpeg_frame_list.txt"):
+                Path(tmp, name).touch()
+            os.mkdir(os.path.join(tmp, "rmi_logs"))
+
+            result = scan_directory(tmp, EXTENSIONS)
+
+            self.assertEqual([f.name for f in result.files],
+                             ["shot_0001.png", "shot_0002.png", "shot_0005.png"])
+            self.assertEqual(sorted(result.frames), [1, 2, 5])
+            self.assertEqual(result.missing_frames(), [3, 4])
+            self.assertEqual(result.missing_frames(1, 6), [3, 4, 6])
+
+        self.assertFalse(scan_directory(os.path.join(tmp, "gone"), EXTENSIONS))
+
+    @patch.object(sequence, 'RACY_SECONDS', -1)
+    def test_scan_directory_cache(self):
+        """
+        The listing is reused until the directory mtime changes.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "shot_0001.png").touch()
+            os.utime(tmp, ns=(0, 1_000_000_000))
+
+            first = scan_directory(tmp, EXTENSIONS)
+            self.assertIs(scan_directory(tmp, EXTENSIONS), first)
+
+            Path(tmp, "shot_0002.png").touch()
+            os.utime(tmp, ns=(0, 2_000_000_000))
+
+            second = scan_directory(tmp, EXTENSIONS)
+            self.assertIsNot(second, first)
+            self.assertEqual(sorted(second.frames), [1, 2])
+
+    def test_check_frames(self):
+        """
+        Empty, truncated and corrupt frames are flagged, complete ones pass.
+        """
+        png = b"\x89PNG\r\n\x1a\n" + b"data" * 10 + b"\x00\x00\x00\x00IEND\xaeB`\x82"
+        jpeg = b"\xff\xd8" + b"data" * 10 + b"\xff\xd9"
+        files = {
+            1: ("shot_0001.png", png),
+            2: ("shot_0002.png", b""),
+            3: ("shot_0003.png", png[:-20]),
+            4: ("shot_0004.jpg", jpeg),
+            5: ("shot_0005.jpg", jpeg[:-2]),
+            6: ("shot_0006.exr", b"exr data"),
+            7: ("shot_0007.png", None),
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {}
+            for frame, (name, data) in files.items():
+                paths[frame] = os.path.join(tmp, name)
+                if data is not None:
+                    Path(paths[frame]).write_bytes(data)
+
+            missing, invalid = check_frames(paths, workers=4)
+
+        self.assertEqual(missing, [7])
+        self.assertEqual(invalid, [2, 3, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
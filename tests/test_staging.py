@@ -0,0 +1,60 @@
+from render_multiple_instances.staging import FrameMover, KEEP, VERIFY_HASH
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class TestStaging(unittest.TestCase):
+
+    def test_frame_mover(self):
+        """
+        Reported and unreported scratch frames end up in the output
+        directory under the same names, and scratch is cleaned up.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            scratch = Path(tmp) / "scratch"
+            output = Path(tmp) / "share" / "v001"
+            moved = []
+            finished = []
+
+            mover = FrameMover(scratch, output, VERIFY_HASH, batch_size=2,
+                               interval=0.05)
+            mover.add_listener(lambda frame, path: moved.append((frame, path)))
+            mover.add_finish_listener(finished.append)
+            mover.start()
+            for frame in range(1, 4):
+                path = scratch / f"shot_{frame:04d}.png"
+                path.write_bytes(bytes([frame]) * 10)
+                mover.add(frame, str(path), 1.0)
+            # Saved by an instance whose output was not read
+            (scratch / "shot_0004.png").write_bytes(b"4" * 10)
+            mover.finish()
+            mover.thread.join(timeout=30)
+
+            self.assertEqual(sorted(p.name for p in output.iterdir()),
+                             [f"shot_{f:04d}.png" for f in range(1, 5)])
+            self.assertEqual((output / "shot_0002.png").read_bytes(), b"\x02" * 10)
+            self.assertEqual(sorted(f for f, _ in moved if f), [1, 2, 3])
+            self.assertIn((None, str(output / "shot_0004.png")), moved)
+            self.assertEqual(finished, [mover])
+            self.assertFalse(scratch.exists())
+
+    def test_frame_mover_keep(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            scratch = Path(tmp) / "scratch"
+            output = Path(tmp) / "share"
+            mover = FrameMover(scratch, output, KEEP, interval=0.05)
+            mover.start()
+            path = scratch / "shot_0001.png"
+            path.write_bytes(b"png")
+            mover.add(1, str(path))
+            mover.finish()
+            mover.thread.join(timeout=30)
+
+            self.assertTrue(path.exists())
+            self.assertEqual((output / "shot_0001.png").read_bytes(), b"png")
+            self.assertEqual(mover.moved, {path})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,9 @@
-import sys
+from render_multiple_instances.utils import get_export_dir, flipbook_render_output_path, remove_old_job_files, get_unsaved_frames, get_frames_to_render
+from render_multiple_instances.render_cache import HASHES_NAME
+from render_multiple_instances.sequence import PNG_SIGNATURE, PNG_END
+import json
 import os
-
-# Add the parent directory to sys.path to allow importing from utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from utils import get_export_dir, flipbook_render_output_path
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
@@ -93,5 +92,97 @@ class TestUtils(unittest.TestCase):
         expected_output = Path("/home/user/My Projects/Blender Renders/Flipbooks!/flipbook_render_v000")
         self.assertEqual(Path(result), expected_output)
 
+    @patch('bpy.path.abspath')
+    @patch('bpy.context')
+    def test_flipbook_render_output_path_on_disk(self, mock_context, mock_abspath):
+        """
+        The next version is read from the directories on disk and created.
+        """
+        mock_context.scene.RMI_Props = MagicMock()
+        mock_abspath.side_effect = lambda path: path
+
+        with tempfile.TemporaryDirectory() as tmp:
+            flipbook_dir = os.path.join(tmp, "flipbooks")
+            mock_context.scene.RMI_Props.flipbook_dir = flipbook_dir
+            for name in ['flipbook_render_v000', 'flipbook_render_v002', 'other_v009']:
+                os.makedirs(os.path.join(flipbook_dir, name))
+
+            result = Path(flipbook_render_output_path(mock_context, "flipbook_render"))
+            self.assertEqual(result, Path(flipbook_dir, "flipbook_render_v003"))
+            self.assertTrue(result.is_dir())
+
+    def test_remove_old_job_files(self):
+        """
+        Only stale job files of this blend file are removed.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            names = {
+                ".shot.rmi_job_20240101_120000_1.blend": 0,
+                ".shot.rmi_job_20240102_120000_2.blend": None,
+                ".other.rmi_job_20240101_120000_1.blend": 0,
+                "shot.blend": 0,
+            }
+            for name, mtime in names.items():
+                path = Path(tmp, name)
+                path.touch()
+                if mtime is not None:
+                    os.utime(path, (mtime, mtime))
+
+            remove_old_job_files(Path(tmp, "shot.blend"))
+
+            self.assertEqual(sorted(os.listdir(tmp)), [
+                ".other.rmi_job_20240101_120000_1.blend",
+                ".shot.rmi_job_20240102_120000_2.blend",
+                "shot.blend",
+            ])
+
+
+    @patch('bpy.path.abspath')
+    def test_get_unsaved_frames(self, mock_abspath):
+        """
+        Frames already saved to the output directory are left out.
+        """
+        mock_abspath.side_effect = lambda path: path
+        context = MagicMock()
+        with tempfile.TemporaryDirectory() as tmp:
+            context.scene.render.frame_path.side_effect = \
+                lambda frame: os.path.join(tmp, f"frame_{frame:04d}.png")
+            Path(tmp, "frame_0002.png").write_bytes(b"png")
+
+            self.assertEqual(get_unsaved_frames(context, [1, 2, 3]), [1, 3])
+
+
+    @patch('render_multiple_instances.utils.get_input_hashes')
+    @patch('render_multiple_instances.utils.get_export_dir')
+    @patch('render_multiple_instances.utils.get_render_frames')
+    @patch('bpy.path.abspath')
+    def test_get_frames_to_render(self, mock_abspath, mock_frames, mock_export_dir,
+                                  mock_hashes):
+        """
+        With resume and the input cache, a saved frame whose inputs changed
+        is rendered again along with the missing ones.
+        """
+        mock_abspath.side_effect = lambda path: path
+        mock_frames.return_value = [1, 2, 3]
+        mock_hashes.return_value = {1: "a", 2: "b2", 3: "c"}
+        context = MagicMock()
+        context.scene.RMI_Props.resume = True
+        context.scene.RMI_Props.input_cache = True
+        with tempfile.TemporaryDirectory() as tmp:
+            mock_export_dir.return_value = Path(tmp)
+            context.scene.render.frame_path.side_effect = \
+                lambda frame: os.path.join(tmp, f"frame_{frame:04d}.png")
+            for frame in (1, 2):
+                Path(tmp, f"frame_{frame:04d}.png").write_bytes(PNG_SIGNATURE + PNG_END)
+            Path(tmp, HASHES_NAME).write_text(json.dumps({"1": "a", "2": "b", "3": "c"}))
+
+            frames, input_hashes = get_frames_to_render(context)
+
+            self.assertEqual(frames, [2, 3])
+            self.assertFalse(Path(tmp, "frame_0002.png").exists())
+            self.assertTrue(Path(tmp, "frame_0001.png").exists())
+            self.assertEqual(input_hashes.hashes, {1: "a", 2: "b2", 3: "c"})
+
+
 if __name__ == '__main__':
     unittest.main()
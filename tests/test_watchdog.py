@@ -0,0 +1,134 @@
+from render_multiple_instances.instances import RenderInstance, InstancePool
+from render_multiple_instances.progress import JobProgress, InstanceProgress
+from render_multiple_instances.watchdog import Watchdog
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+# Saves frame 1, then hangs with a child process of its own
+HANG = (
+    "import subprocess, sys, time\n"
+    "print('Fra:1 Mem:1M', flush=True)\n"
+    "print(\"Saved: '/tmp/frame_0001.png'\", flush=True)\n"
+    "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+    "open(sys.argv[1], 'w').write(str(child.pid))\n"
+    "time.sleep(60)\n"
+)
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed child not yet reaped by its (dead) parent is a zombie
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+class TestWatchdog(unittest.TestCase):
+
+    def run_pool(self, pool, timeout=30):
+        deadline = time.monotonic() + timeout
+        while pool.poll():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def wait_for(self, path: Path, timeout=10) -> str:
+        deadline = time.monotonic() + timeout
+        while not path.exists() or not path.read_text():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        return path.read_text()
+
+    @unittest.skipIf(os.name == "nt", "process groups are POSIX sessions here")
+    def test_hung_instance_restarted(self):
+        """
+        A hung instance is killed with its children and replaced by an
+        instance rendering its unfinished frames, within the retries.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            now = [0.0]
+            respawned = []
+
+            def respawn(instance, frames, index):
+                respawned.append(frames)
+                cmd = [sys.executable, "-c", "print('Fra:2')"]
+                return RenderInstance(index, cmd, tmp / f"instance_{index}.log",
+                                      frames=frames)
+
+            pool = InstancePool(JobProgress(3, clock=lambda: now[0]))
+            pool.add(RenderInstance(
+                0, [sys.executable, "-c", HANG, str(tmp / "child.pid")],
+                tmp / "instance_0.log", frames=[1, 2, 3]))
+            pool.watchdog = Watchdog(60, 1, respawn, clock=lambda: now[0])
+            pool.start()
+            child = int(self.wait_for(tmp / "child.pid"))
+
+            self.assertTrue(pool.poll())
+            self.assertEqual(respawned, [])
+            now[0] = 61
+            self.run_pool(pool)
+
+            self.assertEqual(respawned, [[2, 3]])
+            self.assertTrue(pool.instances[0].killed)
+            self.assertFalse(is_alive(child))
+            self.assertEqual(pool.returncodes, [0])
+
+    def test_long_frame_not_hung(self):
+        """A frame longer than the timeout is not hung while it reports samples."""
+        now = [0.0]
+        progress = InstanceProgress(clock=lambda: now[0])
+        instance = SimpleNamespace(progress=progress, killed=False,
+                                   suspended=False, running=True)
+        watchdog = Watchdog(600, 1, None)
+        for now[0] in (0.0, 500.0, 1000.0):
+            progress.feed("Fra:1 Mem:1M | Time:00:01.00 | Sample 1/64")
+
+        self.assertFalse(watchdog.is_hung(instance, 1500.0))
+        self.assertTrue(watchdog.is_hung(instance, 1601.0))
+
+    def test_retries_exhausted(self):
+        """Once out of retries, a hung instance stays killed and failed."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            now = [0.0]
+            pool = InstancePool(JobProgress(1, clock=lambda: now[0]))
+            pool.add(RenderInstance(
+                0, [sys.executable, "-c", "import time; time.sleep(60)"],
+                tmp / "instance_0.log", frames=[1]))
+            pool.watchdog = Watchdog(60, 0, lambda *args: self.fail("respawned"),
+                                     clock=lambda: now[0])
+            pool.start()
+            now[0] = 61
+            self.run_pool(pool)
+
+            self.assertTrue(pool.instances[0].killed)
+            self.assertNotEqual(pool.returncodes, [0])
+
+    def test_cancel(self):
+        """Cancel kills every instance and the pool winds down."""
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = InstancePool(JobProgress(2))
+            for i in range(2):
+                pool.add(RenderInstance(
+                    i, [sys.executable, "-c", "import time; time.sleep(60)"],
+                    Path(tmp) / f"instance_{i}.log"))
+            pool.add_busy_check(lambda: True)
+            pool.start()
+            pool.cancel()
+            self.run_pool(pool, timeout=10)
+
+            self.assertTrue(all(instance.killed for instance in pool.instances))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,71 +8,175 @@ import shlex
 import bpy
 import os
 import re
-import platform
 import subprocess
 from pathlib import Path
-from enum import Enum
 import shutil
+import functools
+import tempfile
+import socket
+import time
+import hashlib
+from array import array
+
+from .scheduling import (
+    PartitionMode,
+    frame_range,
+    partition_frames,
+    load_frame_costs,
+    save_frame_costs,
+    get_frame_costs_path,
+    get_frame_costs_key,
+)
+from .coordinator import FrameQueue, BatchQueue, FrameQueueServer
+from .instances import InstancePool
+from .progress import JobProgress
+from .encoding import (
+    WANTED_ENCODERS,
+    get_encoder_args,
+    get_output_args,
+    get_pipe_decoder,
+    get_stream_command_list,
+    StreamingEncoder,
+    SegmentedEncoder,
+    write_concat_list,
+    probe_ffmpeg,
+    check_profiles,
+)
+from .sequence import scan_directory, check_frames
+from .batch import resolve_job
+from .metrics import EventLog
+from .preview import get_engine_id, get_preview_overrides, apply_overrides
+from .staging import FrameMover
+from .segment_cache import SegmentCache
+from .render_cache import (
+    HASHES_NAME,
+    InputHashes,
+    get_changed_frames,
+    get_frame_hashes,
+    get_rna_values,
+    load_hashes,
+    normalize,
+)
+from .rawvideo import RawFrameServer, RawVideoEncoder, get_rawvideo_command_list
+from .launch import (
+    EXTENSIONS,
+    OS,
+    get_output_dir,
+    get_video_path,
+    get_worker_script_path,
+    remove_invalid_frames,
+    build_render_command,
+    build_worker_command,
+    get_thread_args,
+    get_platform_terminal_command_list,
+    get_instance_cpu_sets,
+    add_render_instances,
+    start_watchdog,
+    start_admission,
+    probe_scenes,
+)
+
+
+# Inputs that change from frame to frame in ways F-Curves do not show
+VOLATILE_MODIFIERS = {'CLOTH', 'SOFT_BODY', 'FLUID', 'DYNAMIC_PAINT', 'EXPLODE', 'BUILD'}
+VOLATILE_NODES = {'GeometryNodeSimulationInput', 'GeometryNodeInputSceneTime'}
+
+# Node properties that only change the node editor layout
+NODE_LAYOUT = ("location", "width", "height", "hide", "label", "color",
+               "use_custom_color", "show_options", "show_preview", "parent")
+
+# Job files older than this are leftovers of crashed or killed sessions
+JOB_FILE_MAX_AGE = 24 * 60 * 60
 
 
-EXTENSIONS = ('png', 'jpg', 'jpeg')
+def is_ffmpeg_installed() -> bool:
+    return get_ffmpeg_path() is not None
 
 
-class OS(Enum):
-    WINDOWS = "Windows"
-    MACOS = "MacOS"
-    LINUX = "Linux"
-    UNKNOWN = "Unknown"
+@functools.cache
+def get_ffmpeg_path() -> str | None:
+    return shutil.which('ffmpeg')
 
-    @staticmethod
-    def detect_os():
-        system = platform.system()
-        if system == "Windows":
-            return OS.WINDOWS
-        elif system == "Darwin":
-            return OS.MACOS
-        elif system == "Linux":
-            return OS.LINUX
-        else:
-            return OS.UNKNOWN
 
+def get_cache_dir() -> Path:
+    try:
+        return Path(bpy.utils.extension_path_user(__package__, create=True))
+    except (ValueError, AttributeError):
+        # Installed as a legacy add-on
+        return Path(tempfile.gettempdir()) / "render_multiple_instances"
 
-def is_ffmpeg_installed() -> bool:
-    return shutil.which('ffmpeg') is not None
 
+@functools.cache
+def get_ffmpeg_capabilities() -> dict:
+    """Probed on first use only, see probe_ffmpeg()."""
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg is None:
+        return {}
+    return probe_ffmpeg(ffmpeg, get_cache_dir() / "ffmpeg_probe.json")
+
+
+# EnumProperty items returned from a callback must be kept referenced
+_encoder_items = []
 
-def get_encoders() -> list:
-    cmd = ["ffprobe", "-encoders"]
-    try:
-        encoders_list = subprocess.check_output(
-            cmd, stderr=subprocess.STDOUT, text=True)
-    except subprocess.CalledProcessError:
-        return []
 
-    # List of wanted encoders
-    enc = ["libx264", "libx265", "libaom-av1"]
+def get_encoders(self=None, context=None) -> list:
+    if not _encoder_items:
+        for name, caps in get_ffmpeg_capabilities().items():
+            threads = [kind for kind in ("frame", "slice")
+                       if caps[f"{kind}_threads"]]
+            description = caps["description"]
+            if threads:
+                description += f" (threads: {', '.join(threads)})"
+            # Stable values, files store the enum by value
+            _encoder_items.append((name, name, description,
+                                   WANTED_ENCODERS.index(name)))
+    return _encoder_items
 
-    encoders = []
-    for c in enc:
-        if c in encoders_list:
-            encoders.append((c, c, ""))
 
-    return encoders
+def get_blend_file() -> Path:
+    return Path(bpy.data.filepath).resolve()
 
 
-ffmpeg_installed = is_ffmpeg_installed()
-available_encoders = get_encoders() if ffmpeg_installed else []
+def save_job_file(output_path: str | None = None) -> Path:
+    """
+    Save a copy of the current state for the instances to render.
+
+    The copy sits next to the blend file so relative paths still resolve;
+    the main file, its dirty state and its undo history are untouched.
+    Job files left over from earlier sessions are removed.
+    With output_path, only the copy renders there (scratch staging).
+    """
+    blend_file = get_blend_file()
+    remove_old_job_files(blend_file)
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    job_file = blend_file.with_name(
+        f".{blend_file.stem}.rmi_job_{stamp}_{os.getpid()}.blend")
+    render = bpy.context.scene.render
+    filepath = render.filepath
+    if output_path is not None:
+        render.filepath = output_path
+    try:
+        bpy.ops.wm.save_as_mainfile(
+            filepath=str(job_file), copy=True, relative_remap=False)
+    finally:
+        render.filepath = filepath
+    return job_file
 
 
-def save_blend_file() -> bool:
-    if not bpy.data.is_saved:
-        return False
-    bpy.ops.wm.save_mainfile()
-    return True
+def remove_job_file(job_file: Path | None) -> None:
+    if job_file is not None:
+        Path(job_file).unlink(missing_ok=True)
 
 
-def get_blend_file() -> Path:
-    return Path(bpy.data.filepath).resolve()
+def remove_old_job_files(blend_file: Path) -> None:
+    cutoff = time.time() - JOB_FILE_MAX_AGE
+    for job_file in blend_file.parent.glob(f".{blend_file.stem}.rmi_job_*.blend"):
+        try:
+            if job_file.stat().st_mtime < cutoff:
+                job_file.unlink()
+        except OSError:
+            pass
 
 
 def get_absolute_path(path: str) -> Path:
@@ -94,23 +198,44 @@ def get_export_dir() -> Path:
     //export/v001/temp###     -> //export/v001/
     //export/v001/temp###.png -> //export/v001/
     """
-    filepath_str = bpy.path.abspath(bpy.context.scene.render.filepath)
-    filepath = Path(filepath_str)
+    return get_output_dir(bpy.path.abspath(bpy.context.scene.render.filepath))
 
-    # Check if the path is a directory path or ends with a separator
-    if filepath.is_dir() or filepath_str.endswith('/'):
-        # Return as-is if it's a directory path or ends with a separator
-        return filepath
 
-    # Return the parent directory with a trailing slash
-    return filepath.parent / ''
+def apply_preview_profile(context: bpy.types.Context) -> dict:
+    """Apply the preview profile to the scene, return the original values."""
+    props = context.scene.RMI_Props
+    render = context.scene.render
+    available = [item.identifier for item in
+                 render.bl_rna.properties['engine'].enum_items]
+    overrides = get_preview_overrides(
+        props.preview_samples, props.preview_subdivision,
+        get_engine_id(props.preview_engine, available))
+    return apply_overrides(context.scene, overrides)
+
+
+def use_scratch_staging(props) -> bool:
+    """Remote workers could not reach this machine's scratch directory."""
+    return props.stage_frames and not (
+        props.partition_mode == 'DYNAMIC' and props.remote_workers)
+
 
+def get_scratch_dir(props) -> Path:
+    root = (get_absolute_path(props.scratch_dir) if props.scratch_dir
+            else Path(tempfile.gettempdir()) / "rmi_scratch")
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    return root / f"{get_blend_file().stem}_{stamp}_{os.getpid()}"
 
-def get_render_command_list(context: bpy.types.Context) -> list:
-    props = bpy.context.scene.RMI_Props
 
-    blender_bin_path = get_blender_bin_path().as_posix()
-    blend_file_path = get_blend_file().as_posix()
+def get_scratch_output_path(scratch_dir: Path) -> str:
+    """The render output path with its directory replaced by scratch_dir."""
+    filepath = bpy.path.abspath(bpy.context.scene.render.filepath)
+    if Path(filepath).is_dir() or filepath.endswith(('/', '\\')):
+        return scratch_dir.as_posix() + "/"
+    return (scratch_dir / Path(filepath).name).as_posix()
+
+
+def get_render_frames(context: bpy.types.Context) -> list:
+    props = context.scene.RMI_Props
 
     start_frame = context.scene.frame_start
     end_frame = context.scene.frame_end
@@ -120,11 +245,356 @@ def get_render_command_list(context: bpy.types.Context) -> list:
         start_frame = props.start_frame
         end_frame = props.end_frame
 
-    cmd = [blender_bin_path, "-b", blend_file_path,
-           "-s", f"{start_frame}", "-e", f"{end_frame}", "-a"]
+    return frame_range(start_frame, end_frame, context.scene.frame_step)
+
+
+def get_frame_times_path() -> Path:
+    return get_frame_costs_path(get_blend_file())
+
+
+def get_frame_times_key(context: bpy.types.Context, render_type: str) -> str:
+    return get_frame_costs_key(context.scene.name, render_type)
+
+
+def record_frame_times(context: bpy.types.Context, render_type: str,
+                       pool: InstancePool) -> None:
+    """Store the frame times measured by a finished pool for the next run."""
+    if pool.progress is None:
+        return
+    costs = {}
+    for progress in pool.progress.instances:
+        costs.update(progress.durations)
+    save_frame_costs(get_frame_times_path(),
+                     get_frame_times_key(context, render_type), costs)
+
+
+def get_rawframes_script_path() -> Path:
+    return Path(__file__).parent / "rawframes.py"
+
+
+def has_plain_srgb_view(scene: bpy.types.Scene) -> bool:
+    """
+    Whether the scene shows renders with the plain sRGB transform that
+    rawframes.py applies to the Viewer pixels: Standard view on an sRGB
+    display, no look, exposure, gamma or curves.
+    """
+    display = scene.display_settings
+    view = scene.view_settings
+    return (display.display_device == 'sRGB' and
+            view.view_transform == 'Standard' and
+            view.look == 'None' and
+            view.exposure == 0 and
+            view.gamma == 1 and
+            not view.use_curve_mapping)
+
+
+def get_frame_paths(context: bpy.types.Context, frames: list) -> dict:
+    render = context.scene.render
+    return {frame: bpy.path.abspath(render.frame_path(frame=frame))
+            for frame in frames}
+
+
+def get_resume_frames(context: bpy.types.Context, frames: list) -> list:
+    """
+    Frames that still need rendering: missing ones, plus broken ones
+    (empty, truncated or undecodable, e.g. left by a killed instance)
+    which are deleted so instances do not skip them.
+    """
+    missing, invalid = remove_invalid_frames(get_frame_paths(context, frames))
+    return sorted(missing + invalid)
+
+
+def get_unsaved_frames(context: bpy.types.Context, frames: list) -> list:
+    """
+    Frames with no file in the output directory. Instances skip the others
+    (they do not overwrite), unless they render to scratch.
+    """
+    paths = get_frame_paths(context, frames)
+    return [frame for frame, path in paths.items() if not os.path.exists(path)]
+
+
+def get_animation_fcurves(anim_data) -> list:
+    """F-Curves of the action of anim_data, layered actions included."""
+    action = getattr(anim_data, "action", None)
+    if action is None:
+        return []
+    slot = getattr(anim_data, "action_slot", None)
+    if slot is not None and hasattr(action, "layers"):
+        fcurves = [fcurve for layer in action.layers for strip in layer.strips
+                   if (channelbag := strip.channelbag(slot)) is not None
+                   for fcurve in channelbag.fcurves]
+        if fcurves:
+            return fcurves
+    return list(getattr(action, "fcurves", []))
+
+
+def get_animation_owners(data) -> list:
+    """data and its embedded data-blocks that carry their own animation."""
+    owners = [data]
+    for name in ("node_tree", "shape_keys"):
+        if (owner := getattr(data, name, None)) is not None:
+            owners.append(owner)
+    return owners
+
+
+def get_render_ids(scene: bpy.types.Scene) -> list:
+    """Data-blocks a frame of scene is rendered from."""
+    ids = {}
+
+    def add(data):
+        if data is not None:
+            ids.setdefault((data.bl_rna.identifier, data.name_full), data)
+
+    add(scene)
+    add(scene.world)
+    for obj in scene.objects:
+        add(obj)
+        add(obj.data)
+        for slot in obj.material_slots:
+            add(slot.material)
+    for tree in bpy.data.node_groups:
+        add(tree)
+    return list(ids.values())
+
+
+def get_volatile_reason(scene: bpy.types.Scene, ids: list) -> str | None:
+    """Why frames of scene cannot be compared by their inputs, if so."""
+    if scene.rigidbody_world is not None and scene.rigidbody_world.enabled:
+        return "rigid body simulation"
+    for obj in scene.objects:
+        for modifier in obj.modifiers:
+            if modifier.type in VOLATILE_MODIFIERS:
+                return f"{modifier.type} modifier on {obj.name}"
+            if (modifier.type == 'PARTICLE_SYSTEM' and
+                    modifier.particle_system.settings.type != 'HAIR'):
+                return f"particles on {obj.name}"
+    for tree in bpy.data.node_groups:
+        if any(node.bl_idname in VOLATILE_NODES for node in tree.nodes):
+            return f"simulation or scene time nodes in {tree.name}"
+    for image in bpy.data.images:
+        if image.source in {'SEQUENCE', 'MOVIE'}:
+            return f"image sequence or movie {image.name}"
+    for data in ids:
+        for owner in get_animation_owners(data):
+            anim_data = getattr(owner, "animation_data", None)
+            for fcurve in getattr(anim_data, "drivers", None) or []:
+                if "frame" in fcurve.driver.expression:
+                    return f"frame driver on {owner.name}"
+    editor = scene.sequence_editor
+    if scene.render.use_sequencer and editor is not None and (
+            getattr(editor, "strips_all", None) or getattr(editor, "sequences_all", None)):
+        return "sequencer strips"
+    return None
+
+
+def get_mesh_fingerprint(mesh: bpy.types.Mesh) -> str:
+    """Hash of the vertex positions, faces and UVs of mesh."""
+    digest = hashlib.sha1()
+    for items, name, typecode, width in (
+            (mesh.vertices, "co", "f", 3),
+            (mesh.loops, "vertex_index", "i", 1)):
+        values = array(typecode, bytes(4 * width * len(items)))
+        items.foreach_get(name, values)
+        digest.update(values.tobytes())
+    for layer in mesh.uv_layers:
+        values = array("f", bytes(8 * len(layer.uv)))
+        layer.uv.foreach_get("vector", values)
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def get_node_tree_values(tree: bpy.types.NodeTree, skip: set) -> dict:
+    values = {}
+    for node in tree.nodes:
+        path = f'nodes["{node.name}"]'
+        layout = {f"{path}.{name}" for name in NODE_LAYOUT}
+        values.update(get_rna_values(node, skip | layout, 0, f"{path}."))
+        for index, socket in enumerate(node.inputs):
+            socket_path = f"{path}.inputs[{index}].default_value"
+            if socket_path not in skip and hasattr(socket, "default_value"):
+                values[socket_path] = normalize(socket.default_value)
+    values["links"] = sorted(
+        [link.from_node.name, link.from_socket.identifier,
+         link.to_node.name, link.to_socket.identifier] for link in tree.links)
+    return values
+
+
+def get_id_inputs(data) -> dict:
+    """
+    Static inputs of a data-block: its properties except the animated or
+    driven ones, node trees, drivers, NLA strips and mesh geometry.
+    """
+    inputs = {}
+    for owner in get_animation_owners(data):
+        anim_data = getattr(owner, "animation_data", None)
+        skip = set()
+        animation = {}
+        if anim_data is not None:
+            fcurves = get_animation_fcurves(anim_data)
+            skip = {fcurve.data_path for fcurve in fcurves}
+            for fcurve in anim_data.drivers:
+                skip.add(fcurve.data_path)
+                driver = fcurve.driver
+                animation[f"driver:{fcurve.data_path}[{fcurve.array_index}]"] = [
+                    driver.type, driver.expression,
+                    [[var.type] + [[getattr(t.id, "name_full", None), t.data_path,
+                                    t.bone_target, t.transform_type]
+                                   for t in var.targets]
+                     for var in driver.variables]]
+            # Strips are not evaluated per frame, any change counts for all
+            for track in anim_data.nla_tracks:
+                for strip in track.strips:
+                    animation[f"nla:{track.name}:{strip.name}"] = [
+                        get_rna_values(strip, depth=0),
+                        [[normalize(k.co), normalize(k.handle_left),
+                          normalize(k.handle_right), k.interpolation]
+                         for fcurve in getattr(strip.action, "fcurves", [])
+                         for k in fcurve.keyframe_points]]
+        if hasattr(owner, "nodes") and hasattr(owner, "links"):
+            values = get_node_tree_values(owner, skip)
+            values.update(get_rna_values(owner, skip | {"nodes", "links"}, 0))
+        else:
+            values = get_rna_values(owner, skip)
+        if isinstance(owner, bpy.types.Mesh):
+            values["geometry"] = get_mesh_fingerprint(owner)
+        inputs[owner.bl_rna.identifier] = [values, animation]
+    return inputs
+
+
+def get_file_stamps() -> dict:
+    """Size and mtime of the files referenced by the blend file."""
+    stamps = {}
+    for collection in (bpy.data.images, bpy.data.libraries, bpy.data.movieclips,
+                       bpy.data.cache_files, bpy.data.volumes, bpy.data.fonts):
+        for data in collection:
+            filepath = getattr(data, "filepath", "")
+            if not filepath:
+                continue
+            path = bpy.path.abspath(filepath, library=data.library)
+            try:
+                stat = os.stat(path)
+                stamps[path] = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                stamps[path] = None
+    return stamps
+
+
+def get_input_hashes(context: bpy.types.Context, frames: list) -> dict:
+    """
+    {frame: hash} of everything a frame is rendered from: render settings
+    and data-blocks (static, hashed once), file timestamps, and the value
+    of every F-Curve at that frame. Empty when some input depends on the
+    frame in a way that cannot be hashed (simulations, image sequences).
+    """
+    scene = context.scene
+    ids = get_render_ids(scene)
+    if reason := get_volatile_reason(scene, ids):
+        print(f"RMI: every frame is rendered, {reason} depends on the frame")
+        return {}
+
+    static = {"files": get_file_stamps(), "ids": {}, "fcurves": []}
+    fcurves = []
+    for data in ids:
+        static["ids"][f"{data.bl_rna.identifier}:{data.name_full}"] = get_id_inputs(data)
+        for owner in get_animation_owners(data):
+            anim_data = getattr(owner, "animation_data", None)
+            if anim_data is not None:
+                for fcurve in get_animation_fcurves(anim_data):
+                    fcurves.append(fcurve)
+                    static["fcurves"].append(
+                        [owner.name_full, fcurve.data_path, fcurve.array_index])
+
+    frame_values = {frame: [round(fcurve.evaluate(frame), 6) for fcurve in fcurves]
+                    for frame in frames}
+    return get_frame_hashes(static, frame_values)
+
+
+def get_input_cache_frames(context: bpy.types.Context, frames: list) -> tuple:
+    """
+    Frames to render and the InputHashes to save once they are rendered.
+
+    Frames whose inputs match the hash recorded with their output, and
+    whose file is valid, are left out. Instances do not overwrite, so the
+    old output of every frame to render is deleted first.
+    """
+    hashes = get_input_hashes(context, frames)
+    hashes_path = get_export_dir() / HASHES_NAME
+    changed = set(get_changed_frames(frames, hashes, load_hashes(hashes_path)))
+    paths = get_frame_paths(context, frames)
+    missing, invalid = check_frames({f: paths[f] for f in frames if f not in changed})
+    render = sorted(changed.union(missing, invalid))
+
+    for frame in render:
+        try:
+            os.remove(paths[frame])
+        except FileNotFoundError:
+            pass
+    if len(render) < len(frames):
+        print(f"RMI: {len(frames) - len(render)} unchanged frames reused")
+    return render, InputHashes(hashes_path, hashes, paths)
+
+
+def get_frames_to_render(context: bpy.types.Context,
+                         scratch_dir: Path | None = None) -> tuple:
+    """
+    Frames the instances render and the InputHashes to save, None without
+    the input cache. The input cache hashes the whole range, so a frame
+    whose inputs changed is rendered again even though its old output is
+    still there for resume to skip.
+    """
+    props = context.scene.RMI_Props
+    frames = get_render_frames(context)
+    changed, input_hashes = [], None
+    if props.input_cache:
+        changed, input_hashes = get_input_cache_frames(context, frames)
+    if props.resume:
+        frames = get_resume_frames(context, frames)
+    elif scratch_dir is not None:
+        # Frames already in the export directory are not in scratch
+        frames = get_unsaved_frames(context, frames)
+    elif props.input_cache:
+        # The others are saved and unchanged
+        frames = []
+    return sorted(set(frames).union(changed)), input_hashes
+
+
+def get_render_command_list(context: bpy.types.Context, frames: list,
+                            threads: int = 0, blend_file: Path | None = None) -> list:
+    return build_render_command(get_blender_bin_path(), blend_file or get_blend_file(),
+                                frames, threads)
+
+
+def get_worker_command_list(context: bpy.types.Context,
+                            server: FrameQueueServer, threads: int = 0,
+                            blend_file: Path | None = None) -> list:
+    _, port = server.address
+    return build_worker_command(get_blender_bin_path(), blend_file or get_blend_file(),
+                                port, server.token, threads)
+
+
+def get_rawframes_command_list(server: RawFrameServer, blend_file: Path,
+                               threads: int = 0, archive: bool = False) -> list:
+    _, port = server.address
+    cmd = [get_blender_bin_path().as_posix(), "-b", blend_file.as_posix()] + \
+        get_thread_args(threads) + [
+            "--python", get_rawframes_script_path().as_posix(),
+            "--", "--port", f"{port}", "--token", server.token]
+    if archive:
+        cmd.append("--archive")
+    return cmd
+
+
+def get_remote_worker_command(server: FrameQueueServer) -> str:
+    """Command to run on another machine to join the render."""
+    _, port = server.address
+    cmd = ["blender", "-b", "--python", get_worker_script_path().as_posix(),
+           "--", "--host", socket.gethostname(), "--port", f"{port}",
+           "--token", server.token]
+    return ' '.join(shlex.quote(arg) for arg in cmd)
+
 
-    # print("CMD: ", cmd)
-    return get_platform_terminal_command_list(cmd)
+def get_log_dir() -> Path:
+    return get_export_dir() / "rmi_logs"
 
 
 def flipbook_render_output_path(context, render_type: str) -> str:
@@ -154,80 +624,56 @@ def flipbook_render_output_path(context, render_type: str) -> str:
     return new_path
 
 
+def get_frame_files(flipbook_dir: Path) -> list:
+    return list(scan_directory(flipbook_dir, EXTENSIONS).files)
+
+
 def create_frame_list(context: bpy.types.Context, flipbook_dir: Path) -> Path:
 
     frame_list_file = flipbook_dir / "ffmpeg_frame_list.txt"
     duration = 1 / context.scene.render.fps
-    files = []
-
-    # Collect all valid image files in the directory
-    for filename in os.listdir(flipbook_dir):
-        if filename.lower().endswith(EXTENSIONS):
-            files.append(flipbook_dir / filename)
-
-    # Sort files
-    files = sorted(files)
 
-    # Write the frame list with properly quoted full paths
-    with open(frame_list_file, "w") as frame_list:
-        for file in files:
-            quoted_file = shlex.quote(str(file))  # Quote the full file path
-            # Full path safely quoted
-            frame_list.write(f"file {quoted_file}\n")
-            frame_list.write(f"duration {duration}\n")
+    write_concat_list(frame_list_file, get_frame_files(flipbook_dir), duration)
 
     return frame_list_file
 
 
 def rendered_frames_exist(flipbook_dir: Path) -> bool:
-    if flipbook_dir.exists():
-        for filename in os.listdir(flipbook_dir):
-            if filename.lower().endswith(EXTENSIONS):
-                return True
-    return False
+    return bool(scan_directory(flipbook_dir, EXTENSIONS))
 
 
 def get_mp4_output_path(context, flipbook_dir: Path) -> Path:
-    flipbook_dir = Path(flipbook_dir)
     props = context.scene.RMI_Props
-    return flipbook_dir.parent / f"{flipbook_dir.name}_{props.encoder}_{props.quality}.mp4"
+    return get_video_path(flipbook_dir, props.encoder, props.quality)
 
 
-def get_platform_terminal_command_list(command_list: list) -> list:
-    cmd = []
-    match OS.detect_os():
-        case OS.WINDOWS:
-            return ["start", "cmd", '/c'] + command_list
-        case OS.MACOS:
-            # Escape the command for use in AppleScript
-            escaped_cmd = ' '.join(shlex.quote(arg) for arg in command_list)
-            apple_script = f'''
-            tell application "Terminal"
-                do script "{escaped_cmd}"
-                activate
-            end tell
-            '''
-            return ['osascript', '-e', apple_script]
-        case OS.LINUX:
-            return ["x-terminal-emulator", "-e"] + command_list
-        case OS.UNKNOWN:
-            raise RuntimeError("Unsupported platform")
-
-    # print(f"Command list: {cmd}")
-    return cmd
+def get_output_profiles(props) -> list:
+    """
+    The encoder settings, then the enabled extra outputs, see
+    check_profiles().
+    """
+    profiles = [{"encoder": props.encoder, "quality": props.quality,
+                 "scale": 100, "container": 'MP4'}]
+    profiles += [{"encoder": p.encoder, "quality": p.quality,
+                  "scale": p.scale, "container": p.container}
+                 for p in props.output_profiles if p.enabled]
+    return check_profiles(profiles)
 
 
 def get_ffmpeg_command_list(context, flipbook_dir: Path) -> list:
+    """
+    Single FFmpeg run encoding the frames to every output profile, the
+    frames are decoded once, see get_output_args().
+    """
     props = context.scene.RMI_Props
-    encoder = props.encoder
-    quality = props.quality
     fps = bpy.context.scene.render.fps
 
     if not flipbook_dir.is_dir():
         flipbook_dir = flipbook_dir.parent
 
     frame_list_file = create_frame_list(context, flipbook_dir)
-    output_file = get_mp4_output_path(context, flipbook_dir)
+    profiles = get_output_profiles(props)
+    output_files = [get_video_path(flipbook_dir, **profile) for profile in profiles]
 
     ffmpeg_cmd = [
         "ffmpeg",
@@ -237,33 +683,65 @@ def get_ffmpeg_command_list(context, flipbook_dir: Path) -> list:
         "-i", str(frame_list_file),
     ]
 
-    match encoder:
-        case "libx264":
-            ffmpeg_cmd.extend([
-                "-pix_fmt", "yuv420p",
-                "-c:v", encoder,
-                "-crf", f"{quality}"
-            ])
-        case "libx265":
-            ffmpeg_cmd.extend([
-                "-pix_fmt", "yuv420p",
-                "-c:v", encoder,
-                "-crf", f"{quality}",
-                "-tune", "fastdecode",
-                "-g", "1"
-            ])
-        case "libaom-av1":
-            ffmpeg_cmd.extend([
-                "-c:v", encoder,
-                "-crf", f"{quality}"
-            ])
-
-    ffmpeg_cmd.append("-y")
-    ffmpeg_cmd.append(str(output_file))
+    ffmpeg_cmd.extend(get_output_args(profiles, output_files))
 
     return get_platform_terminal_command_list(ffmpeg_cmd)
 
 
+@functools.cache
+def get_segment_cache(max_mb: int) -> SegmentCache:
+    """One cache shared by every encoder, see SegmentCache."""
+    return SegmentCache(get_cache_dir() / "encode_cache", max_mb * 1024 * 1024)
+
+
+def start_segmented_encode(context, flipbook_dir: Path, fps: float | None = None,
+                           jobs: int | None = None) -> SegmentedEncoder:
+    """Encode segments of the frame list in parallel, then join them."""
+    props = context.scene.RMI_Props
+    cache = get_segment_cache(props.encode_cache_size) if props.encode_cache else None
+
+    if not flipbook_dir.is_dir():
+        flipbook_dir = flipbook_dir.parent
+
+    encoder = SegmentedEncoder(
+        get_frame_files(flipbook_dir),
+        get_encoder_args(props.encoder, props.quality),
+        fps or context.scene.render.fps,
+        get_mp4_output_path(context, flipbook_dir),
+        flipbook_dir / "rmi_segments",
+        jobs or props.encode_jobs,
+        flipbook_dir / "rmi_logs" / "encode.log",
+        cache,
+    )
+    encoder.start()
+    return encoder
+
+
+def start_encode(context, out_dir: Path,
+                 events: EventLog | None = None) -> SegmentedEncoder | None:
+    """
+    Encode the frames in out_dir, in parallel segments or with a single
+    FFmpeg in a terminal. Returns the SegmentedEncoder when one is used,
+    always with the encode cache since only segments can be reused.
+    Extra output profiles always use the single FFmpeg, which decodes the
+    frames once for all outputs.
+    The end of a terminal encode is not known, only its start is logged.
+    """
+    props = context.scene.RMI_Props
+    output = get_mp4_output_path(context, out_dir if out_dir.is_dir() else out_dir.parent)
+    single_output = len(get_output_profiles(props)) == 1
+    if (props.parallel_encode or props.encode_cache) and single_output:
+        encoder = start_segmented_encode(context, out_dir)
+        watch_encoder(events, encoder, "segmented", output)
+        return encoder
+
+    cmd = get_ffmpeg_command_list(context, out_dir)
+    start_process(cmd)
+    if events is not None:
+        events.emit("encode_start", kind="terminal", output=str(output))
+    return None
+
+
 def open_directory(path: Path) -> None:
     path = str(path)
     match OS.detect_os():
@@ -292,17 +770,328 @@ def start_process(cmd: list) -> subprocess.Popen | None:
     return p
 
 
-def start_render_instances(context: bpy.types.Context) -> None:
-    instances = context.scene.RMI_Props.instances
-    cmd = get_render_command_list(context)
+def get_scratch_frame_paths(paths: dict, mover: FrameMover) -> dict:
+    """Paths frames are saved to in the scratch directory of mover."""
+    return {frame: str(mover.scratch_dir / Path(path).relative_to(mover.output_dir))
+            for frame, path in paths.items()}
+
 
-    processes = []
-    for _ in range(instances):
-        p = start_process(cmd)
-        processes.append(p)
+def create_event_log(context: bpy.types.Context, render_type: str,
+                     log_dir: Path) -> EventLog | None:
+    """Event log of a run in log_dir/events.jsonl, None when disabled."""
+    props = context.scene.RMI_Props
+    if not props.event_log:
+        return None
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    job = f"{get_blend_file().stem}/{render_type}/{stamp}"
+    textfile = (get_absolute_path(props.metrics_textfile)
+                if props.metrics_textfile else None)
+    return EventLog(log_dir / "events.jsonl", job, textfile)
+
+
+def watch_encoder(events: EventLog | None, encoder, kind: str,
+                  output: Path) -> None:
+    if events is not None and encoder is not None:
+        events.watch_encoder(encoder, kind=kind, output=str(output))
+
+
+def start_render_instances(context: bpy.types.Context,
+                           render_type: str = 'render',
+                           stream_encode: bool = False,
+                           blend_file: Path | None = None,
+                           events: EventLog | None = None,
+                           scratch_dir: Path | None = None) -> InstancePool:
+    """
+    Launch the render instances without waiting for them.
+
+    Headless instances are executed directly and their output is streamed
+    to rotating log files, otherwise each instance gets a terminal window.
+    The returned pool has to be polled until it reports no running instance.
+
+    With stream_encode, pool.encoder encodes frames as they are saved
+    (headless only, frame completion is read from the instance output).
+    Instances render blend_file, the saved main file by default.
+    Instance and frame events are written to events when given.
+    With the input cache, unchanged frames are reused and
+    pool.input_hashes records the rendered ones once saved.
+    When the job file renders to scratch_dir, pool.mover moves the frames
+    to the export directory.
+    """
+    props = context.scene.RMI_Props
+    blend_file = blend_file or get_blend_file()
+    frames, input_hashes = get_frames_to_render(context, scratch_dir)
+    pool = InstancePool(JobProgress(len(frames)))
+    pool.input_hashes = input_hashes
+
+    if props.partition_mode == 'DYNAMIC':
+        # Instances pull chunks from a shared queue until it is empty
+        queue = FrameQueue(frames, props.chunk_size, props.instances)
+        if props.remote_workers:
+            server = FrameQueueServer(queue, "0.0.0.0", props.coordinator_port,
+                                      blend_file.as_posix())
+            # Remote workers may still hold frames once local instances exit
+            pool.add_busy_check(lambda: any(queue.in_flight.values()))
+        else:
+            server = FrameQueueServer(queue, blend_file=blend_file.as_posix())
+        server.start()
+        pool.server = server
+        pool.add_cleanup(server.stop)
+        count = min(props.instances, len(frames))
+        cpu_sets = get_instance_cpu_sets(props, count)
+        commands = [get_worker_command_list(context, server, len(cpus or []),
+                                            blend_file)
+                    for cpus in cpu_sets]
+    else:
+        costs = None
+        if props.partition_mode == 'BALANCED':
+            costs = load_frame_costs(get_frame_times_path(),
+                                     get_frame_times_key(context, render_type))
+        frame_sets = partition_frames(
+            frames,
+            props.instances,
+            PartitionMode(props.partition_mode),
+            props.chunk_size,
+            costs,
+        )
+        cpu_sets = get_instance_cpu_sets(props, len(frame_sets))
+        commands = [get_render_command_list(context, frame_set, len(cpus or []),
+                                            blend_file)
+                    for frame_set, cpus in zip(frame_sets, cpu_sets)]
+
+    add_render_instances(props, pool, commands, cpu_sets, get_log_dir(),
+                         None if props.partition_mode == 'DYNAMIC' else frame_sets)
+    if events is not None:
+        events.job_start(render_type=render_type, blend_file=blend_file.as_posix(),
+                         frames=len(frames), instances=len(commands),
+                         partition_mode=props.partition_mode)
+        events.watch_pool(pool)
+
+    try:
+        frame_paths = get_frame_paths(context, frames)
+        if scratch_dir is not None:
+            pool.mover = start_frame_mover(context, pool, scratch_dir)
+            frame_paths = get_scratch_frame_paths(frame_paths, pool.mover)
+        start_watchdog(props, pool, get_log_dir(), frame_paths)
+        start_admission(props, pool)
+        if stream_encode and props.headless:
+            pool.encoder = start_stream_encoder(context, pool)
+            watch_encoder(events, pool.encoder, "stream",
+                          get_mp4_output_path(context, get_export_dir()))
+        pool.start()
+    except Exception:
+        pool.close()
+        raise
+
+    return pool
+
+
+def start_stream_encoder(context: bpy.types.Context,
+                         pool: InstancePool) -> StreamingEncoder | None:
+    """
+    Encode the flipbook while the instances render it.
+
+    Frames already on disk (skipped by the instances) are ready right away,
+    the others as soon as an instance reports them saved.
+    """
+    props = context.scene.RMI_Props
+    paths = get_frame_paths(context, get_render_frames(context))
+    if not paths:
+        return None
+
+    first_path = next(iter(paths.values()))
+    cmd = get_stream_command_list(
+        props.encoder, props.quality, context.scene.render.fps,
+        get_pipe_decoder(first_path),
+        get_mp4_output_path(context, get_export_dir()))
+
+    encoder = StreamingEncoder(cmd, paths, get_log_dir() / "encode.log")
+    for frame, path in paths.items():
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            encoder.frame_done(frame)
+
+    if pool.mover is not None:
+        # Frames are ready once moved out of scratch
+        pool.mover.add_listener(encoder.frame_done)
+        pool.mover.add_finish_listener(lambda mover: encoder.finish())
+    else:
+        pool.progress.add_frame_listener(encoder.frame_done)
+        pool.add_cleanup(encoder.finish)
+    encoder.start()
+    return encoder
+
+
+def start_frame_mover(context: bpy.types.Context, pool: InstancePool,
+                      scratch_dir: Path) -> FrameMover:
+    """Move frames saved to scratch_dir to the export directory."""
+    props = context.scene.RMI_Props
+    mover = FrameMover(scratch_dir, get_export_dir(), props.stage_cleanup)
+    pool.progress.add_frame_listener(mover.add)
+    pool.add_cleanup(mover.finish)
+    mover.start()
+    return mover
+
+
+def get_scene_info(scene: bpy.types.Scene) -> dict:
+    """Scene information in the shape probe_blend_file() returns."""
+    return {
+        "frame_start": scene.frame_start,
+        "frame_end": scene.frame_end,
+        "frame_step": scene.frame_step,
+        "fps": scene.render.fps / scene.render.fps_base,
+        "output": bpy.path.abspath(scene.render.filepath),
+        "camera": scene.camera.name if scene.camera else "",
+        "markers": [[m.name, m.frame] for m in scene.timeline_markers],
+    }
+
+
+def probe_blend_file(blend_file: Path, timeout: float = 300) -> dict:
+    """Scenes of another blend file, read by a background Blender."""
+    return probe_scenes(get_blender_bin_path(), blend_file, timeout)
+
+
+def get_batch_entry(item) -> dict:
+    return {
+        "blend_file": bpy.path.abspath(item.blend_file) if item.blend_file else "",
+        "scene": item.scene,
+        "camera": item.camera,
+        "range_mode": item.range_mode,
+        "frame_start": item.frame_start,
+        "frame_end": item.frame_end,
+        "marker": item.marker,
+        "output": item.output,
+        "encode": item.encode,
+    }
+
+
+def resolve_batch_jobs(context: bpy.types.Context, job_file: Path) -> list:
+    """
+    Jobs of the enabled queue entries. Entries without a blend file render
+    the snapshot job_file of the open file; other files are probed once.
+    """
+    props = context.scene.RMI_Props
+    scenes_cache = {}
+    jobs = []
+    for item in props.batch_jobs:
+        if not item.enabled:
+            continue
+        entry = get_batch_entry(item)
+        blend_file = entry["blend_file"]
+        if not blend_file or Path(blend_file).resolve() == get_blend_file():
+            scenes = {scene.name: get_scene_info(scene) for scene in bpy.data.scenes}
+            entry["blend_file"] = job_file.as_posix()
+            start = get_blend_file().parent
+        else:
+            if blend_file not in scenes_cache:
+                scenes_cache[blend_file] = probe_blend_file(Path(blend_file))
+            scenes = scenes_cache[blend_file]
+            start = Path(blend_file).parent
+
+        job = resolve_job(len(jobs), entry, scenes)
+        if entry["output"]:
+            # Relative to the blend file the job renders
+            job["output_pattern"] = bpy.path.abspath(entry["output"],
+                                                     start=str(start))
+            job["output"] = job["output_pattern"]
+        job["output_dir"] = get_output_dir(job["output_pattern"]).as_posix()
+        if job["frames"]:
+            jobs.append(job)
+    return jobs
+
+
+def start_batch_instances(context: bpy.types.Context, jobs: list) -> InstancePool:
+    """
+    Render the batch jobs back to back with one pool of worker instances.
+
+    Workers pull chunks from a BatchQueue (pool.server.queue) and start on
+    the next job as soon as the current one has no frames left to hand out.
+    """
+    props = context.scene.RMI_Props
+    total = sum(len(job["frames"]) for job in jobs)
+    pool = InstancePool(JobProgress(total))
+
+    queue = BatchQueue(jobs, props.chunk_size, props.instances)
+    server = FrameQueueServer(queue)
+    server.start()
+    pool.server = server
+    pool.add_cleanup(server.stop)
+
+    count = min(props.instances, total)
+    cpu_sets = get_instance_cpu_sets(props, count)
+    first_blend_file = Path(jobs[0]["blend_file"])
+    commands = [get_worker_command_list(context, server, len(cpus or []),
+                                        first_blend_file)
+                for cpus in cpu_sets]
+    log_dir = Path(jobs[0]["output_dir"]) / "rmi_logs"
+    add_render_instances(props, pool, commands, cpu_sets, log_dir)
+    start_watchdog(props, pool, log_dir, {})
+    start_admission(props, pool)
+
+    try:
+        pool.start()
+    except Exception:
+        pool.close()
+        raise
+
+    return pool
+
+
+def start_job_encode(context: bpy.types.Context, job: dict) -> SegmentedEncoder | None:
+    """Encode a finished batch job in the background, None without frames."""
+    props = context.scene.RMI_Props
+    output_dir = Path(job["output_dir"])
+    if not rendered_frames_exist(output_dir):
+        return None
+    jobs = props.encode_jobs if props.parallel_encode else 1
+    return start_segmented_encode(context, output_dir, job["fps"], jobs)
+
+
+def start_raw_instances(context: bpy.types.Context, blend_file: Path,
+                        events: EventLog | None = None) -> InstancePool:
+    """
+    Render a Flipbook without image files: instances send raw frames to
+    pool.server and pool.encoder feeds them to a single FFmpeg in order.
+    """
+    props = context.scene.RMI_Props
+    frames = get_render_frames(context)
+    count = min(props.instances, len(frames))
+    output_file = get_mp4_output_path(context, get_export_dir())
+    fps = context.scene.render.fps
+
+    def get_command(width, height):
+        return get_rawvideo_command_list(
+            props.encoder, props.quality, fps, width, height, output_file)
+
+    pool = InstancePool(JobProgress(len(frames)))
+    encoder = RawVideoEncoder(frames, get_command, get_log_dir() / "encode.log")
+    # One frame at a time, in order, keeps the reorder window small
+    server = RawFrameServer(FrameQueue(frames, 1, count), encoder)
+    server.start()
+    encoder.start()
+    pool.server = server
+    pool.encoder = encoder
+    pool.add_cleanup(server.stop)
+    pool.add_cleanup(encoder.finish)
+
+    cpu_sets = get_instance_cpu_sets(props, count)
+    commands = [get_rawframes_command_list(server, blend_file, len(cpus or []),
+                                           props.raw_archive)
+                for cpus in cpu_sets]
+    add_render_instances(props, pool, commands, cpu_sets, get_log_dir())
+    if events is not None:
+        events.job_start(render_type='flipbook_render', blend_file=blend_file.as_posix(),
+                         frames=len(frames), instances=len(commands),
+                         partition_mode='RAW')
+        events.watch_pool(pool)
+        watch_encoder(events, encoder, "raw", output_file)
+    # Frames are sent, not saved, only archived frames can be left broken
+    start_watchdog(props, pool, get_log_dir(),
+                   get_frame_paths(context, frames) if props.raw_archive else {})
+    start_admission(props, pool)
+
+    try:
+        pool.start()
+    except Exception:
+        pool.close()
+        raise
 
-    # For macOS, we don't wait for the processes as they're running in separate Terminal windows
-    if OS.detect_os() != OS.MACOS:
-        for p in processes:
-            p.communicate()
-            p.wait()
+    return pool
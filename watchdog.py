@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Instance watchdog: a headless instance whose render makes no progress for
+too long (driver stall, swapping, endless loop) is killed with its process
+group and replaced by a new instance rendering its unfinished frames.
+Progress is any "Fra:" line (Blender prints them while sampling), so a
+long frame is not hung as long as it keeps reporting.
+"""
+
+import time
+
+
+# An instance may take this many times its slowest frame before it is hung
+HANG_FACTOR = 3
+
+
+class Watchdog:
+    """
+    Checked by InstancePool.poll(). An instance is hung once it printed no
+    "Fra:" line and saved or skipped no frame for timeout seconds, or
+    HANG_FACTOR times its slowest frame if that is longer.
+
+    respawn(instance, frames, index) returns the replacement instance, not
+    started, for the unfinished frames (None for instances pulling frames
+    from a queue, whose frames the queue hands out again), or None to give
+    up. Each instance is replaced at most retries times in a row.
+    """
+
+    def __init__(self, timeout: float, retries: int, respawn, clock=time.monotonic):
+        self.timeout = timeout
+        self.retries = retries
+        self.respawn = respawn
+        self.clock = clock
+        self.restarts = {}
+        self.killed = []
+
+    def get_limit(self, progress) -> float:
+        slowest = max(progress.durations.values(), default=0.0)
+        return max(self.timeout, HANG_FACTOR * slowest)
+
+    def is_hung(self, instance, now: float) -> bool:
+        progress = instance.progress
+        if (progress is None or instance.killed or instance.suspended or
+                not instance.running):
+            return False
+        return now - progress.last_activity > self.get_limit(progress)
+
+    def get_unfinished_frames(self, instance) -> list | None:
+        if instance.frames is None:
+            return None
+        done = instance.progress.durations
+        return [frame for frame in instance.frames if frame not in done]
+
+    def check(self, pool) -> list:
+        """Kill the hung instances of pool and start their replacements."""
+        now = self.clock()
+        hung = [i for i in pool.instances if self.is_hung(i, now)]
+        for instance in hung:
+            instance.kill()
+            self.killed.append(instance)
+            frames = self.get_unfinished_frames(instance)
+            if frames == []:
+                # Hung after its last frame, nothing is lost
+                pool.replaced.add(instance.index)
+                continue
+
+            restarts = self.restarts.get(instance.index, 0)
+            if restarts >= self.retries:
+                print(f"RMI: instance {instance.index} hung, out of retries")
+                continue
+            replacement = self.respawn(instance, frames, len(pool.instances))
+            if replacement is None:
+                continue
+            print(f"RMI: instance {instance.index} hung, "
+                  f"restarted as instance {replacement.index}")
+            self.restarts[replacement.index] = restarts + 1
+            pool.replaced.add(instance.index)
+            pool.add(replacement)
+            pool.start_instance(replacement)
+        return hung
@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# ----------------------------------------------------------
+# Author: Daniele Stochino (dshot92)
+# ----------------------------------------------------------
+
+"""
+Render worker, run inside a background Blender instance:
+
+    blender -b file.blend --python worker.py -- --host 127.0.0.1 --port 5000 --token T
+
+Pulls frame chunks from the coordinator until none are left. On another
+machine the blend file can be left out, the coordinator sends its path;
+use --blend when the shared storage is mounted at a different path there.
+
+Batch renders send the job (blend file, scene, camera, output) with every
+chunk; the worker switches to it when it differs from the last one.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+
+import bpy
+
+
+def parse_args() -> argparse.Namespace:
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="worker.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--token", default="")
+    parser.add_argument("--blend", default="",
+                        help="Blend file path on this machine")
+    return parser.parse_args(argv)
+
+
+def open_blend_file(blend_file: str) -> None:
+    if not blend_file:
+        return
+    if bpy.data.filepath and os.path.samefile(bpy.data.filepath, blend_file):
+        return
+    bpy.ops.wm.open_mainfile(filepath=blend_file)
+
+
+def apply_job(job: dict) -> bpy.types.Scene:
+    open_blend_file(job.get("blend_file", ""))
+    scene = bpy.data.scenes[job["scene"]]
+    if job.get("camera"):
+        scene.camera = bpy.data.objects[job["camera"]]
+    if job.get("output"):
+        scene.render.filepath = job["output"]
+    scene.render.use_overwrite = False
+    scene.render.use_placeholder = False
+    return scene
+
+
+def render_frames(frames: list, scene: bpy.types.Scene | None = None) -> None:
+    scene = scene or bpy.context.scene
+    scene.frame_start = frames[0]
+    scene.frame_end = frames[-1]
+    scene.frame_step = frames[1] - frames[0] if len(frames) > 1 else 1
+    bpy.ops.render.render(animation=True, scene=scene.name)
+
+
+def main() -> None:
+    args = parse_args()
+    host = socket.gethostname()
+    worker = f"{host}-{os.getpid()}"
+
+    with socket.create_connection((args.host, args.port)) as sock:
+        stream = sock.makefile("rw")
+
+        def request(message: dict) -> dict:
+            message = dict(message, worker=worker, token=args.token)
+            stream.write(json.dumps(message) + "\n")
+            stream.flush()
+            reply = json.loads(stream.readline())
+            if "error" in reply:
+                raise RuntimeError(f"Coordinator: {reply['error']}")
+            return reply
+
+        job = request({"op": "register", "host": host})
+        open_blend_file(args.blend or job.get("blend_file", ""))
+
+        job_id = None
+        scene = None
+        while True:
+            reply = request({"op": "next"})
+            frames = reply.get("frames", [])
+            if not frames:
+                break
+            job = reply.get("job")
+            if job is not None and job["id"] != job_id:
+                scene = apply_job(job)
+                job_id = job["id"]
+            started = time.monotonic()
+            render_frames(frames, scene)
+            request({"op": "done", "frames": frames, "job": job_id,
+                     "seconds": time.monotonic() - started})
+
+
+if __name__ == "__main__":
+    main()